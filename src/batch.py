@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run many problems non-interactively and write the results as JSON lines.
+
+Usage: python batch.py [-j JOBS] [-t TIMEOUT] [-o RESULTS] PROBLEMS...
+
+Each argument is a directory of problem files, a problem file, or "-" for JSON lines on the standard input.
+Problem files are
+  - *.json: a problem or a list of problems,
+  - *.jsonl: one problem per line,
+  - *.p, *.tptp: a TPTP problem (see `tptp`), to be proved.
+A problem is a JSON object such as
+  {"id": "ex1", "conclusion": "(p -> q)", "premises": ["p"], "action": "tp", "propositional": true}
+with the formulas in the syntax of the parser, the action ("tp", "mg" or "cmg", default "tp")
+or else the mode flags "validity" and "satisfiability", and further settings of `Tableau`
+(such as "classical", "modal", "frame", "num_models", "size_limit_factor", "timeout", "max_nodes").
+A problem to be proved without a conclusion (such as a TPTP problem with a negated conjecture)
+is valid iff its premises are unsatisfiable.
+If "output" is true, the rendered tableau is included in the result (as LaTeX code if "latex" is true).
+For each problem, one line is written with the id, the verdict, the number of nodes and branches,
+the elapsed time in seconds, the models found (see `model`), and the reason the computation was stopped early, if any
+(and with "regularity", the number of redundant rule applications skipped),
+or else the id and an error message.
+With --cache, results are looked up in and stored to a result cache (see `cache`).
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+import argparse
+import json
+import os
+import sys
+
+# the settings of `Tableau` that can be given in a problem
+settings = ["validity", "satisfiability", "linguistic", "classical", "propositional", "modal",
+            "vardomains", "local", "frame", "threevalued", "weakthreevalued",
+            "num_models", "size_limit_factor", "latex", "timeout", "max_nodes", "max_depth", "max_memory",
+            "depth_first", "backjumping", "regularity", "freevars", "congruence",
+            "blocking"]
+
+# the settings that only bound the computation; a computation stopped by them is not cached
+budgets = ["timeout", "max_nodes", "max_memory"]
+
+
+def problems(path):
+    """
+    Read the problems from a directory, a file or the standard input.
+    Problems without an id are given the name of their file (and their position in it).
+
+    @param path: the path of the directory or file, or "-" for the standard input
+    @type path: str
+    @rtype: Iterator[dict[str,Any]]
+    """
+    if path == "-":
+        yield from jsonl(sys.stdin, "stdin")
+    elif os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if os.path.splitext(name)[1] in [".json", ".jsonl", ".p", ".tptp"]:
+                yield from problems(os.path.join(path, name))
+    else:
+        ext = os.path.splitext(path)[1]
+        if ext in [".p", ".tptp"]:
+            yield {"id": path, "tptp": path}
+        elif ext == ".json":
+            with open(path, encoding="utf-8") as f:
+                probs = json.load(f)
+            if isinstance(probs, dict):
+                probs = [probs]
+            for i, prob in enumerate(probs, 1):
+                prob.setdefault("id", path if len(probs) == 1 else path + ":" + str(i))
+                yield prob
+        else:
+            with open(path, encoding="utf-8") as f:
+                yield from jsonl(f, path)
+
+
+def jsonl(f, name):
+    # read one problem per non-empty line
+    for i, line in enumerate(f, 1):
+        if line.strip():
+            prob = json.loads(line)
+            prob.setdefault("id", name + ":" + str(i))
+            yield prob
+
+
+def parse(prob):
+    """
+    The formulas and settings of a problem.
+
+    @param prob: the problem
+    @type prob: dict[str,Any]
+    @return: the conclusion, premises, axioms and the keyword arguments of `Tableau`
+    @rtype: tuple[Formula,list[Formula],list[Formula],dict[str,Any]]
+    """
+    if "tptp" in prob:
+        conclusion, premises = __import__("tptp").read_problem(prob["tptp"])
+        axioms = []
+    else:
+        conclusion = formula(prob["conclusion"]) if prob.get("conclusion") else None
+        premises = [formula(fml) for fml in prob.get("premises", [])]
+        axioms = [formula(fml) for fml in prob.get("axioms", [])]
+    kwargs = {key: prob[key] for key in settings if key in prob}
+    action = prob.get("action", "tp")
+    if action not in ["tp", "mg", "cmg"]:
+        raise ValueError("unknown action: " + str(action))
+    kwargs.setdefault("validity", action == "tp")
+    kwargs.setdefault("satisfiability", action == "mg")
+    return conclusion, premises, axioms, kwargs
+
+
+@lru_cache(maxsize=4096)
+def formula(raw):
+    """
+    Parse a formula, reusing the result for formulas seen before.
+
+    @param raw: the formula in the syntax of the parser
+    @type raw: str
+    @rtype: Formula
+    """
+    return __import__("parser").FmlParser().parse(raw)
+
+
+def verdict(tab, refutation=False):
+    """
+    The answer of a finished tableau:
+    "valid" or "invalid" for theorem proving and countermodel generation,
+    "satisfiable" or "unsatisfiable" for model generation,
+    and "unknown" if the tableau is infinite or was stopped early.
+
+    @type tab: Tableau
+    @param refutation: whether the tableau is a model generation for premises to be proved without a conclusion,
+        which are valid iff they are unsatisfiable
+    @type refutation: bool
+    @rtype: str
+    """
+    sat = not tab.mode["validity"] and tab.mode["satisfiability"] and not refutation
+    if tab.open():
+        return "satisfiable" if sat else "invalid"
+    if tab.closed() and not tab.stop_reason:
+        return "unsatisfiable" if sat else "valid"
+    return "unknown"
+
+
+def model(m):
+    """
+    A structure as a JSON-serializable dictionary of its name "s" and its components
+    (such as the domain "d" and the interpretation function "i" of a structure of predicate logic),
+    with sets as sorted lists, tuples as lists, and functions as lists of pairs of arguments and values.
+
+    @param m: the structure
+    @type m: Structure
+    @rtype: dict[str,Any]
+    """
+    return {key: plain(val) for key, val in vars(m).items()}
+
+
+def plain(val):
+    # the JSON-serializable form of a component of a structure
+    if isinstance(val, dict):
+        if any([isinstance(key, tuple) for key in val]):
+            return sorted([[plain(key), plain(v)] for key, v in val.items()], key=json.dumps)
+        return {key: plain(v) for key, v in val.items()}
+    if isinstance(val, (set, frozenset)):
+        return sorted([plain(v) for v in val], key=json.dumps)
+    if isinstance(val, (list, tuple)):
+        return [plain(v) for v in val]
+    return val
+
+
+def solve(prob, timeout=None, cache=None):
+    """
+    Solve a problem with a tableau.
+
+    @param prob: the problem
+    @type prob: dict[str,Any]
+    @param timeout: the time limit in seconds, if the problem does not specify one
+    @type timeout: float
+    @param cache: the directory of the result cache, True for the default directory, or None for no caching
+    @type cache: str|bool
+    @return: the result, as a JSON-serializable dictionary; results from the cache are marked as cached
+    @rtype: dict[str,Any]
+    """
+    tableau = __import__("tableau")
+    output = __import__("output").MemoryOutput()
+    try:
+        conclusion, premises, axioms, kwargs = parse(prob)
+        # without a conclusion, the premises are to be proved inconsistent (see `verdict`)
+        refutation = conclusion is None and kwargs["validity"]
+        if refutation:
+            kwargs.update(validity=False, satisfiability=True)
+        render = bool(prob.get("output"))
+        if render:
+            kwargs.setdefault("latex", False)
+        if cache:
+            results = __import__("cache").open_cache(None if cache is True else cache)
+            key = results.key("tableau", conclusion, premises, axioms,
+                              {k: v for k, v in kwargs.items() if k not in budgets}, render)
+            res = results.get(key)
+            if res is not None:
+                return dict(res, id=prob.get("id"), cached=True)
+        kwargs.setdefault("timeout", timeout)
+        tab = tableau.Tableau(conclusion, premises=premises, axioms=axioms, silent=True, gui=output, **kwargs)
+        if render:
+            tab.show()
+    except Exception as e:
+        return {"id": prob.get("id"), "error": type(e).__name__ + ": " + str(e)}
+    res = {"id": prob.get("id"),
+           "verdict": verdict(tab, refutation),
+           "nodes": len(tab),
+           "branches": tab.num_branches,
+           "elapsed": round(tab.timer.elapsed, 6),
+           "models": [model(m) for m in tab.models],
+           "stop_reason": tab.stop_reason}
+    if tab.regularity:
+        res["skipped"] = tab.num_skipped
+    if render:
+        res["output"] = output.last
+    if cache and not tab.stop_reason:
+        results.put(key, {k: v for k, v in res.items() if k != "id"})
+    return res
+
+
+def quiet():
+    # silence the progress messages of the engines in the worker processes
+    sys.stdout = open(os.devnull, "w")
+
+
+def run(probs, out, jobs=None, timeout=None, cache=None):
+    """
+    Solve problems in a pool of worker processes and write the results as JSON lines in the order they finish.
+    A problem that exceeds its time limit is stopped by the worker itself, so the pool stays intact.
+    If a worker process dies nonetheless (e.g. killed for running out of memory), the pool is replaced
+    and the problems that were in flight are tried again one at a time,
+    so that only the problem that kills a worker on its own is reported as an error.
+
+    @param probs: the problems
+    @type probs: Iterable[dict[str,Any]]
+    @param out: the file to write the results to
+    @type out: TextIO
+    @param jobs: the number of worker processes (default: the number of processors)
+    @type jobs: int
+    @param timeout: the time limit per problem in seconds
+    @type timeout: float
+    @param cache: the result cache to use, as for `solve`
+    @type cache: str|bool
+    @return: the number of problems solved
+    @rtype: int
+    """
+    jobs = jobs or os.cpu_count() or 1
+    num = 0
+    pool = ProcessPoolExecutor(max_workers=jobs, initializer=quiet)
+    # the problems in flight, with the pool and whether they are run on their own
+    pending = {}
+    # the problems in flight when a worker died
+    suspects = []
+    probs = iter(probs)
+    try:
+        while True:
+            if suspects:
+                if not pending:
+                    prob = suspects.pop(0)
+                    pending[pool.submit(solve, prob, timeout, cache)] = (prob, pool, True)
+            else:
+                # keep a bounded number of problems in flight, so that the input can be streamed
+                for prob in probs:
+                    pending[pool.submit(solve, prob, timeout, cache)] = (prob, pool, False)
+                    if len(pending) >= 2 * jobs:
+                        break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                prob, used, alone = pending.pop(future)
+                try:
+                    res = future.result()
+                except BrokenProcessPool as e:
+                    if used is pool:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = ProcessPoolExecutor(max_workers=jobs, initializer=quiet)
+                    if not alone:
+                        suspects.append(prob)
+                        continue
+                    res = {"id": prob.get("id"), "error": type(e).__name__ + ": " + str(e)}
+                except Exception as e:
+                    res = {"id": prob.get("id"), "error": type(e).__name__ + ": " + str(e)}
+                out.write(json.dumps(res, ensure_ascii=False) + "\n")
+                out.flush()
+                num += 1
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return num
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description="Solve problems with tableaus and write the results as JSON lines.")
+    argparser.add_argument("problems", nargs="+", help="directories or files of problems, or - for standard input")
+    argparser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes")
+    argparser.add_argument("-t", "--timeout", type=float, default=None, help="time limit per problem in seconds")
+    argparser.add_argument("-o", "--output", default="-", help="file to write the results to")
+    argparser.add_argument("-c", "--cache", nargs="?", const=True, default=None,
+                           help="use a result cache (in the given directory, or else in the user's cache directory)")
+    args = argparser.parse_args(argv)
+
+    probs = (prob for path in args.problems for prob in problems(path))
+    if args.output == "-":
+        run(probs, sys.stdout, args.jobs, args.timeout, args.cache)
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            run(probs, out, args.jobs, args.timeout, args.cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reduced ordered binary decision diagrams (BDDs) for propositional formulas.
+"""
+
+from expr import *
+
+
+def propvars(*es):
+    """
+    The propositional variables of one or more formulas in order of their first occurrence,
+    collected in a single left-to-right pass over the subformulas.
+    This order keeps variables that occur close together close in the BDD,
+    which is a good heuristic for the size of the diagram.
+
+    @param es: the formulas
+    @type es: Formula
+    @rtype: list[str]
+    """
+    res = {}
+    stack = list(reversed(es))
+    while stack:
+        e = stack.pop()
+        if isinstance(e, Prop):
+            res[e.p] = None
+        else:
+            stack += reversed(e.imm_subexprs())
+    return list(res)
+
+
+class BDD:
+    """
+    A manager of reduced ordered binary decision diagrams.
+
+    A BDD is represented by the integer id of its root node.
+    The ids 0 and 1 are the terminal nodes ⊥ and ⊤;
+    every other node n tests the variable order[var[n]] and continues with lo[n] if it is false and hi[n] if it is true.
+    Nodes are shared between all BDDs of a manager via the unique table,
+    so two formulas are equivalent iff their BDDs have the same id.
+
+    Results of `ite` are memoized in a cache.
+    Roots that should survive garbage collection are registered with `ref` and released with `deref`;
+    `gc` frees all nodes not reachable from a registered root.
+    It is only run when called explicitly, since it invalidates the ids of all unregistered BDDs.
+
+    @attr order: the variable order
+    @type order: list[str]
+    @attr level: the position of each variable in the order
+    @type level: dict[str,int]
+    @attr var: the variable level of each node
+    @type var: list[int]
+    @attr lo: the low (false) successor of each node
+    @type lo: list[int]
+    @attr hi: the high (true) successor of each node
+    @type hi: list[int]
+    @attr unique: the unique table mapping (level, lo, hi) to nodes
+    @type unique: dict[tuple[int,int,int],int]
+    @attr cache: the memo table of `ite`
+    @type cache: dict[tuple[int,int,int],int]
+    @attr refs: the reference counts of registered roots
+    @type refs: dict[int,int]
+    @attr free: the ids of freed nodes available for reuse
+    @type free: list[int]
+    """
+
+    false = 0
+    true = 1
+
+    def __init__(self, order=[]):
+        self.order = []
+        self.level = {}
+        terminal = 1 << 30  # the level of the terminals is below all variables
+        self.var = [terminal, terminal]
+        self.lo = [0, 1]
+        self.hi = [0, 1]
+        self.unique = {}
+        self.cache = {}
+        self.refs = {}
+        self.free = []
+        for p in order:
+            self.add_var(p)
+
+    def add_var(self, p):
+        """
+        Add a variable at the bottom of the variable order, if not already present.
+
+        @param p: the propositional variable
+        @type p: str
+        @return: the BDD of the variable
+        @rtype: int
+        """
+        if p not in self.level:
+            self.level[p] = len(self.order)
+            self.order.append(p)
+        return self.node(self.level[p], self.false, self.true)
+
+    def __len__(self):
+        """
+        The number of live nodes, including the terminals.
+        """
+        return len(self.var) - len(self.free)
+
+    def node(self, v, lo, hi):
+        """
+        The unique node testing variable level v with the given successors.
+        """
+        if lo == hi:
+            return lo
+        key = (v, lo, hi)
+        u = self.unique.get(key)
+        if u is not None:
+            return u
+        if self.free:
+            u = self.free.pop()
+            self.var[u], self.lo[u], self.hi[u] = v, lo, hi
+        else:
+            u = len(self.var)
+            self.var.append(v)
+            self.lo.append(lo)
+            self.hi.append(hi)
+        self.unique[key] = u
+        return u
+
+    def ite(self, f, g, h):
+        """
+        If-then-else: the BDD of (f ∧ g) ∨ (¬f ∧ h).
+        """
+        # terminal cases
+        if f == self.true:
+            return g
+        if f == self.false:
+            return h
+        if g == h:
+            return g
+        if g == self.true and h == self.false:
+            return f
+        key = (f, g, h)
+        u = self.cache.get(key)
+        if u is not None:
+            return u
+        # split on the topmost variable
+        var = self.var
+        v = min(var[f], var[g], var[h])
+        f0, f1 = (self.lo[f], self.hi[f]) if var[f] == v else (f, f)
+        g0, g1 = (self.lo[g], self.hi[g]) if var[g] == v else (g, g)
+        h0, h1 = (self.lo[h], self.hi[h]) if var[h] == v else (h, h)
+        u = self.node(v, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self.cache[key] = u
+        return u
+
+    def neg(self, f):
+        return self.ite(f, self.false, self.true)
+
+    def conj(self, f, g):
+        return self.ite(f, g, self.false)
+
+    def disj(self, f, g):
+        return self.ite(f, self.true, g)
+
+    def imp(self, f, g):
+        return self.ite(f, g, self.true)
+
+    def biimp(self, f, g):
+        return self.ite(f, g, self.neg(g))
+
+    def xor(self, f, g):
+        return self.ite(f, self.neg(g), g)
+
+    def from_expr(self, e):
+        """
+        Build the BDD of a propositional formula.
+        Variables not yet known to the manager are added to the bottom of the order in order of occurrence.
+
+        @param e: the formula
+        @type e: Formula
+        @rtype: int
+        """
+        for p in propvars(e):
+            self.add_var(p)
+        return self.build(e)
+
+    def build(self, e):
+        """
+        Build the BDD of a propositional formula by recursion over its structure.
+        """
+        if isinstance(e, Prop):
+            return self.node(self.level[e.p], self.false, self.true)
+        if isinstance(e, Verum):
+            return self.true
+        if isinstance(e, Falsum):
+            return self.false
+        if isinstance(e, Neg):
+            return self.neg(self.build(e.phi))
+        ops = {Conj: self.conj, Disj: self.disj, Imp: self.imp, Biimp: self.biimp, Xor: self.xor}
+        if type(e) in ops:
+            return ops[type(e)](self.build(e.phi), self.build(e.psi))
+        raise ValueError("not a formula of propositional logic: " + str(e))
+
+    def ref(self, u):
+        """
+        Register a root to be kept alive by garbage collection.
+        """
+        self.refs[u] = self.refs.get(u, 0) + 1
+        return u
+
+    def deref(self, u):
+        """
+        Release a root registered with `ref`.
+        """
+        self.refs[u] -= 1
+        if not self.refs[u]:
+            del self.refs[u]
+
+    def gc(self):
+        """
+        Free all nodes not reachable from a registered root and clear the ite cache.
+
+        @return: the number of freed nodes
+        @rtype: int
+        """
+        live = {self.false, self.true}
+        stack = list(self.refs)
+        while stack:
+            u = stack.pop()
+            if u not in live:
+                live.add(u)
+                stack += [self.lo[u], self.hi[u]]
+        freed = 0
+        for key, u in list(self.unique.items()):
+            if u not in live:
+                del self.unique[key]
+                self.free.append(u)
+                freed += 1
+        self.cache.clear()
+        return freed
+
+    def count(self, u, num_vars=None):
+        """
+        The number of satisfying valuations of a BDD over the first num_vars variables of the order
+        (by default all variables known to the manager).
+
+        @rtype: int
+        """
+        num_vars = len(self.order) if num_vars is None else num_vars
+        memo = {}
+
+        def level(u):
+            return min(self.var[u], num_vars)
+
+        def rec(u):
+            if u <= 1:
+                return u
+            if u not in memo:
+                lo, hi = self.lo[u], self.hi[u]
+                memo[u] = (rec(lo) << (level(lo) - self.var[u] - 1)) + \
+                          (rec(hi) << (level(hi) - self.var[u] - 1))
+            return memo[u]
+
+        return rec(u) << level(u)
+
+    def valid(self, u):
+        return u == self.true
+
+    def satisfiable(self, u):
+        return u != self.false
+
+    def equivalent(self, u, v):
+        return u == v
+
+    def paths(self, u, target):
+        """
+        The paths from a node to a terminal, as lists of pairs of variables and truth values.
+
+        @param target: the terminal (BDD.true or BDD.false)
+        @type target: int
+        @rtype: Iterator[list[tuple[str,bool]]]
+        """
+        stack = [(u, [])]
+        while stack:
+            u, path = stack.pop()
+            if u <= 1:
+                if u == target:
+                    yield path
+                continue
+            p = self.order[self.var[u]]
+            stack.append((self.lo[u], path + [(p, False)]))
+            stack.append((self.hi[u], path + [(p, True)]))
+
+    def dnf(self, u):
+        """
+        A disjunctive normal form of a BDD, with one disjunct per path to ⊤.
+
+        @rtype: Formula
+        """
+        return Disj(*[Conj(*[Prop(p) if tv else Neg(Prop(p)) for (p, tv) in path])
+                      for path in self.paths(u, self.true)])
+
+    def cnf(self, u):
+        """
+        A conjunctive normal form of a BDD, with one conjunct per path to ⊥.
+
+        @rtype: Formula
+        """
+        return Conj(*[Disj(*[Neg(Prop(p)) if tv else Prop(p) for (p, tv) in path])
+                      for path in self.paths(u, self.false)])
+
+    def clauses(self, u):
+        """
+        The clauses of the conjunctive normal form of a BDD, as lists of pairs of signs and variables.
+
+        @rtype: list[list[tuple[bool,str]]]
+        """
+        return [[(not tv, p) for (p, tv) in path] for path in self.paths(u, self.false)]
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A persistent cache of results (verdicts, models, rendered output), addressed by the content of the inputs.
+
+Each entry is a JSON file named by the SHA-256 hash of a canonical serialization of the inputs
+(formulas, mode and settings) and of the engine version,
+so that results computed by an older version of the engines are never returned.
+The cache is bounded in size: when it grows beyond its limit, the least recently used entries are removed.
+"""
+
+import hashlib
+import json
+import os
+
+# the format of the entries; increase to invalidate all entries
+version = 1
+
+# the modules whose source code determines the results:
+# the engines and the modules they use to compute, bound, render and report them
+engine_modules = ["expr", "parser", "structure", "tableau", "truthtable", "denotation", "bdd",
+                  "exec_helpers", "output", "tptp", "batch", "daemon"]
+
+engine = None
+
+
+def default_path():
+    """
+    The default directory of the caches: pypl in the user's cache directory.
+
+    @rtype: str
+    """
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "pypl")
+
+
+def engine_version():
+    """
+    The version of the engines: a hash of their source code and of the entry format.
+
+    @rtype: str
+    """
+    global engine
+    if not engine:
+        h = hashlib.sha256(str(version).encode())
+        for module in engine_modules:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), module + ".py"), "rb") as f:
+                h.update(f.read())
+        engine = h.hexdigest()
+    return engine
+
+
+def canonical(obj):
+    """
+    A canonical serialization of (nested) inputs:
+    expressions are represented by their constructor expressions, dictionaries are sorted by their keys,
+    and lists and tuples are not distinguished.
+
+    @param obj: the inputs, made up of expressions, dictionaries, lists, tuples, strings, numbers, booleans and None
+    @rtype: str
+    """
+    if isinstance(obj, dict):
+        return "{" + ", ".join([canonical(k) + ": " + canonical(obj[k]) for k in sorted(obj, key=str)]) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ", ".join([canonical(el) for el in obj]) + "]"
+    return repr(obj)
+
+
+class ResultCache:
+    """
+    A cache of results in a directory.
+
+    @attr path: the directory
+    @type path: str
+    @attr max_size: the maximum total size of the entries in bytes
+    @type max_size: int
+    @attr size: the total size of the entries in bytes (None if not yet determined)
+    @type size: int
+    @attr written: the number of bytes written since the size was last determined
+    @type written: int
+    """
+
+    def __init__(self, path=None, max_size=64 * 2 ** 20):
+        self.path = path or default_path()
+        self.max_size = max_size
+        self.size = None
+        self.written = 0
+
+    def key(self, *inputs):
+        """
+        The key of the result of a computation.
+
+        @param inputs: the inputs of the computation, such as the kind of computation, the formulas and the settings
+        @rtype: str
+        """
+        return hashlib.sha256((engine_version() + canonical(inputs)).encode("utf-8")).hexdigest()
+
+    def file(self, key):
+        return os.path.join(self.path, key[:2], key + ".json")
+
+    def get(self, key):
+        """
+        Look up a result, marking it as recently used.
+
+        @param key: the key of the result
+        @type key: str
+        @return: the result, or None if it is not in the cache
+        @rtype: dict[str,Any]
+        """
+        path = self.file(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                res = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return res
+
+    def put(self, key, res):
+        """
+        Store a result, removing the least recently used results if the cache gets too big.
+        Other processes may write to the same cache, so the size is determined anew
+        whenever a tenth of the maximum size has been written since,
+        and the cache exceeds its maximum size by at most that much per process.
+
+        @param key: the key of the result
+        @type key: str
+        @param res: the result
+        @type res: dict[str,Any]
+        """
+        path = self.file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(res, ensure_ascii=False).encode("utf-8")
+        # write atomically, so that concurrent readers never see a partial entry
+        tmp = path + "." + str(os.getpid()) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.written += len(data)
+        if self.size is None or self.written > self.max_size // 10:
+            self.size = sum([size for path, mtime, size in self.entries()])
+            self.written = 0
+        else:
+            self.size += len(data)
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        # the path, time of last use and size of the entries
+        for root, dirs, files in os.walk(self.path):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is at most 90% full.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        self.size = sum([size for path, mtime, size in entries])
+        for path, mtime, size in entries:
+            if self.size <= 0.9 * self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.size -= size
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        for path, mtime, size in list(self.entries()):
+            os.remove(path)
+        self.size = 0
+
+    def __len__(self):
+        return sum([1 for entry in self.entries()])
+
+
+caches = {}
+
+
+def open_cache(path=None):
+    """
+    The cache in a directory, shared within the process.
+
+    @param path: the directory (default: the user's cache directory)
+    @type path: str
+    @rtype: ResultCache
+    """
+    if path not in caches:
+        caches[path] = ResultCache(path)
+    return caches[path]
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Conversion of propositional formulas into clause sets in conjunctive normal form.
+"""
+
+from expr import *
+
+from array import array
+from itertools import product
+
+
+class ClauseSet:
+    """
+    A set of clauses over integer literals.
+
+    Variables are numbered from 1; the literal k stands for the k-th variable and -k for its negation.
+    The literals of all clauses are stored back to back in one flat array,
+    and the i-th clause spans lits[starts[i]:starts[i+1]].
+
+    @attr names: the names of the variables, where variable k is names[k-1]
+    @type names: list[str]
+    @attr ids: the numbers of the named variables
+    @type ids: dict[str,int]
+    @attr aux: the auxiliary variables introduced by the transformation, with the formulas they abbreviate
+    @type aux: dict[int,Formula]
+    @attr lits: the literals of all clauses
+    @type lits: array[int]
+    @attr starts: the start of each clause in lits, followed by the end of the last clause
+    @type starts: array[int]
+    @attr top: the auxiliary variable standing for ⊤, if any
+    @type top: int
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.aux = {}
+        self.top = 0
+        self.lits = array("i")
+        self.starts = array("i", [0])
+
+    def var(self, p):
+        """
+        The number of a named variable, adding it if it is new.
+
+        @param p: the name of the variable
+        @type p: str
+        @rtype: int
+        """
+        k = self.ids.get(p)
+        if k is None:
+            self.names.append(p)
+            k = self.ids[p] = len(self.names)
+        return k
+
+    def new_var(self, fml=None):
+        """
+        Add an auxiliary variable.
+
+        @param fml: the formula abbreviated by the variable
+        @type fml: Formula
+        @rtype: int
+        """
+        self.names.append("_" + str(len(self.names) + 1))
+        k = len(self.names)
+        self.aux[k] = fml
+        return k
+
+    def const(self, tv):
+        """
+        The literal of a truth value, represented by an auxiliary variable forced to be true.
+
+        @param tv: the truth value
+        @type tv: bool
+        @rtype: int
+        """
+        if not self.top:
+            self.top = self.new_var(Verum())
+            self.add([self.top])
+        return self.top if tv else -self.top
+
+    @property
+    def num_vars(self):
+        return len(self.names)
+
+    def add(self, clause):
+        """
+        Add a clause.
+
+        @param clause: the literals of the clause
+        @type clause: Iterable[int]
+        """
+        self.lits.extend(clause)
+        self.starts.append(len(self.lits))
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, i):
+        return self.lits[self.starts[i]:self.starts[i + 1]]
+
+    def __iter__(self):
+        lits, starts = self.lits, self.starts
+        for i in range(len(self)):
+            yield lits[starts[i]:starts[i + 1]]
+
+    def __str__(self):
+        return "{" + ", ".join(["{" + ", ".join([("¬" if lit < 0 else "") + self.names[abs(lit) - 1]
+                                               for lit in clause]) + "}"
+                               for clause in self]) + "}"
+
+    def clauses(self):
+        """
+        The clauses as lists of pairs of signs and variables, in the format of `Formula.clauses`.
+
+        @rtype: list[list[tuple[bool,str]]]
+        """
+        return [[(lit > 0, self.names[abs(lit) - 1]) for lit in clause] for clause in self]
+
+    def formula(self):
+        """
+        The clause set as a conjunction of disjunctions of literals.
+
+        @rtype: Formula
+        """
+        return Conj(*[Disj(*[Prop(p) if sign else Neg(Prop(p)) for (sign, p) in clause])
+                      for clause in self.clauses()])
+
+
+def tseitin(*fmls, clauses=None):
+    """
+    The Tseitin transformation of one or more propositional formulas:
+    An equisatisfiable clause set of linear size,
+    which introduces an auxiliary variable for each compound subformula
+    together with clauses stating that the variable is equivalent to the subformula.
+    Negations are absorbed into the literals and nested conjunctions and disjunctions are flattened.
+
+    Every model of the clause set restricted to the original variables is a model of the formulas,
+    and every model of the formulas can be extended to a model of the clause set.
+
+    @param fmls: the formulas (which are asserted as a conjunction)
+    @type fmls: Formula
+    @param clauses: a clause set to add to (by default a new one)
+    @type clauses: ClauseSet
+    @rtype: ClauseSet
+    """
+    cs = clauses if clauses is not None else ClauseSet()
+    for fml in fmls:
+        cs.add([define(cs, fml)])
+    return cs
+
+
+def define(cs, fml):
+    """
+    Add the defining clauses of a formula and its subformulas to a clause set.
+
+    @return: the literal equivalent to the formula
+    @rtype: int
+    """
+
+    def operands(e):
+        # flatten nested conjunctions and disjunctions of the same kind
+        res, stack = [], [e.psi, e.phi]
+        while stack:
+            f = stack.pop()
+            if type(f) == type(e):
+                stack += [f.psi, f.phi]
+            else:
+                res.append(f)
+        return res
+
+    # iterative post-order traversal, to allow for deeply nested formulas;
+    # subformulas shared between several places are defined only once
+    lits = {}
+    stack = [(fml, False)]
+    while stack:
+        e, visited = stack.pop()
+        if id(e) in lits:
+            continue
+        if isinstance(e, Prop):
+            lits[id(e)] = cs.var(e.p)
+        elif isinstance(e, Verum) or isinstance(e, Falsum):
+            lits[id(e)] = cs.const(isinstance(e, Verum))
+        elif isinstance(e, Neg):
+            if not visited:
+                stack += [(e, True), (e.phi, False)]
+            else:
+                lits[id(e)] = -lits[id(e.phi)]
+        elif isinstance(e, Conj) or isinstance(e, Disj):
+            args = operands(e)
+            if not visited:
+                stack.append((e, True))
+                stack += [(f, False) for f in args]
+            else:
+                x = cs.new_var(e)
+                sub = [lits[id(f)] for f in args]
+                if isinstance(e, Conj):
+                    # x → f for all f, (f1 ∧ ... ∧ fn) → x
+                    for lit in sub:
+                        cs.add([-x, lit])
+                    cs.add([x] + [-lit for lit in sub])
+                else:
+                    # x → (f1 ∨ ... ∨ fn), f → x for all f
+                    cs.add([-x] + sub)
+                    for lit in sub:
+                        cs.add([x, -lit])
+                lits[id(e)] = x
+        elif isinstance(e, Imp) or isinstance(e, Biimp) or isinstance(e, Xor):
+            if not visited:
+                stack += [(e, True), (e.psi, False), (e.phi, False)]
+            else:
+                x = cs.new_var(e)
+                a, b = lits[id(e.phi)], lits[id(e.psi)]
+                if isinstance(e, Imp):
+                    cs.add([-x, -a, b])
+                    cs.add([x, a])
+                    cs.add([x, -b])
+                else:
+                    if isinstance(e, Xor):
+                        b = -b
+                    cs.add([-x, -a, b])
+                    cs.add([-x, a, -b])
+                    cs.add([x, a, b])
+                    cs.add([x, -a, -b])
+                lits[id(e)] = x
+        else:
+            raise ValueError("not a formula of propositional logic: " + str(e))
+    return lits[id(fml)]
+
+
+def nnf(fml, sign=True):
+    """
+    The negation normal form of a propositional formula,
+    with negations pushed inwards to the propositional variables
+    and implications, biimplications and exclusive disjunctions expanded.
+
+    @param fml: the formula
+    @type fml: Formula
+    @param sign: whether the formula is unnegated (True) or negated (False)
+    @type sign: bool
+    @rtype: Formula
+    """
+    if isinstance(fml, Prop):
+        return fml if sign else Neg(fml)
+    if isinstance(fml, Verum) or isinstance(fml, Falsum):
+        return fml if sign else (Falsum() if isinstance(fml, Verum) else Verum())
+    if isinstance(fml, Neg):
+        return nnf(fml.phi, not sign)
+    if isinstance(fml, Conj) or isinstance(fml, Disj):
+        junctor = Conj if isinstance(fml, Conj) == sign else Disj
+        return junctor(nnf(fml.phi, sign), nnf(fml.psi, sign))
+    if isinstance(fml, Imp):
+        return nnf(Disj(Neg(fml.phi), fml.psi), sign)
+    if isinstance(fml, Biimp):
+        return nnf(Conj(Imp(fml.phi, fml.psi), Imp(fml.psi, fml.phi)), sign)
+    if isinstance(fml, Xor):
+        return nnf(Biimp(fml.phi, fml.psi), not sign)
+    raise ValueError("not a formula of propositional logic: " + str(fml))
+
+
+def distribute(*fmls, clauses=None):
+    """
+    The structural transformation of one or more propositional formulas into an equivalent clause set,
+    by conversion into negation normal form and distribution of disjunctions over conjunctions.
+    Tautological clauses are dropped and clauses subsumed by other clauses are removed.
+
+    Unlike the Tseitin transformation, no auxiliary variables are introduced,
+    but the number of clauses can grow exponentially in the size of the formulas.
+
+    @param fmls: the formulas (which are asserted as a conjunction)
+    @type fmls: Formula
+    @param clauses: a clause set to add to (by default a new one)
+    @type clauses: ClauseSet
+    @rtype: ClauseSet
+    """
+    cs = clauses if clauses is not None else ClauseSet()
+
+    def rec(e):
+        # the clauses of a formula in negation normal form, as a list of frozensets of literals
+        if isinstance(e, Prop):
+            return [frozenset([cs.var(e.p)])]
+        if isinstance(e, Neg):
+            return [frozenset([-cs.var(e.phi.p)])]
+        if isinstance(e, Verum):
+            return []
+        if isinstance(e, Falsum):
+            return [frozenset()]
+        if isinstance(e, Conj):
+            return rec(e.phi) + rec(e.psi)
+        if isinstance(e, Disj):
+            return subsume([c1 | c2 for (c1, c2) in product(rec(e.phi), rec(e.psi))
+                            if not any(-lit in c2 for lit in c1)])
+
+    res = subsume([clause for fml in fmls for clause in rec(nnf(fml))])
+    for clause in res:
+        cs.add(sorted(clause, key=lambda lit: (abs(lit), lit)))
+    return cs
+
+
+def subsume(clauses):
+    """
+    Remove duplicate clauses and clauses that are supersets of other clauses.
+
+    @param clauses: the clauses
+    @type clauses: list[frozenset[int]]
+    @rtype: list[frozenset[int]]
+    """
+    res = []
+    for clause in sorted(dict.fromkeys(clauses), key=len):
+        if not any(other <= clause for other in res):
+            res.append(clause)
+    return res
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+A long-running local service that answers requests with warm worker processes,
+so that repeated calls do not pay for starting Python, importing the engines and setting up the parser.
+
+Usage: python daemon.py [-s SOCKET] [-j JOBS]
+
+The service reads requests as JSON lines from a Unix socket, or else from the standard input,
+and writes one JSON line per request in the order the requests finish, with the id of the request.
+Requests are handled concurrently. Requests are JSON objects with an action:
+  - "tp", "mg", "cmg": a problem as for `batch` (conclusion, premises, axioms and settings of `Tableau`);
+    the result has the verdict, the number of nodes and branches, the elapsed time, the models and the stop reason,
+  - "mc": model checking, with a structure (as in the structure input files)
+    and a list of formulas, each either an expression or a list of an expression, a variable assignment and a world,
+  - "tc": a truth table for a conclusion and premises;
+    the result of "mc" and "tc" is the output, in plain text or, if "latex" is true, LaTeX code.
+Failed requests are answered with an error message.
+With --cache, results are also looked up in and stored to a persistent result cache (see `cache`).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from functools import lru_cache
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+
+import batch
+
+
+def warm():
+    """
+    Prepare a worker process: import the engines and run them once on a small problem.
+    """
+    batch.quiet()
+    for module in ["expr", "parser", "structure", "tableau", "truthtable", "denotation", "output"]:
+        __import__(module)
+    compute({"action": "tp", "conclusion": "(p -> p)", "propositional": True})
+
+
+@lru_cache(maxsize=256)
+def structure(raw):
+    """
+    Parse a structure, reusing the result for structures seen before.
+
+    @param raw: the structure in the syntax of the structure input files
+    @type raw: str
+    @rtype: Structure
+    """
+    return __import__("parser").StructParser().parse(raw)
+
+
+def compute(request, cache=None):
+    """
+    Answer a request.
+
+    @param request: the request
+    @type request: dict[str,Any]
+    @param cache: the result cache to use, as for `batch.solve`
+    @type cache: str|bool
+    @return: the result, as a JSON-serializable dictionary
+    @rtype: dict[str,Any]
+    """
+    action = request.get("action", "tp")
+    if action in ["tp", "mg", "cmg"]:
+        return batch.solve(request, cache=cache)
+    try:
+        output = __import__("output").MemoryOutput()
+        latex = request.get("latex", False)
+        if action == "mc":
+            s = structure(request["structure"])
+            fmls = [fml if isinstance(fml, list) else [fml, None, None] for fml in request["formulas"]]
+            fmls = [(batch.formula(fml), s, v, w) for fml, v, w in fmls]
+            inputs = ("denotation", request["structure"], [(fml, v, w) for fml, s, v, w in fmls], latex)
+        elif action == "tc":
+            conclusion = batch.formula(request["conclusion"]) if request.get("conclusion") else None
+            premises = [batch.formula(fml) for fml in request.get("premises", [])]
+            inputs = ("truthtable", conclusion, premises, latex)
+        else:
+            raise ValueError("unknown action: " + str(action))
+        if cache:
+            results = __import__("cache").open_cache(None if cache is True else cache)
+            key = results.key(*inputs)
+            res = results.get(key)
+            if res is not None:
+                return dict(res, id=request.get("id"), cached=True)
+        if action == "mc":
+            __import__("denotation").Denotation(fmls, True, output).show(latex)
+        else:
+            __import__("truthtable").Truthtable(conclusion, premises, latex, True, output).show()
+    except Exception as e:
+        return {"id": request.get("id"), "error": type(e).__name__ + ": " + str(e)}
+    if cache:
+        results.put(key, {"output": output.last})
+    return {"id": request.get("id"), "output": output.last}
+
+
+class Daemon:
+    """
+    The service: a pool of warm worker processes and a cache of results.
+
+    @attr pool: the worker processes
+    @type pool: ProcessPoolExecutor
+    @attr results: the results of the latest requests, by their content (without the id), least recently used first
+    @type results: OrderedDict[str,dict[str,Any]]
+    @attr cache_size: the maximum number of results cached
+    @type cache_size: int
+    @attr hits: the number of requests answered from the cache
+    @type hits: int
+    @attr cache: the persistent result cache to use, as for `batch.solve`
+    @type cache: str|bool
+    """
+
+    def __init__(self, jobs=None, cache_size=1024, cache=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache = cache
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=warm)
+        self.results = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+
+    def start(self):
+        """
+        Start all worker processes right away instead of on the first requests.
+        """
+        for future in [self.pool.submit(os.getpid) for _ in range(self.jobs)]:
+            future.result()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def renew(self, pool):
+        """
+        Replace a pool whose worker processes have died (e.g. killed for running out of memory),
+        unless it was already replaced for another request.
+
+        @param pool: the broken pool
+        @type pool: ProcessPoolExecutor
+        """
+        if self.pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=warm)
+
+    async def handle(self, request):
+        """
+        Answer a request in a worker process, or from the cache.
+
+        @param request: the request
+        @type request: dict[str,Any]
+        @rtype: dict[str,Any]
+        """
+        key = json.dumps({k: v for k, v in request.items() if k != "id"}, sort_keys=True)
+        if key in self.results:
+            self.hits += 1
+            self.results.move_to_end(key)
+            res = self.results[key]
+        else:
+            pool = self.pool
+            try:
+                res = await asyncio.get_running_loop().run_in_executor(pool, compute, request, self.cache)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self.renew(pool)
+                res = {"id": request.get("id"), "error": type(e).__name__ + ": " + str(e)}
+            if "error" not in res and not res.get("stop_reason"):
+                self.results[key] = res
+                if len(self.results) > self.cache_size:
+                    self.results.popitem(last=False)
+        return dict(res, id=request.get("id"))
+
+    async def serve(self, reader, writer):
+        """
+        Answer the requests on a stream, concurrently, until the end of the stream.
+
+        @param reader: the stream of requests
+        @type reader: asyncio.StreamReader
+        @param writer: the stream to write the results to
+        @type writer: asyncio.StreamWriter
+        """
+        tasks = set()
+
+        async def answer(line):
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                res = {"id": None, "error": "invalid request: " + str(e)}
+            else:
+                res = await self.handle(request)
+            writer.write((json.dumps(res, ensure_ascii=False) + "\n").encode("utf-8"))
+            await writer.drain()
+
+        while line := await reader.readline():
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        writer.close()
+
+    async def serve_socket(self, path):
+        """
+        Serve the clients of a Unix socket until cancelled.
+
+        @param path: the path of the socket
+        @type path: str
+        """
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.serve, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def serve_stdio(self):
+        """
+        Serve the requests on the standard input until it is closed.
+        """
+        stdio = Stdio()
+        await self.serve(stdio, stdio)
+
+
+class Stdio:
+    """
+    The standard input and output as the streams of `Daemon.serve`,
+    read in a thread so that they need not be pipes.
+    """
+
+    async def readline(self):
+        return await asyncio.get_running_loop().run_in_executor(None, sys.stdin.buffer.readline)
+
+    def write(self, data):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def query(path, *requests):
+    """
+    Send requests to a running service and wait for the results.
+
+    @param path: the path of the socket of the service
+    @type path: str
+    @param requests: the requests
+    @type requests: dict[str,Any]
+    @return: the results, in the order the requests finish
+    @rtype: list[dict[str,Any]]
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall("".join([json.dumps(request) + "\n" for request in requests]).encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile(encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+
+def main(argv=None):
+    argparser = argparse.ArgumentParser(description="Answer requests with warm worker processes.")
+    argparser.add_argument("-s", "--socket", default=None, help="path of the Unix socket to listen on "
+                                                                 "(default: standard input and output)")
+    argparser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes")
+    argparser.add_argument("-c", "--cache", nargs="?", const=True, default=None,
+                           help="use a persistent result cache (in the given directory, "
+                                "or else in the user's cache directory)")
+    args = argparser.parse_args(argv)
+
+    daemon = Daemon(args.jobs, cache=args.cache)
+    daemon.start()
+    try:
+        asyncio.run(daemon.serve_socket(args.socket) if args.socket else daemon.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+
+if __name__ == "__main__":
+    main()
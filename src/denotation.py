@@ -21,7 +21,7 @@ class Denotation:
         self.silent = silent
         self.gui = gui
         if not self.gui:
-            self.gui = __import__("gui").PyPLGUI(True)
+            self.gui = __import__("output").default_output()
 
     def show(self, latex):
         res = ""
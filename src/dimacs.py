@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reading and writing clause sets in the DIMACS CNF format.
+
+A DIMACS file consists of comment lines starting with "c",
+a problem line "p cnf <number of variables> <number of clauses>"
+and the clauses as sequences of non-zero integer literals, each terminated by 0.
+The names of the variables are preserved in comment lines of the form "c var <k> <name>".
+"""
+
+from expr import *
+from cnf import *
+
+
+def read_clauses(f):
+    """
+    Read the clauses of a DIMACS file one by one, without loading the whole file.
+
+    @param f: the lines of the file (such as an open file object)
+    @type f: Iterable[str]
+    @return: an iterator over the header entries and clauses:
+             ("p", number of variables, number of clauses) for the problem line,
+             ("var", k, name) for variable names and
+             ("clause", literals) for clauses
+    @rtype: Iterator[tuple]
+    """
+    clause = []
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("c"):
+            fields = line.split()
+            if len(fields) == 4 and fields[1] == "var":
+                yield "var", int(fields[2]), fields[3]
+            continue
+        if line.startswith("p"):
+            fields = line.split()
+            if len(fields) != 4 or fields[1] != "cnf":
+                raise ValueError("not a DIMACS CNF problem line: " + line)
+            yield "p", int(fields[2]), int(fields[3])
+            continue
+        if line.startswith("%"):  # end marker used in some benchmark sets
+            break
+        for lit in line.split():
+            lit = int(lit)
+            if lit:
+                clause.append(lit)
+            else:
+                yield "clause", clause
+                clause = []
+    if clause:
+        yield "clause", clause
+
+
+def read(f, prefix="p"):
+    """
+    Read a DIMACS file into a clause set.
+    Variables without a name in the file are named by the prefix and their number (p1, p2, ...).
+
+    @param f: the lines of the file (such as an open file object)
+    @type f: Iterable[str]
+    @param prefix: the prefix of the names of unnamed variables
+    @type prefix: str
+    @rtype: ClauseSet
+    """
+    cs = ClauseSet()
+    names = {}
+
+    def add_vars(n):
+        # add the variables up to number n, keeping their numbers
+        for k in range(len(cs.names) + 1, n + 1):
+            p = names.get(k, prefix + str(k))
+            if p in cs.ids:
+                p = "_" + str(k)
+            cs.var(p)
+
+    for entry in read_clauses(f):
+        if entry[0] == "var":
+            names[entry[1]] = entry[2]
+        elif entry[0] == "p":
+            add_vars(entry[1])
+        else:
+            add_vars(max([abs(lit) for lit in entry[1]], default=0))
+            cs.add(entry[1])
+    return cs
+
+
+def read_formula(f, prefix="p"):
+    """
+    Read a DIMACS file into a formula: a conjunction of disjunctions of literals.
+
+    @rtype: Formula
+    """
+    return read(f, prefix).formula()
+
+
+def write(f, cs, names=True):
+    """
+    Write a clause set in the DIMACS format.
+
+    @param f: the file to write to
+    @type f: TextIO
+    @param cs: the clause set
+    @type cs: ClauseSet
+    @param names: whether to record the names of the variables in comment lines
+    @type names: bool
+    """
+    if names:
+        for k, p in enumerate(cs.names, 1):
+            if k not in cs.aux:
+                f.write("c var " + str(k) + " " + p + "\n")
+    f.write("p cnf " + str(cs.num_vars) + " " + str(len(cs)) + "\n")
+    for clause in cs:
+        f.write(" ".join([str(lit) for lit in clause] + ["0"]) + "\n")
+
+
+def write_formulas(f, *fmls, names=True):
+    """
+    Write one or more propositional formulas in the DIMACS format,
+    converted into clauses by the Tseitin transformation.
+
+    @param f: the file to write to
+    @type f: TextIO
+    @param fmls: the formulas (asserted as a conjunction)
+    @type fmls: Formula
+    @return: the clause set written
+    @rtype: ClauseSet
+    """
+    cs = tseitin(*fmls)
+    write(f, cs, names)
+    return cs
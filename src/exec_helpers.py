@@ -1,7 +1,6 @@
 
 import os
 import signal
-import dbus
 
 class SleepInhibitor:
     def __init__(self, reason):
@@ -21,6 +20,7 @@ class SleepInhibitor:
                     raise Exception("systemd not available")
 
             # set up dbus connection
+            dbus = __import__("dbus")
             bus = dbus.SystemBus()
             proxy = bus.get_object('org.freedesktop.login1', '/org/freedesktop/login1')
             iface = dbus.Interface(proxy, 'org.freedesktop.login1.Manager')
@@ -80,6 +80,7 @@ class PerformanceHolder:
                     raise Exception("systemd not available")
 
             # set up dbus connection
+            dbus = __import__("dbus")
             self.ppd = dbus.Interface(dbus.SystemBus().get_object('net.hadess.PowerProfiles', '/net/hadess/PowerProfiles'), 'net.hadess.PowerProfiles')
 
             # hold profile
@@ -135,3 +136,66 @@ class Timer:
             from time import time
             self.end = time()
             self.elapsed = self.end - self.start
+
+
+class Budget:
+    """
+    Limits on the resources of a computation, checked cooperatively by the computation itself.
+
+    @attr timeout: the maximum wall-clock time in seconds
+    @type timeout: float
+    @attr max_nodes: the maximum number of nodes
+    @type max_nodes: int
+    @attr max_memory: the maximum resident memory of the process in megabytes
+    @type max_memory: float
+    @attr cancel: a cancellation token (such as a threading.Event or multiprocessing.Event);
+                  the computation is cancelled once its `is_set()` returns True
+    @attr start: the time the budget started
+    @type start: float
+    """
+
+    def __init__(self, timeout=None, max_nodes=None, max_memory=None, cancel=None):
+        from time import time
+        self.timeout = timeout
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+        self.cancel = cancel
+        self.start = time()
+
+    def exceeded(self, num_nodes=0):
+        """
+        Check whether the computation should be stopped.
+
+        @param num_nodes: the number of nodes computed so far
+        @type num_nodes: int
+        @return: the reason for stopping ("cancelled", "timeout", "node limit" or "memory limit"),
+                 or None if the computation is within its budget
+        @rtype: str
+        """
+        from time import time
+        if self.cancel is not None and self.cancel.is_set():
+            return "cancelled"
+        if self.timeout is not None and time() - self.start > self.timeout:
+            return "timeout"
+        if self.max_nodes is not None and num_nodes > self.max_nodes:
+            return "node limit"
+        if self.max_memory is not None and memory() > self.max_memory:
+            return "memory limit"
+        return None
+
+
+def memory():
+    """
+    The resident memory of the current process in megabytes.
+
+    @rtype: float
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # peak rather than current memory (in kilobytes on Linux, bytes on macOS)
+        import resource
+        import sys
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / 2 ** (20 if sys.platform == "darwin" else 10)
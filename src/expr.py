@@ -752,35 +752,70 @@ class Formula(Expr):
         """
         return Forall(*[Var(u) for u in sorted(self.freevars())], self)
 
-    def dnf(self):
+    def dnf(self, compact=False):
         """
         The disjunctive normal form of the formula.
+
+        @param compact: whether to read the normal form off the formula's BDD
+                        rather than enumerate all valuations (one disjunct per path to ⊤,
+                        not necessarily mentioning every variable)
+        @type compact: bool
         """
+        if compact:
+            bdd = __import__("bdd").BDD()
+            return bdd.dnf(bdd.from_expr(self))
         pvs = sorted(self.propvars())
         vprod = list(product([True, False], repeat=len(pvs)))
         valuations = [{p: v for (p, v) in zip(pvs, valuation)} for valuation in vprod] if vprod else [{}]
         models = [val for val in valuations if self.denot(PropStructure("S", val))]
         return Disj(*[Conj(*[p if valuation[p] else Neg(p) for p in pvs]) for valuation in models])
 
-    def cnf(self):
+    def cnf(self, compact=False):
         """
         The conjunctive normal form of the formula.
+
+        @param compact: whether to read the normal form off the formula's BDD
+                        rather than enumerate all valuations (one conjunct per path to ⊥)
+        @type compact: bool
         """
+        if compact:
+            bdd = __import__("bdd").BDD()
+            return bdd.cnf(bdd.from_expr(self))
         pvs = sorted(self.propvars())
         vprod = list(product([True, False], repeat=len(pvs)))
         valuations = [{p: v for (p, v) in zip(pvs, valuation)} for valuation in vprod] if vprod else [{}]
         countermodels = [val for val in valuations if not self.denot(PropStructure("S", val))]
         return Conj(*[Disj(*[Neg(p) if valuation[p] else p for p in pvs]) for valuation in countermodels])
     
-    def clauses(self):
+    def clauses(self, compact=False):
         """
         The set of clauses (conjunction of disjunction of literals) of the formula.
+
+        @param compact: whether to read the clauses off the formula's BDD
+                        rather than enumerate all valuations (one clause per path to ⊥)
+        @type compact: bool
         """
+        if compact:
+            bdd = __import__("bdd").BDD()
+            return bdd.clauses(bdd.from_expr(self))
         pvs = sorted(self.propvars())
         vprod = list(product([True, False], repeat=len(pvs)))
         valuations = [{p: v for (p, v) in zip(pvs, valuation)} for valuation in vprod] if vprod else [{}]
         countermodels = [val for val in valuations if not self.denot(PropStructure("S", val))]
         return [[(not valuation[p], p) for p in pvs] for valuation in countermodels]
+
+    def equivalent(self, other):
+        """
+        Whether the formula is logically equivalent to another formula of propositional logic,
+        decided by comparing their BDDs.
+
+        @param other: the other formula
+        @type other: Formula
+        @rtype: bool
+        """
+        bdd = __import__("bdd")
+        bdd = bdd.BDD(bdd.propvars(self, other))
+        return bdd.equivalent(bdd.from_expr(self), bdd.from_expr(other))
     
 
 class Prop(Formula):
@@ -8,6 +8,10 @@ Graphical interface.
 import os
 from subprocess import DEVNULL, STDOUT, PIPE, check_call, run
 from datetime import datetime
+import multiprocessing
+import queue
+import signal
+import sys
 
 import tkinter as tk
 import tkinter.filedialog
@@ -165,9 +169,14 @@ class PyPLGUI(ttk.Frame):
         # invoke
         super().__init__(self.root)
         self.inst = PyPLInst()
+        self.jobs = []  # queued computations
+        self.worker = None  # process running the current computation
+        self.messages = None  # queue of messages from the worker process
         self.pack()
         self.win_main()
         self.mainloop()
+        if self.worker:
+            self.worker.terminate()
 
     def win_main(self):
         self.tabs = ttk.Notebook(self.root)
@@ -192,7 +201,6 @@ class PyPLGUI(ttk.Frame):
         frm_run.pack(pady=10)
 
         # run button
-        # todo turn into cancel button once running
         btn_run = ttk.Button(frm_run,
                             text="Run!",
                             style="ActionButton.TButton",
@@ -205,6 +213,18 @@ class PyPLGUI(ttk.Frame):
         # keyboard shortcut
         self.root.bind("<Control-Return>", lambda e: self.run())
 
+        # cancel button
+        btn_cancel = ttk.Button(frm_run,
+                                text="Cancel",
+                                style="ActionButton.TButton",
+                                state="disabled",
+                                width=22)
+        btn_cancel.bind("<Button>", lambda e: self.cancel())
+        btn_cancel.pack(in_=frm_run)
+        self.btn_cancel = btn_cancel
+        # keyboard shortcut
+        self.root.bind("<Escape>", lambda e: self.cancel())
+
         # status
         self.status = tk.StringVar()
         self.set_status("Waiting for input")
@@ -350,8 +370,7 @@ class PyPLGUI(ttk.Frame):
         lbl_sum.pack(in_=mid, ipady=15)
 
         def update_availability():
-            for rb in self.rbs_deduction:
-                rb.config(state=("normal" if self.inst.action in ["tp"] else "disabled"))
+            self.update_deductions()
 
     def tab_2(self):  # 2. Input
         # todo make scrollable
@@ -969,6 +988,7 @@ class PyPLGUI(ttk.Frame):
                     rb_.config(fg=black)
             set()
             update_availability()
+            self.update_deductions()
 
         def update_availability():
             if self.inst.logic["modal"] == "modal":
@@ -1273,7 +1293,8 @@ class PyPLGUI(ttk.Frame):
 
         enabled = self.inst.action in ["tp"]
         deduction = tk.StringVar(None, self.inst.deduction_system)
-        deductions = [("analytic tableaus", "tableau"), ("sequent calculus", "sequent")]
+        deductions = [("analytic tableaus", "tableau"), ("sequent calculus", "sequent"),
+                      ("SAT solver", "sat")]
         self.rbs_deduction = []
         rbs2 = []
         for i, (txt, val) in enumerate(deductions):
@@ -1286,12 +1307,14 @@ class PyPLGUI(ttk.Frame):
                                 selectcolor=darkgray, activebackground=lightgray, activeforeground=white,
                                 indicatoron=0,
                                 width=25, pady=7.5)
-            rb.pack(in_=mids[m], side=(tk.LEFT if i == 0 else tk.RIGHT), pady=5)
+            rb.pack(in_=mids[m], side=(tk.LEFT if i < len(deductions) - 1 else tk.RIGHT), pady=5)
             rbs2.append(rb)
             rb.config(command=lambda arg=rb: select_rb(arg, rbs2))
             if val == self.inst.deduction_system:
                 initial_select_rb(rb)
             self.rbs_deduction.append(rb)
+        self.update_deductions()
+        Tooltip(self.rbs_deduction[2], "only for classical propositional logic")
         m += 1
         # todo update availability of output format and logic for sequent calc
 
@@ -1388,168 +1411,121 @@ class PyPLGUI(ttk.Frame):
         btn_size_limit_up.pack(in_=mids[m], side=tk.LEFT, padx=5)
         m += 1
 
+    def update_deductions(self):
+        # tableaus and sequents are available for theorem proving,
+        # the SAT solver for theorem proving and (counter) model generation in classical propositional logic;
+        # if the SAT solver is selected but not available, fall back to tableaus
+        sat = self.inst.action in ["tp", "mg", "cmg"] and self.inst.logic["classint"] == "class" and \
+              self.inst.logic["proppred"] == "prop" and self.inst.logic["modal"] == "nonmodal"
+        rbs = dict(zip(["tableau", "sequent", "sat"], self.rbs_deduction))
+        for val, rb in rbs.items():
+            rb.config(state="normal" if (sat if val == "sat" else self.inst.action in ["tp"]) else "disabled")
+        if self.inst.deduction_system == "sat" and not sat:
+            self.inst.deduction_system = "tableau"
+            rbs["tableau"].select()
+            for val, rb in rbs.items():
+                if val == "tableau":
+                    rb.config(fg=white, bg=darkgray)
+                else:
+                    rb.config(fg=black, bg=white)
+
     def switch_to_tab(self, i):
         tab_id = self.tabs.tabs()[i]
         self.tabs.select(tab_id)
 
     def run(self):
-        # # wait window  # todo doesn't work/only with large delay
-        # win_wait = tk.Toplevel(self.root, bg=white)
-        # icon_path = os.path.join(os.path.dirname(__file__), "icon.png")
-        # win_wait.tk.call('wm', 'iconphoto', win_wait._w, tk.PhotoImage(file=icon_path))
-        # win_wait.geometry("300x100")
-        # lbl_wait = tk.Label(win_wait, text="...", font=font, bg=white)
-        # lbl_wait.pack(pady=32)
-
-        truthtable = __import__("truthtable")
-        denotation = __import__("denotation")
-        tableau = __import__("tableau")
-        concl = self.inst.conclusion
-        premises = self.inst.premises
-        formulas = self.inst.formulas
-        axioms = self.inst.axioms
-        structure = self.inst.structure
-
-        # settings
-        classical = self.inst.logic["classint"] == "class"
-        propositional = self.inst.logic["proppred"] == "prop"
-        modal = self.inst.logic["modal"] == "modal"
-        vardomains = self.inst.logic["constvar"] == "var"
-        local = self.inst.logic["locglob"] == "local"
-        frame = self.inst.logic["frame"]
-        sequent = self.inst.deduction_system == "sequent"
-        linguistic = self.inst.generation_mode == "linguistic"
-
-        latex = self.inst.output == "tex"
-        stepwise = self.inst.stepwise
-        underline_open = self.inst.underline_open
-        hide_nonopen = self.inst.hide_nonopen
-        num_models = self.inst.num_models
-        size_limit = self.inst.size_limit_factor
+        # collect the input and settings into a job and queue it for computation in the background
+        job = {
+                "action":         self.inst.action,
+                "conclusion":     self.inst.conclusion,
+                "premises":       self.inst.premises,
+                "formulas":       self.inst.formulas,
+                "axioms":         self.inst.axioms,
+                "structure":      self.inst.structure,
+                "classical":      self.inst.logic["classint"] == "class",
+                "propositional":  self.inst.logic["proppred"] == "prop",
+                "modal":          self.inst.logic["modal"] == "modal",
+                "vardomains":     self.inst.logic["constvar"] == "var",
+                "local":          self.inst.logic["locglob"] == "local",
+                "frame":          self.inst.logic["frame"],
+                "sequent":        self.inst.deduction_system == "sequent",
+                "sat":            self.inst.deduction_system == "sat",
+                "linguistic":     self.inst.generation_mode == "linguistic",
+                "latex":          self.inst.output == "tex",
+                "stepwise":       self.inst.stepwise,
+                "underline_open": self.inst.underline_open,
+                "hide_nonopen":   self.inst.hide_nonopen,
+                "num_models":     self.inst.num_models,
+                "size_limit":     self.inst.size_limit_factor
+        }
+        self.jobs.append(job)
+        if self.worker:
+            self.set_status("Queued (" + str(len(self.jobs)) + " waiting)...")
+        else:
+            self.start_job()
 
+    def start_job(self):
+        # start the next queued job in a worker process
+        if not self.jobs:
+            return
+        job = self.jobs.pop(0)
+        self.messages = multiprocessing.Queue()
+        self.worker = multiprocessing.Process(target=work, args=(job, self.messages))
+        self.worker.start()
+        self.btn_cancel.config(state="normal")
         self.set_status("Computing...")
-        self.update()
+        self.root.after(100, self.poll)
 
-        if self.inst.action == "tc":
-            tt = truthtable.Truthtable(concl, premises, latex, True, self)
-            tt.show()
+    def poll(self):
+        # process the messages from the worker process without blocking the interface
+        if not self.worker:
+            return
+        # check whether the worker is still running before reading its messages,
+        # so that the last messages of a worker that has exited are read before it is found dead
+        alive = self.worker.is_alive()
+        done = False
+        while True:
+            try:
+                msg = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if msg[0] == "status":
+                self.set_status(msg[1])
+            elif msg[0] == "error":
+                print(msg[1])
+                self.set_status("Error: " + msg[1].strip().splitlines()[-1])
+                done = True
+            elif msg[0] == "done":
+                self.set_status("Ready to run")
+                done = True
+        if not done and not alive:
+            self.set_status("Computation aborted")
+            done = True
+        if done:
+            self.finish_job()
+        else:
+            self.root.after(100, self.poll)
 
-        elif self.inst.action == "mc":
-            denot = denotation.Denotation([(fml, structure, v, w) for fml, v, w in formulas], True, self)
-            denot.show(latex)
-
-            # # todo make look nicer?
-            # # tk.messagebox.showinfo("", str(denot))
-            # win_output = tk.Toplevel(self.root, bg=white)
-            # # win_output.geometry("1000x605")  # todo geometry only applied on second opening
-            # win_output.destroy()
-            # win_output = tk.Toplevel(self.root, bg=white)
-            # icon_path = os.path.join(os.path.dirname(__file__), "icon.png")
-            # win_output.tk.call('wm', 'iconphoto', win_output._w, tk.PhotoImage(file=icon_path))
-            # lbl_output = tk.Label(win_output, text=str(denot), font=font, bg=white)
-            # lbl_output.pack(pady=32)
-            # # frame_output = ttk.Frame(win_output)
-            # # win_output.destroy()
-
-        elif self.inst.action != "tt":
-            validity = self.inst.action == "tp"
-            satisfiability = self.inst.action == "mg"
-
-            tableau.Tableau(concl, premises=premises, axioms=axioms,
-                            validity=validity, satisfiability=satisfiability, linguistic=linguistic,
-                            classical=classical, propositional=propositional,
-                            modal=modal, vardomains=vardomains, local=local, frame=frame,
-                            silent=True, file=True, latex=latex, stepwise=stepwise,
-                            num_models=num_models, size_limit_factor=size_limit,
-                            sequent_style=sequent,
-                            underline_open=underline_open, hide_nonopen=hide_nonopen,
-                            gui=self).show()
+    def cancel(self):
+        # abort the running job
+        if not self.worker:
+            return
+        self.worker.terminate()
+        self.worker.join()
+        self.set_status("Cancelled")
+        self.finish_job()
+
+    def finish_job(self):
+        self.worker = None
+        self.btn_cancel.config(state="normal" if self.jobs else "disabled")
+        self.start_job()
 
-        else:
-            # test if theorem
-            tab1 = tableau.Tableau(concl, premises=premises, axioms=axioms,
-                                   validity=True, satisfiability=False, linguistic=linguistic,
-                                   classical=classical, propositional=propositional,
-                                   modal=modal, vardomains=vardomains, local=local, frame=frame,
-                                   silent=True, file=True, latex=latex, stepwise=stepwise,
-                                   num_models=num_models, size_limit_factor=size_limit,
-                                   underline_open=underline_open, hide_nonopen=hide_nonopen,
-                                   gui=self)
-            if tab1.closed():
-                # win_wait.destroy()
-                tab1.show()
-            else:
-                # test if non-theorem
-                tab2 = tableau.Tableau(concl, premises=premises, axioms=axioms,
-                                       validity=False, satisfiability=False, linguistic=linguistic,
-                                       classical=classical, propositional=propositional,
-                                       modal=modal, vardomains=vardomains, local=local, frame=frame,
-                                       silent=True, file=True, latex=latex, stepwise=stepwise,
-                                       num_models=num_models, size_limit_factor=size_limit,
-                                       underline_open=underline_open, hide_nonopen=hide_nonopen,
-                                       gui=self)
-                if tab2.open() or tab2.infinite():
-                    # win_wait.destroy()
-                    tab2.show()
-    
     def write_output(self, res, latex=True):
         # generate and open output file
-        path_output = os.path.join(os.path.dirname(os.path.dirname(__file__)), "output")
-        if not os.path.exists(path_output):
-            os.mkdir(path_output)
-        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M_%S%f')
-        os.chdir(path_output)
-        if not latex:
-            # generate and open txt file
-            self.set_status("Preparing output file...")
-            file_txt = "output_" + timestamp + ".txt"
-            path_txt = os.path.join(path_output, file_txt)
-            with open(path_txt, "w", encoding="utf-8") as f:
-                f.write(res)
-            # open file
-            self.set_status("Opening output file...")
-            p_xdgopen = run(["xdg-open", path_txt], capture_output=True)
-            if p_xdgopen.returncode != 0:
-                print("Error opening output file")
-                self.set_status("Error opening output file")
-                self.update()
-                return
-            os.chdir(os.path.dirname(__file__))
-        else:
-            # generate and open latex and pdf file
-            # prepare output files
-            self.set_status("Preparing output file...")
-            file_tex = "output_" + timestamp + ".tex"
-            file_pdf = "output_" + timestamp + ".pdf"
-            path_tex = os.path.join(path_output, file_tex)
-            path_pdf = os.path.join(path_output, file_pdf)
-            # write LaTeX code
-            with open(path_tex, "w") as texfile:
-                texfile.write(res)
-            # compile LaTeX to PDF
-            self.set_status("Compiling output file...")
-            p_pdflatex = run(["pdflatex", file_tex, 
-                "-halt-on-error", "-interaction=errorstopmode"], 
-                stdout=DEVNULL, stderr=STDOUT)  # todo stop on error doesn't work
-            if p_pdflatex.returncode != 0 or not os.path.exists(path_pdf):
-                print("Error compiling LaTeX to PDF")
-                self.set_status("Error compiling LaTeX to PDF")
-                self.update()
-                return
-            # open file
-            self.set_status("Opening output file...")
-            p_xdgopen = run(["xdg-open", path_pdf], capture_output=True)
-            if p_xdgopen.returncode != 0: 
-                print("Error opening output file")
-                self.set_status("Error opening output file")
-                self.update()
-                return
-            # cleanup
-            for file in os.listdir(path_output):
-                path_file = os.path.join(path_output, file)
-                if os.path.exists(path_file) and file.endswith(".log") or file.endswith(".aux") or file.endswith(".gz"):
-                    os.remove(path_file)
-            os.chdir(os.path.dirname(__file__))
+        path = __import__("output").FileOutput(status=self.set_status).write_output(res, latex)
+        if not path:
+            print("Error generating output file")
+            return
         self.set_status("Ready to run" if hasattr(self, "status") else "Done")
     
     def set_status(self, txt):
@@ -1558,6 +1534,104 @@ class PyPLGUI(ttk.Frame):
             self.status.set(txt)
             self.update()
 
+
+def compute(job, output):
+    """
+    Run the computation specified by a job and hand the result to an output sink.
+
+    @param job: the input and settings, as collected by `PyPLGUI.run`
+    @type job: dict[str,Any]
+    @param output: the output sink
+    @type output: output.Output
+    """
+    truthtable = __import__("truthtable")
+    denotation = __import__("denotation")
+    tableau = __import__("tableau")
+    concl = job["conclusion"]
+    premises = job["premises"]
+    formulas = job["formulas"]
+    axioms = job["axioms"]
+    structure = job["structure"]
+
+    # settings
+    classical = job["classical"]
+    propositional = job["propositional"]
+    modal = job["modal"]
+    vardomains = job["vardomains"]
+    local = job["local"]
+    frame = job["frame"]
+    sequent = job["sequent"]
+    sat = job["sat"] and classical and propositional and not modal
+    linguistic = job["linguistic"]
+
+    latex = job["latex"]
+    stepwise = job["stepwise"]
+    underline_open = job["underline_open"]
+    hide_nonopen = job["hide_nonopen"]
+    num_models = job["num_models"]
+    size_limit = job["size_limit"]
+
+    if job["action"] == "tc":
+        tt = truthtable.Truthtable(concl, premises, latex, True, output)
+        tt.show()
+
+    elif job["action"] == "mc":
+        denot = denotation.Denotation([(fml, structure, v, w) for fml, v, w in formulas], True, output)
+        denot.show(latex)
+
+    elif job["action"] != "tt" and sat:
+        validity = job["action"] == "tp"
+        satisfiability = job["action"] == "mg"
+
+        __import__("sat").Sat(concl, premises=premises + axioms,
+                              validity=validity, satisfiability=satisfiability,
+                              num_models=num_models, latex=latex, silent=True, gui=output).show()
+
+    elif job["action"] != "tt":
+        validity = job["action"] == "tp"
+        satisfiability = job["action"] == "mg"
+
+        tableau.Tableau(concl, premises=premises, axioms=axioms,
+                        validity=validity, satisfiability=satisfiability, linguistic=linguistic,
+                        classical=classical, propositional=propositional,
+                        modal=modal, vardomains=vardomains, local=local, frame=frame,
+                        silent=True, file=True, latex=latex, stepwise=stepwise,
+                        num_models=num_models, size_limit_factor=size_limit,
+                        sequent_style=sequent,
+                        underline_open=underline_open, hide_nonopen=hide_nonopen,
+                        gui=output).show()
+
+    else:
+        # search for a proof and a counter model at the same time
+        tableau.race(concl, premises=premises, axioms=axioms, linguistic=linguistic,
+                     classical=classical, propositional=propositional,
+                     modal=modal, vardomains=vardomains, local=local, frame=frame,
+                     file=True, latex=latex, stepwise=stepwise,
+                     num_models=num_models, size_limit_factor=size_limit,
+                     underline_open=underline_open, hide_nonopen=hide_nonopen,
+                     gui=output)
+
+
+def work(job, messages):
+    """
+    Run a job in a worker process,
+    writing and compiling the output there and reporting the progress back to the interface through a queue.
+
+    @param job: the input and settings
+    @type job: dict[str,Any]
+    @param messages: the queue to report to
+    @type messages: multiprocessing.Queue
+    """
+    status = lambda txt: messages.put(("status", txt))
+    # on cancellation, exit cleanly so that the processes started by the computation are stopped as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    try:
+        compute(job, __import__("output").FileOutput(status=status))
+        messages.put(("done",))
+    except Exception:
+        messages.put(("error", __import__("traceback").format_exc()))
+
+
 def main():
     # redirect output to log file
     if not debug:
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Output sinks for the results of the engines (tableaus, truth tables, denotations, ...).
+
+The engines hand their finished output (plain text or LaTeX code) to the `write_output` method of a sink,
+which is either the graphical interface or one of the headless sinks defined here,
+so that the engines can be run without importing tkinter.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from subprocess import DEVNULL, STDOUT, run
+from datetime import datetime
+
+
+class Output:
+    """
+    An output sink.
+    """
+
+    def write_output(self, res, latex=True):
+        """
+        Receive the output of a computation.
+
+        @param res: the output, in plain text or LaTeX code
+        @type res: str
+        @param latex: whether the output is LaTeX code
+        @type latex: bool
+        """
+        raise NotImplementedError
+
+    def set_status(self, txt):
+        """
+        Report the progress of a computation.
+
+        @param txt: the status message
+        @type txt: str
+        """
+        pass
+
+
+class NullOutput(Output):
+    """
+    An output sink that discards the output.
+    """
+
+    def write_output(self, res, latex=True):
+        pass
+
+
+class MemoryOutput(Output):
+    """
+    An output sink that keeps the output in memory.
+
+    @attr results: the outputs received, as pairs of the output and whether it is LaTeX code
+    @type results: list[tuple[str,bool]]
+    """
+
+    def __init__(self):
+        self.results = []
+
+    def write_output(self, res, latex=True):
+        self.results.append((res, latex))
+
+    @property
+    def last(self):
+        """
+        The last output received (None if there is none yet).
+        """
+        return self.results[-1][0] if self.results else None
+
+
+class FileOutput(Output):
+    """
+    An output sink that writes the output to a text file, or compiles it to a PDF file with pdflatex,
+    in the output directory, and optionally opens the file with the default application.
+
+    @attr path_output: the output directory
+    @type path_output: str
+    @attr open_file: whether to open the file after writing it
+    @type open_file: bool
+    @attr status: the callback to report progress to (by default none, as for `NullOutput`)
+    @type status: Callable[[str],None]
+    @attr paths: the paths of the files written
+    @type paths: list[str]
+    """
+
+    def __init__(self, path_output=None, open_file=True, status=None):
+        self.path_output = path_output or \
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output")
+        self.open_file = open_file
+        self.status = status or (lambda txt: None)
+        self.paths = []
+
+    def set_status(self, txt):
+        self.status(txt)
+
+    def write_output(self, res, latex=True):
+        """
+        Write the output to a file and open it.
+
+        @return: the path of the file written, or None if the file could not be generated or opened
+        @rtype: str
+        """
+        if not os.path.exists(self.path_output):
+            os.makedirs(self.path_output)
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M_%S%f')
+        self.set_status("Preparing output file...")
+        if not latex:
+            # generate txt file
+            path = os.path.join(self.path_output, "output_" + timestamp + ".txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(res)
+        else:
+            # generate latex and pdf file
+            file_tex = "output_" + timestamp + ".tex"
+            path = os.path.join(self.path_output, "output_" + timestamp + ".pdf")
+            with open(os.path.join(self.path_output, file_tex), "w") as texfile:
+                texfile.write(res)
+            self.set_status("Compiling output file...")
+            if not compile_latex(res, path):
+                self.set_status("Error compiling LaTeX to PDF")
+                return None
+        self.paths.append(path)
+        # open file
+        if self.open_file:
+            self.set_status("Opening output file...")
+            try:
+                opened = run(["xdg-open", path], capture_output=True).returncode == 0
+            except OSError:
+                opened = False
+            if not opened:
+                self.set_status("Error opening output file")
+                return None
+        return path
+
+
+def default_output():
+    """
+    The output sink used by the engines if none is given:
+    Files are written to the output directory and opened if a display is available.
+    """
+    return FileOutput(open_file=bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")))
+
+
+# the maximum total size of the compiled PDF files and formats in the cache directory, in bytes
+latex_cache_size = 256 * 2 ** 20
+
+# the number of seconds after which a preamble that could not be precompiled is tried again
+failure_expiry = 60 * 60
+
+
+def latex_cache():
+    """
+    The directory of the compiled PDF files and preamble formats: latex in the cache directory (see `cache`).
+
+    @rtype: str
+    """
+    return os.path.join(__import__("cache").default_path(), "latex")
+
+
+def compile_latex(tex, path, cache=None):
+    """
+    Compile LaTeX code to a PDF file with pdflatex.
+    PDF files are cached by the hash of their source, so that the same output is compiled only once,
+    and the preamble is compiled once into a format file (see `preamble_format`), so that it is not read every time.
+    If the preamble cannot be precompiled, the document is compiled as a whole.
+    The least recently used files are removed when the cache grows beyond its maximum size (see `evict`).
+
+    @param tex: the LaTeX code of the document
+    @type tex: str
+    @param path: the path of the PDF file to write
+    @type path: str
+    @param cache: the directory of the cached PDF files and formats (default: `latex_cache()`)
+    @type cache: str
+    @return: True if the PDF file was written, and False otherwise
+    @rtype: bool
+    """
+    cache = cache or latex_cache()
+    os.makedirs(cache, exist_ok=True)
+    key = hashlib.sha256(tex.encode("utf-8")).hexdigest()
+    path_cached = os.path.join(cache, key + ".pdf")
+    if not os.path.exists(path_cached):
+        tmp = tempfile.mkdtemp(dir=cache)
+        try:
+            pdf = os.path.join(tmp, key + ".pdf")
+            compiled = False
+            preamble, begin, body = tex.partition("\\begin{document}")
+            fmt = preamble_format(preamble, cache) if begin else None
+            if fmt:
+                # compile only the body with the precompiled preamble
+                with open(os.path.join(tmp, key + ".tex"), "w", encoding="utf-8") as f:
+                    f.write(begin + body)
+                compiled = pdflatex(["-fmt=" + fmt, "-jobname=" + key, "-output-directory=" + tmp,
+                                     os.path.join(tmp, key + ".tex")], cache) and os.path.exists(pdf)
+            if not compiled:
+                with open(os.path.join(tmp, key + ".tex"), "w", encoding="utf-8") as f:
+                    f.write(tex)
+                compiled = pdflatex([key + ".tex"], tmp) and os.path.exists(pdf)
+            if not compiled:
+                return False
+            os.replace(pdf, path_cached)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        evict(cache)
+    else:
+        os.utime(path_cached)
+    shutil.copyfile(path_cached, path)
+    return True
+
+
+def preamble_format(preamble, cache):
+    """
+    Compile a preamble into a format file (with `pdflatex -ini` and `\\dump`), once for each preamble.
+    A preamble that cannot be precompiled is marked as such, and tried again after `failure_expiry` seconds.
+
+    @param preamble: the LaTeX code of the preamble, from the document class up to the beginning of the document
+    @type preamble: str
+    @param cache: the directory to store the format file in
+    @type cache: str
+    @return: the name of the format in the directory, or None if the preamble cannot be precompiled
+    @rtype: str
+    """
+    name = "preamble_" + hashlib.sha256(preamble.encode("utf-8")).hexdigest()[:16]
+    try:
+        # mark the format as recently used (see `evict`)
+        os.utime(os.path.join(cache, name + ".fmt"))
+        return name
+    except OSError:
+        pass
+    failed = os.path.join(cache, name + ".failed")
+    if os.path.exists(failed):
+        # a failure may have been transient: try again once it has expired
+        if time.time() - os.path.getmtime(failed) < failure_expiry:
+            return None
+        try:
+            os.remove(failed)
+        except OSError:
+            pass
+    # build under a temporary name, so that concurrent compilations never use a partial format
+    tmp = name + "_" + str(os.getpid()) + "_" + str(id(preamble))
+    with open(os.path.join(cache, tmp + ".tex"), "w", encoding="utf-8") as f:
+        f.write(preamble + "\n\\dump\n")
+    built = pdflatex(["-ini", "-jobname=" + tmp, "&pdflatex", tmp + ".tex"], cache) and \
+            os.path.exists(os.path.join(cache, tmp + ".fmt"))
+    if built:
+        os.replace(os.path.join(cache, tmp + ".fmt"), os.path.join(cache, name + ".fmt"))
+    elif shutil.which("pdflatex"):
+        # remember that this preamble cannot be dumped (but not that pdflatex is missing)
+        open(os.path.join(cache, name + ".failed"), "w").close()
+    for ext in [".tex", ".log", ".fmt"]:
+        if os.path.exists(os.path.join(cache, tmp + ext)):
+            os.remove(os.path.join(cache, tmp + ext))
+    return name if built else None
+
+
+def evict(cache, max_size=None):
+    """
+    Remove the least recently used files from a cache directory of PDF files and formats
+    until it is at most 90% full, if it is bigger than its maximum size.
+
+    @param cache: the directory
+    @type cache: str
+    @param max_size: the maximum total size of the files in bytes (default: `latex_cache_size`)
+    @type max_size: int
+    """
+    max_size = max_size or latex_cache_size
+    entries = []
+    for name in os.listdir(cache):
+        path = os.path.join(cache, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if os.path.isfile(path):
+            entries.append((stat.st_mtime, stat.st_size, path))
+    size = sum([size for mtime, size, path in entries])
+    if size <= max_size:
+        return
+    for mtime, entry_size, path in sorted(entries):
+        if size <= 0.9 * max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        size -= entry_size
+
+
+def pdflatex(args, cwd):
+    # run pdflatex without interaction; True iff it succeeded
+    try:
+        return run(["pdflatex", "-halt-on-error", "-interaction=batchmode"] + args,
+                   cwd=cwd, stdout=DEVNULL, stderr=STDOUT).returncode == 0
+    except OSError:
+        return False
+
+
+def compile_many(texs, paths, jobs=None, cache=None):
+    """
+    Compile several LaTeX documents to PDF files in parallel.
+
+    @param texs: the LaTeX code of the documents
+    @type texs: list[str]
+    @param paths: the paths of the PDF files to write
+    @type paths: list[str]
+    @param jobs: the number of compilations to run at the same time (default: the number of processors)
+    @type jobs: int
+    @param cache: the directory of the cached PDF files and formats, as for `compile_latex`
+    @type cache: str
+    @return: for each document, whether the PDF file was written
+    @rtype: list[bool]
+    """
+    # compile the preambles first, so that parallel compilations do not build the same format
+    cache = cache or latex_cache()
+    os.makedirs(cache, exist_ok=True)
+    for preamble in dict.fromkeys([tex.partition("\\begin{document}")[0] for tex in texs]):
+        preamble_format(preamble, cache)
+    # pdflatex runs in its own process, so threads suffice
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        return list(pool.map(lambda args: compile_latex(*args, cache=cache), zip(texs, paths)))
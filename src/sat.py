@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Propositional proof search and model generation with a CDCL SAT solver.
+"""
+
+from expr import *
+from structure import *
+from exec_helpers import *
+from cnf import *
+
+import os
+from heapq import heappush, heappop, heapify
+
+
+class Solver:
+    """
+    A conflict-driven clause learning (CDCL) SAT solver for clauses over integer literals,
+    as produced by `cnf.tseitin`:
+    Variables are numbered from 1; the literal k stands for the k-th variable and -k for its negation.
+
+    The solver uses
+      - two watched literals per clause for unit propagation,
+      - first-UIP conflict analysis with learned clause minimization,
+      - VSIDS decision heuristics with phase saving,
+      - restarts after a Luby sequence of conflicts,
+      - periodic deletion of learned clauses.
+
+    Clauses can be added between calls of `solve`, e.g. to block models already found.
+
+    @attr num_vars: the number of variables
+    @type num_vars: int
+    @attr clauses: the original and learned clauses (None for deleted clauses);
+                   the literals at position 0 and 1 of each clause are the watched ones,
+                   and the clause that implied a literal has it at position 0
+    @type clauses: list[list[int]]
+    @attr watches: the clauses watching each literal, indexed by `Solver.index`
+    @type watches: list[list[int]]
+    @attr assign: the truth value of each variable (1 true, -1 false, 0 unassigned)
+    @type assign: list[int]
+    @attr level: the decision level at which each variable was assigned
+    @type level: list[int]
+    @attr reason: the clause that implied each variable (None for decisions)
+    @type reason: list[int]
+    @attr trail: the assigned literals in order of assignment
+    @type trail: list[int]
+    @attr trail_lim: the positions in the trail where each decision level starts
+    @type trail_lim: list[int]
+    @attr model: the satisfying assignment found by the last successful call of `solve`
+    @type model: dict[int,bool]
+    """
+
+    luby_unit = 100  # number of conflicts in one unit of the restart sequence
+    var_decay = 0.95
+
+    def __init__(self, clauses=[], num_vars=0):
+        self.num_vars = 0
+        self.clauses = []
+        self.learnts = []
+        self.max_learnts = 1000
+        self.watches = [[], []]
+        self.assign = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.polarity = [-1]
+        self.activity = [0.0]
+        self.var_inc = 1.0
+        self.heap = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.ok = True
+        self.model = {}
+        self.conflicts, self.decisions, self.propagations = 0, 0, 0
+        self.new_vars(num_vars)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    @staticmethod
+    def index(lit):
+        return 2 * lit if lit > 0 else -2 * lit + 1
+
+    def value(self, lit):
+        return self.assign[lit] if lit > 0 else -self.assign[-lit]
+
+    def new_vars(self, n):
+        """
+        Make sure the solver has at least n variables.
+        """
+        for v in range(self.num_vars + 1, n + 1):
+            self.watches += [[], []]
+            self.assign.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.polarity.append(-1)
+            self.activity.append(0.0)
+            heappush(self.heap, (0.0, v))
+        self.num_vars = max(self.num_vars, n)
+
+    def add_clause(self, lits):
+        """
+        Add a clause.
+
+        @param lits: the literals of the clause
+        @type lits: Iterable[int]
+        @return: False iff the clauses have become unsatisfiable
+        @rtype: bool
+        """
+        if not self.ok:
+            return False
+        self.cancel(0)
+        clause = list(dict.fromkeys(lits))
+        self.new_vars(max([abs(lit) for lit in clause], default=0))
+        # simplify the clause wrt. the assignments at the top level
+        if any(-lit in clause or self.value(lit) == 1 for lit in clause):
+            return True
+        clause = [lit for lit in clause if self.value(lit) == 0]
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause, learnt=False):
+        ci = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[self.index(clause[0])].append(ci)
+        self.watches[self.index(clause[1])].append(ci)
+        if learnt:
+            self.learnts.append(ci)
+        return ci
+
+    def enqueue(self, lit, reason):
+        v = abs(lit)
+        self.assign[v] = 1 if lit > 0 else -1
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Unit propagation over the watched literals.
+
+        @return: the index of a conflicting clause, or None if there is no conflict
+        @rtype: int
+        """
+        clauses, watches, assign, index = self.clauses, self.watches, self.assign, self.index
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            ws = watches[index(false_lit)]
+            watches[index(false_lit)] = kept = []
+            for k, ci in enumerate(ws):
+                c = clauses[ci]
+                if c is None:  # deleted clause
+                    continue
+                if c[0] == false_lit:
+                    c[0], c[1] = c[1], c[0]
+                first = c[0]
+                val_first = assign[first] if first > 0 else -assign[-first]
+                if val_first == 1:
+                    kept.append(ci)
+                    continue
+                # look for a new literal to watch
+                for m in range(2, len(c)):
+                    lit = c[m]
+                    if (assign[lit] if lit > 0 else -assign[-lit]) != -1:
+                        c[1], c[m] = lit, false_lit
+                        watches[index(lit)].append(ci)
+                        break
+                else:
+                    kept.append(ci)
+                    if val_first == -1:
+                        kept += ws[k + 1:]
+                        self.qhead = len(self.trail)
+                        return ci
+                    self.enqueue(first, ci)
+        return None
+
+    def analyze(self, confl):
+        """
+        First-UIP conflict analysis.
+
+        @param confl: the index of the conflicting clause
+        @type confl: int
+        @return: the learned clause (with the asserting literal first and a literal of the
+                 backjump level second) and the level to backjump to
+        @rtype: tuple[list[int],int]
+        """
+        level, reason, clauses, trail = self.level, self.reason, self.clauses, self.trail
+        current = len(self.trail_lim)
+        learnt = [0]
+        seen = set()
+        counter = 0
+        p = None
+        i = len(trail) - 1
+        c = clauses[confl]
+        while True:
+            for q in (c if p is None else c[1:]):
+                v = abs(q)
+                if v not in seen and level[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if level[v] == current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while abs(trail[i]) not in seen:
+                i -= 1
+            p = trail[i]
+            i -= 1
+            counter -= 1
+            if not counter:
+                break
+            c = clauses[reason[abs(p)]]
+        learnt[0] = -p
+
+        # minimize: drop literals implied by other literals of the clause
+        in_learnt = {abs(q) for q in learnt}
+        learnt = [learnt[0]] + [q for q in learnt[1:]
+                                if reason[abs(q)] is None or
+                                any(abs(r) not in in_learnt and level[abs(r)] > 0
+                                    for r in clauses[reason[abs(q)]][1:])]
+
+        # move a literal of the highest remaining level to the second position
+        if len(learnt) == 1:
+            return learnt, 0
+        j = max(range(1, len(learnt)), key=lambda j: level[abs(learnt[j])])
+        learnt[1], learnt[j] = learnt[j], learnt[1]
+        return learnt, level[abs(learnt[1])]
+
+    def bump(self, v):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            # rescale to avoid overflow
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.var_inc *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, self.num_vars + 1) if not self.assign[u]]
+            heapify(self.heap)
+        elif not self.assign[v]:
+            heappush(self.heap, (-self.activity[v], v))
+
+    def cancel(self, level):
+        """
+        Undo all assignments above a decision level.
+        """
+        if len(self.trail_lim) > level:
+            start = self.trail_lim[level]
+            for lit in self.trail[start:]:
+                v = abs(lit)
+                self.polarity[v] = self.assign[v]
+                self.assign[v] = 0
+                self.reason[v] = None
+                heappush(self.heap, (-self.activity[v], v))
+            del self.trail[start:]
+            del self.trail_lim[level:]
+            self.qhead = len(self.trail)
+
+    def pick(self):
+        """
+        The unassigned variable with the highest activity, or 0 if all variables are assigned.
+        """
+        while self.heap:
+            a, v = heappop(self.heap)
+            if not self.assign[v] and -a == self.activity[v]:
+                return v
+        return 0
+
+    def reduce(self):
+        """
+        Delete the older half of the learned clauses, except binary ones and those currently implying a literal.
+        """
+        locked = {self.reason[abs(lit)] for lit in self.trail}
+        keep = len(self.learnts) // 2
+        deleted = set()
+        for ci in self.learnts[:keep]:
+            if len(self.clauses[ci]) > 2 and ci not in locked:
+                self.clauses[ci] = None
+                deleted.add(ci)
+        self.learnts = [ci for ci in self.learnts if ci not in deleted]
+        self.watches = [[ci for ci in ws if ci not in deleted] for ws in self.watches]
+        self.max_learnts = int(self.max_learnts * 1.1)
+
+    @staticmethod
+    def luby(i):
+        """
+        The i-th element (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, ...
+        """
+        size, seq = 1, 0
+        while size < i + 1:
+            seq += 1
+            size = 2 * size + 1
+        while size - 1 != i:
+            size = (size - 1) >> 1
+            seq -= 1
+            i = i % size
+        return 1 << seq
+
+    def solve(self):
+        """
+        Search for a satisfying assignment of the clauses.
+
+        @return: True iff the clauses are satisfiable (the assignment is then stored in `model`)
+        @rtype: bool
+        """
+        self.model = {}
+        if not self.ok:
+            return False
+        self.cancel(0)
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+        restarts = 0
+        budget = self.luby(restarts) * self.luby_unit
+        while True:
+            confl = self.propagate()
+            if confl is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, backjump = self.analyze(confl)
+                self.cancel(backjump)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt, True))
+                self.var_inc /= self.var_decay
+            else:
+                if budget <= 0:
+                    restarts += 1
+                    budget = self.luby(restarts) * self.luby_unit
+                    self.cancel(0)
+                if len(self.learnts) - len(self.trail) >= self.max_learnts:
+                    self.reduce()
+                v = self.pick()
+                if not v:
+                    self.model = {v: self.assign[v] == 1 for v in range(1, self.num_vars + 1)}
+                    self.cancel(0)
+                    return True
+                self.decisions += 1
+                self.trail_lim.append(len(self.trail))
+                self.enqueue(v if self.polarity[v] > 0 else -v, None)
+
+
+class Sat:
+    """
+    Propositional proof search and (counter)model generation by reduction to satisfiability:
+    The premises together with the (negated) conclusion are converted into clauses by the Tseitin transformation
+    and handed to the CDCL solver.
+    An inference is valid iff the premises together with the negated conclusion are unsatisfiable,
+    and every satisfying assignment is a countermodel.
+    """
+
+    def __init__(self, conclusion=None, premises=[],
+                 validity=True, satisfiability=True,
+                 num_models=1, latex=True, silent=False, gui=None):
+        self.mode = {"validity": validity, "satisfiability": satisfiability}
+        self.num_models = num_models
+        self.latex = latex
+        self.silent = silent
+        self.gui = gui
+        if not self.gui:
+            self.gui = __import__("output").default_output()
+
+        # without a conclusion, proof search and countermodel generation are for the inconsistency of the premises,
+        # and model generation is for their consistency
+        self.conclusion = conclusion
+        self.premises = premises
+        self.negated_concl = validity or not satisfiability
+        self.fmls = self.premises + ([] if self.conclusion is None else
+                                     [Neg(self.conclusion) if self.negated_concl else self.conclusion])
+
+        # run the solver
+        with SleepInhibitor("computing a tableau"), PerformanceHolder("computing a tableau"), Timer() as self.timer:
+            self.clauses = tseitin(*self.fmls)
+            self.solver = Solver(self.clauses, self.clauses.num_vars)
+            self.models = []
+            names = sorted(self.clauses.ids)
+            while len(self.models) < max(self.num_models, 1) and self.solver.solve():
+                val = {p: self.solver.model[self.clauses.ids[p]] for p in names}
+                self.models.append(PropStructure("S" + str(len(self.models) + 1), val))
+                # block the model found to get a different one
+                self.solver.add_clause([-self.clauses.ids[p] if val[p] else self.clauses.ids[p] for p in names])
+        if not self.silent:
+            self.show()
+
+    def satisfiable(self):
+        """
+        Whether the premises together with the (negated) conclusion are satisfiable.
+        """
+        return bool(self.models)
+
+    def valid(self):
+        """
+        Whether the inference from the premises to the conclusion is valid.
+        """
+        return self.negated_concl and not self.models
+
+    def show(self):
+        """
+        Print the result and the (counter)models.
+        """
+        res = ""
+        if self.latex:
+            res += "\\documentclass[varwidth=1682mm, varheight, border=1cm]{standalone}\n\n"
+            path_preamble = os.path.join(os.path.dirname(__file__), "preamble.tex")
+            with open(path_preamble) as f:
+                res += f.read()
+            res += "\n\\begin{document}\n"
+        nl = "\\\\\n" if self.latex else "\n"
+        fml = (lambda f: "$" + f.tex() + "$") if self.latex else str
+
+        # print usage info
+        res += "You are using SAT solving for " + \
+               ("proof search" if self.mode["validity"] else
+                ("model" if self.mode["satisfiability"] else "countermodel") + " generation") + \
+               " for classical propositional logic." + nl + nl
+        if self.mode["satisfiability"] and not self.mode["validity"]:
+            res += ", ".join([fml(f) for f in self.premises + ([self.conclusion] if self.conclusion is not None else [])])
+        else:
+            res += ", ".join([fml(p) for p in self.premises]) + (" " if self.premises else "") + \
+                   (("$\\vdash$" if self.latex else "⊢") if self.mode["validity"] else
+                    ("$\\nvdash$" if self.latex else "⊬")) + " " + \
+                   fml(self.conclusion if self.conclusion is not None else Falsum())
+        res += " (" + str(self.clauses.num_vars) + " variables, " + str(len(self.clauses)) + " clauses)" + nl + nl
+
+        # print result
+        subj = "inference" if self.premises else "sentence"
+        if self.mode["validity"] or not self.mode["satisfiability"]:
+            res += "The " + subj + " is " + ("valid." if self.valid() else "invalid.") + nl + nl
+        else:
+            res += "The " + ("theory" if self.premises else "sentence") + " is " + \
+                   ("satisfiable." if self.satisfiable() else "unsatisfiable.") + nl + nl
+
+        # print models
+        if self.models:
+            res += ("Models:" if self.mode["satisfiability"] and not self.mode["validity"] else "Countermodels:") + \
+                   nl + ("\n" if not self.latex else "")
+            if self.latex:
+                res += "\\renewcommand{\\arraystretch}{1}\n"
+                res += "\\setlength{\\tabcolsep}{1.5pt}\n"
+            for model in self.models:
+                res += (model.tex() + "\\ \\\\\n\\ \\\\\n") if self.latex else (str(model) + "\n")
+            res += "\n"
+
+        # measure size and time
+        if self.timer:
+            if self.latex:
+                res += "\\ \\\\\n"
+            res += "This computation took " + str(round(self.timer.elapsed, 4)) + " seconds, " + \
+                   str(self.solver.decisions) + " decisions and " + str(self.solver.conflicts) + " conflicts.\n\n"
+        if self.latex:
+            res += "\\end{document}\n"
+
+        self.gui.write_output(res, self.latex)
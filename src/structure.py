@@ -18,8 +18,8 @@ sort_i_w = lambda kv: (  # sort interpretation functions by ...
         sort_type(kv[1][list(kv[1])[0]]),  # type (1. constants, 2. functions, 3. predicates)
         sort_val(kv[1][list(kv[1])[0]]),  # valency (shorter tuples first)
         kv[0])  # name of the symbol (alphabetical)
-sort_type = lambda v: {str: 1, dict: 2, set: 3}[type(v)]
-sort_val = lambda v: len(list(v)[0]) if v and type(v) in [set, dict] else 0
+sort_type = lambda v: 1 if isinstance(v, str) else 2 if isinstance(v, dict) else 3
+sort_val = lambda v: len(next(iter(v))) if v and not isinstance(v, str) else 0
 
 
 class Structure:
@@ -44,6 +44,40 @@ class Structure:
     def text(self, s):
         return "\\text{" + str(s) + "}"
 
+    def facts(self):
+        """
+        The structure as a relational structure:
+        its elements (individuals as ("d", name) and worlds or states as ("w", name))
+        and the facts about them, as pairs of a label (such as ("pred", "P")) and a tuple of elements.
+
+        @rtype: tuple[set[tuple[str,str]],set[tuple[tuple[str,...],tuple[tuple[str,str],...]]]]
+        """
+        raise NotImplementedError
+
+    def canonical(self, names=()):
+        """
+        A canonical form of the structure:
+        Two structures of the same kind have the same canonical form iff they are isomorphic,
+        i.e. iff they differ only in the names of their individuals, worlds or states.
+        The elements are first partitioned by colour refinement (see `refine`),
+        and the remaining ties are broken by canonical labelling (see `label`).
+
+        @param names: the individuals that are named by constants, and thus keep their names
+        @type names: Iterable[str]
+        @return: the kind of the structure, the kinds of its elements and its facts, in terms of the labels
+        @rtype: tuple
+        """
+        elements, facts = self.facts()
+        elements = set(elements) | {e for fact in facts for e in fact[1]}
+        names = set(names)
+        kinds = {e: (e[0], e[1] if e[0] == "d" and e[1] in names else "") for e in elements}
+        occurrences = {e: [] for e in elements}
+        for fact in facts:
+            for pos, e in enumerate(fact[1]):
+                occurrences[e].append((fact[0], pos, fact[1]))
+        colours = refine(rank(kinds), occurrences)
+        return (type(self).__name__,) + label(colours, kinds, set(facts), occurrences)
+
 
 class PropStructure(Structure):
     """
@@ -62,6 +96,9 @@ class PropStructure(Structure):
         self.s = s
         self.v = v
 
+    def facts(self):
+        return set(), {(("val", p, str(value)), ()) for p, value in self.v.items()}
+
     def __str__(self):
         suffix = self.s.removeprefix("S") if self.s[-1].isdigit() else ""
         s, v = self.s, "V" + suffix
@@ -142,6 +179,10 @@ class PredStructure(Structure):
         self.d = d
         self.i = i
 
+    def facts(self):
+        return {("d", a) for a in self.d}, \
+               {fact for sym, val in self.i.items() for fact in interpretation_facts(sym, val)}
+
     def __str__(self):  # todo sort interpretation by type and arity of symbol
         suffix = self.s.removeprefix("S") if self.s[-1].isdigit() else ""
         s, d, i = self.s, "D" + suffix, "I" + suffix
@@ -181,6 +222,259 @@ class PredStructure(Structure):
                 .replace("\\set{}", "\\emptyset{}")
 
 
+class ColumnarPredStructure(PredStructure):
+    """
+    A structure of predicate logic in columnar format, for very large models.
+
+    The individuals are interned to integer ids (their position in the sorted domain),
+    and the denotations of predicates are stored as NumPy arrays over these ids:
+      - 0-place predicates as a single truth value,
+      - 1-place predicates as a bitmap with one bit per individual,
+      - n-place predicates as a sorted array of tuple keys,
+        where the key of ⟨a1, ..., an⟩ is id(a1) * |D|^(n-1) + ... + id(an).
+    Constants and function symbols are interpreted as in PredStructure.
+
+    The denotation of a predicate can be specified either as a set of tuples of individuals, as in PredStructure,
+    or as an integer array of shape (m, n) holding the ids of m tuples.
+
+    The domain and interpretation function behave like those of PredStructure
+    (iteration, membership, `len`), so the structure can be used for `denot`, `str` and `tex` as usual.
+
+    The structure can be saved to and loaded from a binary file with `save` and `load`,
+    where loading maps the arrays into memory with `numpy.memmap` rather than reading them.
+
+    @attr s: the name of the structure (such as "M1")
+    @type s: str
+    @attr names: the individuals of the domain, indexed by id
+    @type names: list[str]
+    @attr ids: the ids of the individuals of the domain
+    @type ids: dict[str,int]
+    @attr d: the domain of discourse
+    @type d: KeysView[str]
+    @attr i: the interpretation function assigning denotations to the non-logical symbols
+    @type i: dict[str,Any]
+    """
+
+    magic = b"PYPLCOL1"
+
+    def __init__(self, s, d, i):
+        np = __import__("numpy")
+        self.s = s
+        self.names = sorted(d)
+        self.ids = {a: n for (n, a) in enumerate(self.names)}
+        self.d = self.ids.keys()
+        self.i = {}
+        for key, val in i.items():
+            if isinstance(val, str) or isinstance(val, dict):
+                self.i[key] = val
+            elif isinstance(val, np.ndarray):
+                self.i[key] = Relation.from_ids(self, val)
+            else:
+                self.i[key] = Relation.from_tuples(self, val)
+
+    @classmethod
+    def from_structure(cls, s):
+        """
+        Convert a predicate logic structure into columnar format.
+
+        @param s: the structure to convert
+        @type s: PredStructure
+        @rtype: ColumnarPredStructure
+        """
+        return cls(s.s, s.d, s.i)
+
+    def save(self, path):
+        """
+        Write the structure to a binary file.
+
+        The file consists of a magic number, the length of a JSON header, the header itself
+        (name, individuals, constants, functions and the layout of the relations)
+        and the raw arrays of the relations, each aligned to 8 bytes.
+
+        @param path: the path of the file to write
+        @type path: str
+        """
+        json = __import__("json")
+        np = __import__("numpy")
+        relations, arrays, offset = {}, [], 0
+        for key, val in self.i.items():
+            if isinstance(val, Relation):
+                relations[key] = {"arity": val.arity, "kind": val.kind, "value": val.value,
+                                  "dtype": str(val.data.dtype), "offset": offset, "length": len(val.data)}
+                arrays.append(val.data)
+                offset += -(-val.data.nbytes // 8) * 8
+        header = json.dumps({
+                "s": self.s,
+                "names": self.names,
+                "constants": {key: val for key, val in self.i.items() if isinstance(val, str)},
+                "functions": {key: [[*args, val2] for args, val2 in val.items()]
+                              for key, val in self.i.items() if isinstance(val, dict)},
+                "relations": relations
+        }).encode("utf-8")
+        header += b" " * (-len(header) % 8)
+        with open(path, "wb") as f:
+            f.write(self.magic)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for data in arrays:
+                f.write(np.ascontiguousarray(data).tobytes())
+                f.write(b"\0" * (-data.nbytes % 8))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a structure from a binary file written by `save`.
+        The relations are memory-mapped read-only rather than read into memory.
+
+        @param path: the path of the file to read
+        @type path: str
+        @rtype: ColumnarPredStructure
+        """
+        json = __import__("json")
+        np = __import__("numpy")
+        with open(path, "rb") as f:
+            if f.read(len(cls.magic)) != cls.magic:
+                raise ValueError("not a columnar structure file: " + str(path))
+            len_header = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(len_header).decode("utf-8"))
+        start = len(cls.magic) + 8 + len_header
+
+        self = cls.__new__(cls)
+        self.s = header["s"]
+        self.names = header["names"]
+        self.ids = {a: n for (n, a) in enumerate(self.names)}
+        self.d = self.ids.keys()
+        self.i = dict(header["constants"])
+        for key, val in header["functions"].items():
+            self.i[key] = {tuple(entry[:-1]): entry[-1] for entry in val}
+        for key, val in header["relations"].items():
+            data = np.memmap(path, dtype=val["dtype"], mode="r", offset=start + val["offset"],
+                             shape=(val["length"],)) \
+                if val["length"] else np.zeros(0, dtype=val["dtype"])
+            self.i[key] = Relation(self, val["arity"], val["kind"], data, val["value"])
+        return self
+
+
+class Relation:
+    """
+    The denotation of a predicate in a columnar structure:
+    A set of tuples of individuals backed by a NumPy array over the individuals' ids.
+
+    @attr structure: the structure the relation belongs to
+    @type structure: ColumnarPredStructure
+    @attr arity: the number of places of the predicate (None if the relation is empty and the arity unknown)
+    @type arity: int
+    @attr kind: the storage format ("bool", "bitmap" or "keys")
+    @type kind: str
+    @attr data: the bitmap or sorted keys
+    @type data: numpy.ndarray
+    @attr value: the truth value of a 0-place predicate
+    @type value: bool
+    """
+
+    def __init__(self, structure, arity, kind, data, value=False):
+        self.structure = structure
+        self.arity = arity
+        self.kind = kind
+        self.data = data
+        self.value = value
+
+    @classmethod
+    def from_tuples(cls, structure, tuples):
+        """
+        Build a relation from a set of tuples of individuals.
+        """
+        np = __import__("numpy")
+        tuples = list(tuples)
+        arity = len(tuples[0]) if tuples else None
+        ids = np.array([[structure.ids[a] for a in tpl] for tpl in tuples], dtype=np.int64)\
+            .reshape(len(tuples), arity or 0)
+        return cls.from_ids(structure, ids, arity)
+
+    @classmethod
+    def from_ids(cls, structure, ids, arity=None):
+        """
+        Build a relation from an array of shape (m, n) of individual ids.
+        """
+        np = __import__("numpy")
+        ids = np.asarray(ids, dtype=np.int64)
+        if arity is None and ids.size:
+            arity = ids.shape[1]
+        size = len(structure.names)
+        if arity is None:
+            return cls(structure, None, "keys", np.zeros(0, dtype=np.int64))
+        if arity == 0:
+            return cls(structure, 0, "bool", np.zeros(0, dtype=np.uint8), bool(len(ids)))
+        if arity == 1:
+            bits = np.zeros(size, dtype=np.uint8)
+            bits[ids[:, 0]] = 1
+            return cls(structure, 1, "bitmap", np.packbits(bits, bitorder="little"))
+        if size ** arity >= 2 ** 63:
+            raise ValueError("domain too large to store " + str(arity) + "-place relations as keys")
+        powers = np.array([size ** (arity - 1 - k) for k in range(arity)], dtype=np.int64)
+        return cls(structure, arity, "keys", np.unique(ids @ powers))
+
+    def key(self, tpl):
+        """
+        The key of a tuple of individuals, or None if the tuple is not over the domain.
+        """
+        if len(tpl) != self.arity:
+            return None
+        ids = self.structure.ids
+        size = len(ids)
+        key = 0
+        for a in tpl:
+            if a not in ids:
+                return None
+            key = key * size + ids[a]
+        return key
+
+    def __contains__(self, tpl):
+        key = self.key(tpl)
+        if key is None:
+            return False
+        if self.kind == "bool":
+            return self.value
+        if self.kind == "bitmap":
+            return bool((int(self.data[key >> 3]) >> (key & 7)) & 1)
+        np = __import__("numpy")
+        pos = int(np.searchsorted(self.data, key))
+        return pos < len(self.data) and int(self.data[pos]) == key
+
+    def __iter__(self):
+        np = __import__("numpy")
+        names = self.structure.names
+        if self.kind == "bool":
+            if self.value:
+                yield ()
+        elif self.kind == "bitmap":
+            bits = np.unpackbits(self.data, bitorder="little")[:len(names)]
+            for n in np.flatnonzero(bits):
+                yield (names[n],)
+        else:
+            size = len(names)
+            for key in self.data:
+                key = int(key)
+                tpl = []
+                for _ in range(self.arity):
+                    key, n = divmod(key, size)
+                    tpl.append(names[n])
+                yield tuple(tpl[::-1])
+
+    def __len__(self):
+        if self.kind == "bool":
+            return int(self.value)
+        if self.kind == "bitmap":
+            return int(__import__("numpy").unpackbits(self.data).sum())
+        return len(self.data)
+
+    def __eq__(self, other):
+        return set(self) == set(other)
+
+    def __repr__(self):
+        return repr(set(self))
+
+
 class ModalStructure(Structure):
     """
     A modal of (modal) predicate logic.
@@ -244,6 +538,11 @@ class PropModalStructure(ModalStructure):
         self.r = r
         self.v = v
 
+    def facts(self):
+        return {("w", w) for w in self.w}, \
+               {(("acc",), (("w", w), ("w", v))) for w, v in self.r} | \
+               {(("val", p, str(value)), (("w", w),)) for p, values in self.v.items() for w, value in values.items()}
+
     def __str__(self):
         suffix = self.s.removeprefix("S") if self.s[-1].isdigit() else ""
         s, w, r, v = self.s, "W" + suffix, "R" + suffix, "V" + suffix
@@ -344,6 +643,12 @@ class ConstModalStructure(ModalStructure):
         self.d = d
         self.i = i
 
+    def facts(self):
+        return {("w", w) for w in self.w} | {("d", a) for a in self.d}, \
+               {(("acc",), (("w", w), ("w", v))) for w, v in self.r} | \
+               {fact for sym, vals in self.i.items() for w, val in vals.items()
+                for fact in interpretation_facts(sym, val, (("w", w),))}
+
     def __str__(self):
         suffix = self.s.removeprefix("S") if self.s[-1].isdigit() else ""
         s, w, r, d, i = self.s, "W" + suffix, "R" + suffix, "D" + suffix, "I" + suffix
@@ -473,6 +778,13 @@ class VarModalStructure(ModalStructure):
         self.d = d
         self.i = i
 
+    def facts(self):
+        return {("w", w) for w in self.w}, \
+               {(("acc",), (("w", w), ("w", v))) for w, v in self.r} | \
+               {(("dom",), (("w", w), ("d", a))) for w, d in self.d.items() for a in d} | \
+               {fact for sym, vals in self.i.items() for w, val in vals.items()
+                for fact in interpretation_facts(sym, val, (("w", w),))}
+
     def __str__(self):
         suffix = self.s.removeprefix("S") if self.s[-1].isdigit() else ""
         s, w, r, d, i = self.s, "W" + suffix, "R" + suffix, "D" + suffix, "I" + suffix
@@ -661,6 +973,11 @@ class KripkePropStructure(KripkeStructure):
         self.r = r
         self.v = v
 
+    def facts(self):
+        return {("w", k) for k in self.k}, \
+               {(("acc",), (("w", k), ("w", l))) for k, l in self.r} | \
+               {(("val", p, str(value)), (("w", k),)) for p, values in self.v.items() for k, value in values.items()}
+
     def __str__(self):
         suffix = self.s.removeprefix("S") if self.s[-1].isdigit() else ""
         s, k, r, v = self.s, "K" + suffix, "R" + suffix, "V" + suffix
@@ -801,6 +1118,13 @@ class KripkePredStructure(KripkeStructure):
         self.d = d
         self.i = i
 
+    def facts(self):
+        return {("w", k) for k in self.k}, \
+               {(("acc",), (("w", k), ("w", l))) for k, l in self.r} | \
+               {(("dom",), (("w", k), ("d", a))) for k, d in self.d.items() for a in d} | \
+               {fact for sym, vals in self.i.items() for k, val in vals.items()
+                for fact in interpretation_facts(sym, val, (("w", k),))}
+
     def __str__(self):
         suffix = self.s.removeprefix("S") if self.s[-1].isdigit() else ""
         s, k, r, d, i = self.s, "K" + suffix, "R" + suffix, "D" + suffix, "I" + suffix
@@ -879,3 +1203,103 @@ class KripkePredStructure(KripkeStructure):
 
         return "\\begin{minipage}[T]{7cm}\n" + structure + "\n\\end{minipage}\n\\hspace{.75cm}\n" + \
             "\\begin{minipage}[T]{10cm}\n\\vspace{1em}\n" + graph + "\\end{minipage}\n"
+
+
+def interpretation_facts(sym, val, prefix=()):
+    """
+    The facts about the denotation of a non-logical symbol (see `Structure.facts`).
+
+    @param sym: the symbol
+    @type sym: str
+    @param val: its denotation: an individual, a function or a set of tuples of individuals
+    @type val: Any
+    @param prefix: the elements preceding the individuals in the facts (such as the world of the denotation)
+    @type prefix: tuple[tuple[str,str],...]
+    @rtype: Iterator[tuple[tuple[str,...],tuple[tuple[str,str],...]]]
+    """
+    if isinstance(val, str):
+        yield ("const", sym), prefix + (("d", val),)
+    elif isinstance(val, dict):
+        for args, value in val.items():
+            yield ("func", sym), prefix + tuple([("d", a) for a in args]) + (("d", value),)
+    else:
+        for tpl in val:
+            yield ("pred", sym), prefix + tuple([("d", a) for a in tpl])
+
+
+def rank(colours):
+    """
+    Replace colours by their rank among all colours,
+    so that the new colours are independent of the names of the elements if the old ones are.
+
+    @param colours: the colours of the elements
+    @type colours: dict[Any,Any]
+    @rtype: dict[Any,int]
+    """
+    ranks = {colour: n for n, colour in enumerate(sorted(set(colours.values())))}
+    return {e: ranks[colour] for e, colour in colours.items()}
+
+
+def refine(colours, occurrences):
+    """
+    Colour refinement:
+    Repeatedly distinguish the elements of a colour by the facts they occur in
+    (with their position and the colours of the other elements in the fact),
+    until no more elements are distinguished.
+
+    @param colours: the initial colours of the elements
+    @type colours: dict[Any,int]
+    @param occurrences: the facts each element occurs in, with the label, the position of the element and the elements
+    @type occurrences: dict[Any,list[tuple[tuple[str,...],int,tuple]]]
+    @return: the stable colours
+    @rtype: dict[Any,int]
+    """
+    while True:
+        refined = rank({e: (colours[e], tuple(sorted([(lbl, pos, tuple([colours[a] for a in args]))
+                                                      for lbl, pos, args in occurrences[e]])))
+                        for e in colours})
+        if len(set(refined.values())) == len(set(colours.values())):
+            return refined
+        colours = refined
+
+
+def label(colours, kinds, facts, occurrences):
+    """
+    Canonical labelling:
+    If all elements have different colours, the colours are the labels,
+    and the result is the kinds of the elements and the facts in terms of the labels.
+    Otherwise, each element of the first colour shared by several elements is given a colour of its own in turn,
+    and the least result of refining and labelling the colours thus obtained is taken.
+    Of elements that can be swapped without changing the facts, only one needs to be tried.
+
+    @param colours: the stable colours of the elements
+    @type colours: dict[Any,int]
+    @param kinds: the initial colours of the elements
+    @type kinds: dict[Any,tuple[str,str]]
+    @param facts: the facts about the elements
+    @type facts: set[tuple[tuple[str,...],tuple]]
+    @param occurrences: the facts each element occurs in, as for `refine`
+    @type occurrences: dict[Any,list[tuple[tuple[str,...],int,tuple]]]
+    @rtype: tuple[tuple,tuple]
+    """
+    cells = {}
+    for e, colour in colours.items():
+        cells.setdefault(colour, []).append(e)
+    ties = [cell for colour, cell in sorted(cells.items()) if len(cell) > 1]
+    if not ties:
+        return (tuple(sorted([(colours[e], kinds[e]) for e in colours])),
+                tuple(sorted([(lbl, tuple([colours[a] for a in args])) for lbl, args in facts])))
+    tried = []
+    for e in ties[0]:
+        if any([swappable(e, f, facts) for f in tried]):
+            continue
+        tried.append(e)
+    return min([label(refine(rank({f: (colours[f], f != e) for f in colours}), occurrences),
+                      kinds, facts, occurrences)
+                for e in tried])
+
+
+def swappable(e, f, facts):
+    # whether swapping two elements is an automorphism
+    swap = {e: f, f: e}
+    return {(lbl, tuple([swap.get(a, a) for a in args])) for lbl, args in facts} == facts
@@ -41,8 +41,13 @@ from expr import *
 from parser import FmlParser
 from exec_helpers import *
 
+import copy
 import itertools
+import multiprocessing
 import os
+import pickle
+import queue
+import sys
 from datetime import datetime
 from itertools import chain
 from subprocess import DEVNULL, STDOUT, check_call
@@ -69,7 +74,9 @@ class Tableau(object):
                  num_models=1, size_limit_factor=2, sequent_style=False,
                  file=True, latex=True, stepwise=False, hide_nonopen=False,
                  underline_open=True, silent=False,
-                 gui=None):
+                 timeout=None, max_nodes=None, max_depth=None, max_memory=None, cancel=None,
+                 parallel=None, depth_first=False, backjumping=False, regularity=False, freevars=False,
+                 congruence=False, blocking=False, gui=None):
 
         # settings
         # todo nicer specification of settings?
@@ -91,10 +98,63 @@ class Tableau(object):
             num_models, size_limit_factor, sequent_style, silent, file, latex, \
             stepwise, hide_nonopen, underline_open  # todo support sequent style in gui
         self.num_branches = 1
+        # budgets: wall-clock time in seconds, number of nodes, length of branches, memory in megabytes,
+        # and a cancellation token with an `is_set` method
+        self.timeout, self.max_nodes, self.max_depth, self.max_memory, self.cancel = \
+            timeout, max_nodes, max_depth, max_memory, cancel
+        self.stop_reason = None  # the budget that stopped the expansion, if any
+        # parallel expansion: the number of worker processes to expand independent branches in
+        # (validity tableaus without depth-first expansion only; None or 1 for sequential expansion)
+        self.parallel = parallel
+        # depth-first expansion: expand one branch at a time and discard closed subtrees
+        # (so that neither the tree nor the steps are shown, as they are incomplete)
+        self.depth_first = depth_first
+        self.stepwise = self.stepwise and not self.depth_first
+        # the number of nodes counted towards the limits that are not in the tree
+        # (outside of the branch of a subtableau expanded in a worker, or discarded in depth-first expansion),
+        # and the highest line of the discarded nodes
+        self.num_outside = 0
+        self.last_line = 0
+        # dependency-directed backjumping: close the branches that a contradiction does not depend on;
+        # the branching rule applications are numbered,
+        # and the nodes record the ones they depend on as a bitset (see `Node.dependencies`)
+        self.backjumping = backjumping
+        self.num_splits = 0
+        self.split = 0  # the bit of the branching rule application being applied, if any
+        # regularity: skip rule applications that would only add formulas already on the branch;
+        # the formulas on the branches of the targets in the current step (see `occurs`),
+        # and the skipped applications (with the node they were first skipped at) and their number
+        self.regularity = regularity
+        self.formulas = dict()
+        self.skipped = set()
+        self.num_skipped = 0
+        # free-variable tableaus (validity tableaus in classical non-modal predicate logic):
+        # universal formulas are instantiated with fresh free variables X1, X2, ...,
+        # existential formulas containing free variables with Skolem terms sk1(...), sk2(...), ...,
+        # and branches are closed by unifying the terms of complementary atoms;
+        # the numbers of free variables and Skolem functions introduced,
+        # and the substitution applied to the free variables so far
+        self.freevars = freevars and validity and classical and not modal and not propositional
+        self.num_freevars, self.num_skolems = 0, 0
+        self.bindings = dict()
+        # congruence closure: close branches whose literals are contradictory modulo the equalities on the branch
+        # (see `Congruence`), instead of substituting equal terms in validity tableaus
+        self.congruence = congruence and not self.freevars
+        # blocking (in classical modal tableaus): don't introduce new worlds from a world
+        # whose formulas all hold in a world it was introduced from (see `blocked`),
+        # or for a formula in a world that already has one;
+        # the formulas of the worlds on the branches of the targets in the current step (see `branch_worlds`)
+        self.blocking = blocking and modal and classical
+        # with blocking, propositional modal proof search terminates, so the size limits are not needed
+        # (unlike model generation, which can keep introducing worlds for additional models)
+        self.limited = not (self.blocking and propositional and validity)
+        self.worlds = dict()
 
         self.appl = []  # list of applicable rules
         self.active = []  # list of active (used in the last step) formulas
         self.models = []  # generated models
+        # the canonical forms of the models, to discard isomorphic ones in model generation (see `add_model`)
+        self.model_keys = set()
 
         # append initial nodes
         line = 1
@@ -133,6 +193,12 @@ class Tableau(object):
                 # in all worlds
                 fmls[i] = AllWorlds(fmls[i])
 
+        # stepwise representation: for each step, the rule application leading to it
+        # (target, source, rule name, new nodes; None and [] for the initial step)
+        # and the sources of the rules applicable in it;
+        # the nodes themselves record the step in which they were added
+        self.log = []
+
         self.root = Node(None, self, line, ws[0], not negated_concl, fmls[0], rule, source, inst, len(premises + axioms) > 0)
         self.conclusion = conclusion if not isinstance(conclusion, tuple) else \
         conclusion[0]
@@ -149,15 +215,15 @@ class Tableau(object):
 
         for node in [self.root] + self.premises + self.axioms:
             node.context = [self.root] + self.premises + self.axioms
-        self.steps = []  # stepwise representation
 
         self.gui = gui
         if not self.gui:
-            self.gui = __import__("gui").PyPLGUI(True)
+            self.gui = __import__("output").default_output()
         
         # run the tableau
         print("Computing...")
         with SleepInhibitor("computing a tableau"), PerformanceHolder("computing a tableau"), Timer() as self.timer:
+            self.budget = Budget(self.timeout, self.max_nodes, self.max_memory, self.cancel)
             self.expand()
         if not self.silent:
             self.show()
@@ -166,7 +232,7 @@ class Tableau(object):
         return self.root.treestr()
 
     def __len__(self):
-        return max([int(node.line) for node in self.root.nodes() if node.line])
+        return max([int(node.line) for node in self.root.nodes() if node.line] + [self.last_line])
 
     def show(self):
         """
@@ -299,7 +365,10 @@ class Tableau(object):
         res += info
 
         # print the tableau
-        if not self.latex:
+        if self.depth_first:
+            res += "The closed subtrees were discarded in depth-first expansion." + \
+                   ("\\\\" if self.latex else "") + "\n\n"
+        elif not self.latex:
             res += self.root.treestr()
         else:
             res += self.root.treetex() + "\\ \\\\\n\\ \\\\\n\\ \\\\\n"
@@ -357,6 +426,9 @@ class Tableau(object):
                     result += "The " + (
                         "inference" if self.premises else "sentence") + " may " \
                                                                         "or may not be refutable."
+        if self.stop_reason:
+            result += ("\\\\" if self.latex else "") + "\n" + \
+                      "The computation was stopped early (" + self.stop_reason + ")."
         result += "\\\\\n\\\\\n" if self.latex else "\n\n"
         res += result
 
@@ -392,7 +464,9 @@ class Tableau(object):
                 round(self.timer.elapsed, 4)) + " seconds, " + \
                    str(self.num_branches) + " branch" + (
                        "es" if self.num_branches > 1 else "") + \
-                   " and " + str(len(self)) + " nodes.\n\n"
+                   " and " + str(len(self)) + " nodes" + \
+                   (" (" + str(self.num_skipped) + " redundant rule applications skipped)"
+                    if self.regularity else "") + ".\n\n"
 
         # # github link
         # url = "https://github.com/nclarius/pyPL"
@@ -418,9 +492,6 @@ class Tableau(object):
                   "ξ": "xi", "χ": "chi", "ο": "omicron", "u": "ypsilon",
                   "ω": "omega"  # intuitionistic rules
                   }
-    parameters = list("abcdefghijklmnopqrst") + ["c" + str(i) for i in
-                                                 range(1, 1000)]
-
     def applicable(self):
         """
         A prioritized list of applicable rules in the tree in the format
@@ -431,6 +502,8 @@ class Tableau(object):
         """
         # collect the applicable rules in the tree
         applicable = []
+        self.formulas = dict()
+        self.worlds = dict()
         # traverse all nodes that could be expandable
         for source in [node for node in self.root.nodes() if
                        not isinstance(node.fml, Pseudo)]:
@@ -460,6 +533,13 @@ class Tableau(object):
                     for target in targets:
                         branch = target.branch
                         if not any([applied(node) for node in branch]):
+                            # regularity: skip the application if it would only add formulas already on the branch,
+                            # or if one of its branches would
+                            if self.regularity and any([
+                                    all([self.occurs(target, source.world, *fml) for fml in side])
+                                    for side in ([fmls] if rule_type == "α" else [fmls[0::2], fmls[1::2]])]):
+                                self.skip(target, source, rule_name)
+                                continue
                             # whether or not the source is an instance of an
                             # implication
                             # whose antecedent does not occur on the target's
@@ -564,6 +644,17 @@ class Tableau(object):
                         else:
                             occurring_local = occurring_global
 
+                        # regularity: treat constants whose instance is already on the branch as used
+                        present = []
+                        if self.regularity and rule_type in ["γ", "θ", "η"]:
+                            sign, phi, var = fmls[0]
+                            present = [c for c in occurring_local if c not in used and self.occurs(
+                                    target, source.world, sign,
+                                    phi.subst(var, Const(c if "_" not in c else c[:c.index("_")])))]
+                            for c in present:
+                                self.skip(target, source, rule_name, c)
+                            used = used + present
+
                         # check if the rule requires a new constant to be
                         # instantiated,
                         # and whether this is not required by the rule type
@@ -593,7 +684,7 @@ class Tableau(object):
                             # yet to be instantiated;
                             # except there are no constants at all, then it
                             # may be applied with an arbitrary parameter
-                            if any([not any([node.inst[3] == c + (
+                            if any([c not in present and not any([node.inst[3] == c + (
                             "_" + str(source.world) if indexed else "")
                                              for node in branch if
                                              applied(node)]) for c in
@@ -684,8 +775,7 @@ class Tableau(object):
                             occurring_global = [1]
 
                         # additional worlds to use
-                        fresh = [i for i in range(1, 100) if
-                                 i not in occurring_global]
+                        fresh = Allocator(lambda i: i + 1, occurring_global)
 
                         # collect the signatures occurring in the branch that
                         # are accessible from the source world
@@ -733,6 +823,13 @@ class Tableau(object):
                         # todo not correctly reusing already introduced
                         #  accessible worlds
 
+                        # blocking: no new worlds from a world that is blocked,
+                        # or for a formula that already has one
+                        if self.blocking and new and rule_type in ["μ", "κ"] and \
+                                (self.blocked(target, source.world) is not None or
+                                 self.witnessed(target, source)):
+                            continue
+
                         if rule_type in ["μ"]:
                             # the rules can be applied with any new signature
                             # extension,
@@ -774,7 +871,7 @@ class Tableau(object):
                                               node.inst and len(node.inst) > 3 and
                                              applied(node)])
                                     for w in
-                                    extensions + fresh[:self.num_models - 1]]):
+                                    extensions + fresh.take(self.num_models - 1)]):
                                 applicable.append((target, source, rule_name,
                                                    rule_type, fmls, args,
                                                    insts))
@@ -824,10 +921,6 @@ class Tableau(object):
                         occurring_global = list(dict.fromkeys(
                                 [node.world for node in branch if node.world]))
 
-                        # additional worlds to use
-                        fresh = [i for i in range(1, 100) if
-                                 i not in occurring_global]
-
                         # collect the signatures occurring in the target's branch
                         # that are accessible from the source world
                         # including the reflexive and transitive closure
@@ -884,7 +977,7 @@ class Tableau(object):
                 # equality rule
                 elif rule_type in ["ζ"]:
                     tau, rho = fmls[0]
-                    if tau == rho:
+                    if tau == rho or self.congruence and self.mode["validity"]:
                         continue
                     universal, irrelevant, unneeded, new = False, False, False, False
 
@@ -942,7 +1035,7 @@ class Tableau(object):
                         # todo move mu and lambda conditions to block below?
                 if not isinstance(leaf.fml, Pseudo):
                     leaf.branch_open()
-                    self.models.append(self.model(leaf))
+                    self.add_model(leaf)
                 if self.mode["validity"]:
                     applicable = [appl for appl in applicable if
                                   appl[0] not in leaf.branch]
@@ -1069,6 +1162,180 @@ class Tableau(object):
         self.appl = appl_sorted
         return appl_sorted
 
+    def closers(self, leaf):
+        """
+        In free-variable tableaus, the ways to close the branch of a leaf under a substitution for the free variables:
+        the pairs of atoms on the branch that are complementary once their terms are unified
+        (or for a negated equality, the node itself twice, with the terms to make identical).
+
+        @param leaf: the leaf of the branch
+        @type leaf: Node
+        @return: the pairs of nodes with the sequences of terms to unify
+        @rtype: list[tuple[Node,Node,tuple[Term, ...],tuple[Term, ...]]]
+        """
+        res = []
+        atoms = []
+        for node in leaf.branch:
+            if isinstance(node.fml, Eq) and not node.sign and node.fml.freevars():
+                res.append((node, node, (node.fml.tau,), (node.fml.rho,)))
+            if isinstance(node.fml, Atm):
+                for other in atoms:
+                    if other.sign != node.sign and other.world == node.world and \
+                            other.fml.pred.p == node.fml.pred.p and (node.fml.freevars() or other.fml.freevars()):
+                        res.append((node, other, node.fml.terms, other.fml.terms))
+                atoms.append(node)
+        return res
+
+    def unifier(self):
+        """
+        In free-variable tableaus, a substitution for the free variables that closes all unfinished branches at once.
+        Free variables stand for the same term on all branches,
+        so a substitution closing only some of the branches could keep the others from being closed;
+        instead, the branches are kept open until the contradictions on all of them are unifiable together.
+
+        @return: the most general such substitution found, or None if there is none
+        @rtype: dict[str,Term]
+        """
+        options = []
+        for leaf in self.root.leaves(True):
+            closers = self.closers(leaf)
+            if not closers:
+                return None
+            options.append(closers)
+        if not options:
+            return None
+        # try the most constrained branches first
+        options.sort(key=len)
+
+        def search(i, subst):
+            # extend a substitution closing the first i branches to all branches
+            if i == len(options):
+                return subst
+            for node, other, terms1, terms2 in options[i]:
+                mgu = unify(tuple([substitute(term, subst) for term in terms1]),
+                            tuple([substitute(term, subst) for term in terms2]))
+                if mgu is not None:
+                    res = search(i + 1, dict({u: substitute(term, mgu) for u, term in subst.items()}, **mgu))
+                    if res is not None:
+                        return res
+            return None
+
+        return search(0, dict())
+
+    def instantiate(self, subst):
+        """
+        Apply a substitution for the free variables to all formulas in the tableau
+        (free variables stand for the same term on all branches),
+        and close the branches that become contradictory.
+
+        @param subst: the substitution
+        @type subst: dict[str,Term]
+        """
+        self.bindings.update(subst)
+        for node in self.root.nodes(preorder=True):
+            if not isinstance(node.fml, Pseudo):
+                node.fml = substitute(node.fml, subst)
+            node.partial = node.branch[-2].partial if len(node.branch) > 1 else PartialModel()
+            if not isinstance(node.fml, Pseudo):
+                node.partial = node.partial.extended(node)
+        for leaf in self.root.leaves(True):
+            for node in leaf.branch:
+                other = node.contradiction()
+                if other:
+                    leaf.close(node, other)
+                    break
+
+    def occurs(self, node, world, sign, fml):
+        """
+        Whether a signed formula occurs in a world on the branch of a node.
+        The formulas on a branch are collected into a set once per step.
+
+        @param node: the last node of the branch
+        @type node: Node
+        @param world: the world
+        @type world: int
+        @param sign: the sign
+        @type sign: bool
+        @param fml: the formula
+        @type fml: Formula
+        @rtype: bool
+        """
+        if node not in self.formulas:
+            self.formulas[node] = {(n.world, n.sign, str(n.fml)) for n in node.branch
+                                   if not isinstance(n.fml, Pseudo)}
+        return (world, sign, str(fml)) in self.formulas[node]
+
+    def blocked(self, node, world):
+        """
+        The world that blocks a world on the branch of a node, if any:
+        the nearest world it was introduced from (directly or indirectly)
+        at which all of the signed formulas at the world occur as well (subset blocking).
+
+        @param node: the last node of the branch
+        @type node: Node
+        @param world: the world
+        @type world: int
+        @return: the blocking world, or None if the world is not blocked
+        @rtype: int
+        """
+        fmls, parents, witnessed = self.branch_worlds(node)
+        # (the worlds for additional models can make the parents cyclic)
+        visited = {world}
+        ancestor = parents.get(world)
+        while ancestor is not None and ancestor not in visited:
+            if fmls.get(world, set()) <= fmls.get(ancestor, set()):
+                return ancestor
+            visited.add(ancestor)
+            ancestor = parents.get(ancestor)
+        return None
+
+    def witnessed(self, node, source):
+        """
+        Whether a new world has already been introduced on the branch of a node
+        for the formula of a source node in its world (for this or another occurrence of it).
+
+        @param node: the last node of the branch
+        @type node: Node
+        @param source: the node of the formula
+        @type source: Node
+        @rtype: bool
+        """
+        fmls, parents, witnessed = self.branch_worlds(node)
+        return (source.world, source.sign, str(source.fml)) in witnessed
+
+    def branch_worlds(self, node):
+        """
+        The signed formulas at each world on the branch of a node, hashed into sets,
+        the world each world was introduced from,
+        and the signed formulas in worlds that new worlds were introduced for.
+        They are collected once per step.
+
+        @param node: the last node of the branch
+        @type node: Node
+        @rtype: tuple[dict[int,set[tuple[bool,str]]],dict[int,int],set[tuple[int,bool,str]]]
+        """
+        if node not in self.worlds:
+            fmls, parents, witnessed = dict(), dict(), set()
+            for n in node.branch:
+                if not isinstance(n.fml, Pseudo):
+                    fmls.setdefault(n.world, set()).add((n.sign, str(n.fml)))
+                    if n.inst and len(n.inst) > 3 and n.inst[1] and isinstance(n.inst[2], int):
+                        parents.setdefault(n.inst[3], n.inst[2])
+                        witnessed.add((n.source.world, n.source.sign, str(n.source.fml)))
+            self.worlds[node] = fmls, parents, witnessed
+        return self.worlds[node]
+
+    def abandon(self, node):
+        # mark the unfinished branches through a node as abandoned
+        for leaf in node.leaves(True):
+            leaf.add_child((self, None, None, None, Infinite(), None, None, None))
+
+    def skip(self, node, *application):
+        # count an application skipped by the regularity check, once for each branch
+        if not any([(n,) + application in self.skipped for n in node.branch]):
+            self.skipped.add((node,) + application)
+            self.num_skipped += 1
+
     def expand(self):
         """
         Recursively expand all nodes in the tableau.
@@ -1079,12 +1346,11 @@ class Tableau(object):
             print(len(self))
             print("--------")
             print()
+        event = (None, None, None, [])
         while applicable := self.applicable():
             print(str(len(self.root)) + " nodes", end="\r")
             if self.stepwise:
-                self.steps.append(
-                    self.root.treestr() if not self.latex else
-                    self.root.treetex())
+                self.log.append(event + (tuple([a[1] for a in self.appl]),))
 
             # todo stop search when only contradictions found after all new
             #  instantiations
@@ -1095,31 +1361,41 @@ class Tableau(object):
             len_assumptions = sum(
                     [len(str(node.fml)) for node in self.root.nodes()
                      if node.rule == "A"])
-            num_nodes = len(self.root.nodes(True))
+            num_nodes = len(self.root.nodes(True)) + self.num_outside
+
+            # a budget is exhausted or the computation was cancelled; stop execution
+            if reason := self.budget.exceeded(num_nodes):
+                self.stop_reason = reason
+                # mark abandoned branches
+                self.abandon(self.root)
+                return
 
             # the tree gets too big; stop execution
             # todo when size limit factor is not high enough and no model is
             #  found,
             #  result should be "pot. inf." rather than closed
-            # todo more models often just creates isomorphisms, rather than
-            #  increasing the domain size
-            if num_nodes > self.size_limit_factor * len_assumptions * \
-                    self.num_models:
+            if self.limited and num_nodes > self.size_limit_factor * len_assumptions * self.num_models:
                 # mark abandoned branches
-                for leaf in self.root.leaves(True):
-                    leaf.add_child(
-                            (self, None, None, None, Infinite(), None, None, None))
+                self.abandon(self.root)
                 return
 
             # enough models have been found; stop the execution
             if not self.mode["validity"] and len(
                     self.models) >= self.num_models:
                 # mark abandoned branches
-                for leaf in self.root.leaves(True):
-                    leaf.add_child(
-                            (self, None, None, None, Infinite(), None, None, None))
+                self.abandon(self.root)
                 return
 
+            # there are enough independent open branches; expand them in parallel
+            if self.parallel and self.parallel > 1 and self.mode["validity"] and not self.depth_first and \
+                    not self.stepwise and not self.sequent_style and not self.freevars:
+                leaves = self.root.leaves(True)
+                if len(leaves) >= self.parallel:
+                    limit = self.size_limit_factor * len_assumptions * self.num_models
+                    self.expand_parallel(leaves, num_nodes, min(limit, self.max_nodes or limit))
+                    self.active = []
+                    continue
+
             # expand
             if debug:
                 print("applicable:")
@@ -1128,6 +1404,11 @@ class Tableau(object):
                         str(i), str(itm[0].line), str(itm[1].line), itm[2],
                         str(itm[3]), str(itm[5]), str(itm[6])])
                         for i, itm in enumerate(applicable)]))
+            # in depth-first expansion, continue the leftmost unfinished branch
+            if self.depth_first:
+                leaves = self.root.leaves(True)
+                if leaves:
+                    applicable = [appl for appl in applicable if appl[0] is leaves[0]] or applicable
             # get first applicable rule from prioritized list
             (target, source, rule_name, rule_type, fmls, args, insts) = \
                 applicable[0]
@@ -1138,6 +1419,11 @@ class Tableau(object):
                 print(str(source), " with ", rule_name, "(" + rule_type + ")", " on ", str(target))
             # apply the rule
             new_children = self.apply_rule(target, source, rule_type, rule_name, fmls, args)
+            if self.freevars:
+                # close all unfinished branches at once by a substitution for the free variables, if possible
+                subst = self.unifier()
+                if subst is not None:
+                    self.instantiate(subst)
 
             # # check properties of new children
             # for child in new_children:
@@ -1151,14 +1437,227 @@ class Tableau(object):
                 print(len(self))
                 print("--------")
                 print()
+            if self.backjumping:
+                for child in new_children:
+                    if child:
+                        self.backjump(child)
+            if self.depth_first:
+                self.discard_closed(target)
             self.active = [source] + new_children
+            event = (target, source, rule_name, new_children)
         
         if self.stepwise:
-            self.steps.append(
-                self.root.treestr() if not self.latex else
-                self.root.treetex())
+            self.log.append(event + (tuple([a[1] for a in self.appl]),))
             self.active = []
 
+    def backjump(self, node):
+        """
+        If a node closes its branch, close the branches that do not depend on the branching rule applications
+        the branch was closed with:
+        Going up the branch, whenever the contradictions closing all branches through a branching rule application
+        do not depend on it, the other branches of the application can be closed the same way.
+
+        @param node: the node
+        @type node: Node
+        """
+        if not node.children or not isinstance(node.children[-1].fml, Closed):
+            return
+        closed = node.children[-1]
+        deps = closed.deps
+        for child in node.branch[:0:-1]:
+            target = child.branch[-2]
+            if not child.split or target.split == child.split:  # not the first node of a branch of an application
+                continue
+            if not child.split & deps:
+                # the contradictions do not depend on the application: close its other branches the same way
+                for leaf in target.leaves(True):
+                    leaf.add_child((self, None, None, None, Closed(), closed.rule, closed.source, closed.inst))
+                    leaf.children[-1].deps = deps
+            elif all([isinstance(leaf.fml, (Closed, Empty)) for leaf in target.leaves()]):
+                # all branches of the application are closed:
+                # continue with what their contradictions depend on above the application
+                deps = 0
+                splits = 0
+                for n in target.nodes(False):
+                    splits |= n.split
+                    if isinstance(n.fml, Closed):
+                        deps |= n.deps
+                deps &= ~splits
+            else:
+                break
+
+    def discard_closed(self, node):
+        """
+        Discard the largest closed subtree containing a node:
+        The subtree is replaced by its topmost node, marked as closed,
+        so that only the open and unfinished branches are kept in memory.
+
+        @param node: the node
+        @type node: Node
+        """
+        def closed(node):
+            return all([isinstance(leaf.fml, Closed) for leaf in node.leaves()])
+
+        if not closed(node):
+            return
+        while len(node.branch) > 1 and closed(node.branch[-2]):
+            node = node.branch[-2]
+        discarded = node.nodes(False)
+        if len(discarded) == 1:  # only the mark
+            return
+        self.num_outside += len(discarded) - 1
+        self.last_line = max([n.line for n in discarded if n.line] + [self.last_line])
+        node.children = []
+        node.add_child((self, None, None, None, Closed(), "±", node, None))
+
+    def expand_parallel(self, leaves, num_nodes, limit):
+        """
+        Expand the branches ending in the given leaves in a pool of worker processes
+        and attach the resulting subtrees to the leaves.
+        Branches are independent of each other, so each worker expands a copy of the tableau
+        restricted to its branch (see `subtableau`) with the usual rules;
+        the new nodes are then numbered consecutively after the nodes already in the tree, subtree by subtree.
+        The limit on the number of nodes applies to the whole tree,
+        so the nodes that may still be added are shared equally among the branches.
+
+        @param leaves: the leaves of the open branches to expand
+        @type leaves: list[Node]
+        @param num_nodes: the number of nodes in the tree
+        @type num_nodes: int
+        @param limit: the maximum number of nodes in the tree
+        @type limit: int
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from time import time
+        share = max(0, limit - num_nodes) // len(leaves)
+        timeout = self.timeout - (time() - self.budget.start) if self.timeout is not None else None
+        with ProcessPoolExecutor(max_workers=min(self.parallel, len(leaves))) as pool:
+            futures = [pool.submit(expand_worker, pickled(self.subtableau(leaf, limit - share)), timeout)
+                       for leaf in leaves]
+            for leaf, future in zip(leaves, futures):
+                self.graft(leaf, unpickle(future.result()))
+
+    def subtableau(self, leaf, num_nodes):
+        """
+        A copy of the tableau whose tree consists only of the branch ending in a leaf,
+        so that it can be expanded on its own.
+
+        @param leaf: the leaf of the branch
+        @type leaf: Node
+        @param num_nodes: the number of nodes to count towards the limits besides those of the branch
+        and the nodes added to it
+        @type num_nodes: int
+        @rtype: Tableau
+        """
+        sub = copy.copy(self)
+        copies = dict()
+        for node in leaf.branch:
+            parent = copies.get(node.branch[-2]) if len(node.branch) > 1 else None
+            copies[node] = copy.copy(node)
+            copies[node].tableau = sub
+            copies[node].branch = (parent.branch if parent else []) + [copies[node]]
+            copies[node].children = []
+            if parent:
+                parent.children.append(copies[node])
+        for node in copies.values():
+            node.source = copies.get(node.source, node.source)
+            node.context = [copies[n] for n in node.context if n in copies]
+            if node.inst:
+                node.inst = tuple([copies.get(x, x) if isinstance(x, Node) else x for x in node.inst])
+        sub.root = copies[self.root]
+        sub.premises = [copies[node] for node in self.premises]
+        sub.axioms = [copies[node] for node in self.axioms]
+        sub.appl, sub.active, sub.models, sub.log = [], [], [], []
+        sub.model_keys = set()
+        sub.num_branches = 1
+        sub.formulas, sub.skipped, sub.num_skipped = dict(), set(), 0
+        sub.num_outside = num_nodes - len(leaf.branch)
+        # expanded sequentially; what is local to the process is set up by the worker
+        sub.parallel, sub.gui, sub.cancel, sub.budget, sub.timer = None, None, None, None, None
+        return sub
+
+    def graft(self, leaf, sub):
+        """
+        Attach the nodes that a subtableau (see `subtableau`) added to its branch to the leaf of the branch in the tree,
+        numbering them after the nodes already in the tree, in the order they were added.
+
+        @param leaf: the leaf of the branch
+        @type leaf: Node
+        @param sub: the expanded subtableau
+        @type sub: Tableau
+        """
+        # the copies of the nodes of the branch
+        copies = [sub.root]
+        while len(copies) < len(leaf.branch):
+            copies.append(copies[-1].children[0])
+        originals = dict(zip(copies, leaf.branch))
+        new = list(chain(*[child.nodes() for child in copies[-1].children]))
+        line = len(self)
+        lines = dict()
+        for node in sorted([node for node in new if node.line], key=lambda node: node.line):
+            lines[node.line] = line = line + 1
+        # parents are visited before their children
+        for node in new:
+            node.tableau = self
+            node.line = lines.get(node.line)
+            node.branch = originals.get(node.branch[-2], node.branch[-2]).branch + [node]
+            node.source = originals.get(node.source, node.source)
+            node.context = [originals.get(n, n) for n in node.context]
+            if node.inst:
+                node.inst = tuple([originals.get(x, x) if isinstance(x, Node) else x for x in node.inst])
+            if node.rule == "±" and node.inst:  # the line of the contradicting node
+                node.inst = (lines.get(node.inst[0], node.inst[0]),)
+            node.step = len(self.log)
+        leaf.children = copies[-1].children
+        for node in new:
+            if isinstance(node.fml, Open):
+                self.add_model(node.branch[-2])
+        self.num_branches += sub.num_branches - 1
+        self.num_skipped += sub.num_skipped
+        self.stop_reason = self.stop_reason or sub.stop_reason
+
+    @property
+    def steps(self):
+        """
+        The stepwise representation: the tree after each step of the expansion,
+        rendered from the log only when accessed.
+
+        @rtype: Steps
+        """
+        return Steps(self)
+
+    def render_step(self, step, latex=None):
+        """
+        The tree as it was in a step of the expansion.
+
+        @param step: the number of the step (starting from 0)
+        @type step: int
+        @param latex: whether to render LaTeX code instead of plain text (default: the output setting of the tableau)
+        @type latex: bool
+        @rtype: str
+        """
+        latex = self.latex if latex is None else latex
+        return self.root.treetex(step=step) if latex else self.root.treestr(step=step)
+
+    def write_steps(self, f, steps=None, latex=None, sep="\n\n"):
+        """
+        Write the tree as it was in the steps of the expansion to a file, one step at a time.
+
+        @param f: the file to write to
+        @type f: TextIO
+        @param steps: the numbers of the steps to write (default: all)
+        @type steps: Iterable[int]
+        @param latex: whether to write LaTeX code instead of plain text (default: the output setting of the tableau)
+        @type latex: bool
+        @param sep: the separator between the steps
+        @type sep: str
+        """
+        latex = self.latex if latex is None else latex
+        for i, step in enumerate(range(len(self.log)) if steps is None else steps):
+            if i:
+                f.write(sep)
+            self.root.writetree(f, latex, step)
+
     def apply_rule(self, target, source, rule_type, rule, fmls, args):
         unary = ["α", "γ", "δ", "η", "θ", "ε", "μ", "ν", "π", "κ", "λ", "ι", "υ", "ω", "ζ"]
         binary = ["β", "ξ", "χ", "ο", "u", "ω"]
@@ -1173,12 +1672,26 @@ class Tableau(object):
         existing_signature = ["ν", "κ", "λ", "ι", "χ", "ο", "ω"]
         previous_signature = ["π"]
 
-        line = max([node.line for node in self.root.nodes() if node.line])
+        line = max([node.line for node in self.root.nodes() if node.line] + [self.last_line])
         world = source.world
         sign = None
         inst = None
 
-        if rule_type in quantificational:
+        if self.freevars and (rule_type == "γ" or rule_type == "δ" and fmls[0][1].freevars() - {fmls[0][2].u}):
+            # free-variable tableaus: instantiate with a fresh free variable,
+            # or with a Skolem term over the free variables of the formula
+            sign, phi, var = fmls[0]
+            if rule_type == "γ":
+                self.num_freevars += 1
+                term = Var("X" + str(self.num_freevars))
+            else:
+                self.num_skolems += 1
+                term = FuncTerm(Func("sk" + str(self.num_skolems)),
+                                tuple([Var(u) for u in sorted(phi.freevars() - {var.u})]))
+            fmls[0] = (sign, phi.subst(var, term))
+            inst = (args[0], True, str(var), str(term))
+
+        elif rule_type in quantificational:
             sign, phi, var = fmls[0]
             universal, irrelevant, unneeded, new, indexed, used, occurring_local, occurring_global\
                 = args
@@ -1192,41 +1705,31 @@ class Tableau(object):
             def unsubscripted(c):
                 return c if "_" not in c else c[:c.index("_")]
 
-            # find a constant to substitute
+            # find a constant to substitute:
+            # the first usable one, trying existing constants before new ones
+            # (the constants not occurring in the branch, handed out by an allocator)
+            fresh = (subscripted(c) for c in
+                     Allocator(parameter, [unsubscripted(c) for c in occurring_global]))
             usable = []
             unusable = []
             match rule_type:
                 case "δ" | "ε":  # new constant
-                    usable = [subscripted(c)
-                                for c in Tableau.parameters
-                                if c not in [unsubscripted(c) 
-                                    for c in occurring_global]]
+                    usable = fresh
                     unusable = occurring_local
                 case "η":  # existing or, if not possible, new constant
                     usable = [subscripted(c)
                                 for c in occurring_local]
                     if not usable or all ([c in used for c in usable]):
-                        usable += [subscripted(c)  
-                                    for c in Tableau.parameters
-                                    if c not in [unsubscripted(c) 
-                                        for c in occurring_global]]
+                        usable = chain(usable, fresh)
                     unusable = used
                 case "γ":  # arbitrary (preferably existing, otherwise new) constant
-                    usable = [subscripted(c)
-                                for c in occurring_local]
-                    usable += [subscripted(c) 
-                                for c in Tableau.parameters
-                                if c not in [unsubscripted(c)
-                                    for c in occurring_global]]
+                    usable = chain([subscripted(c)
+                                    for c in occurring_local], fresh)
                     unusable = used
                 case "θ":  # arbitrary (preferably existing, otherwise new) constant
-                    usable = [subscripted(c) 
-                                for c in [unsubscripted(c)
-                                    for c in occurring_local + occurring_global]] +\
-                             [subscripted(c) 
-                                for c in Tableau.parameters
-                                if c not in [unsubscripted(c) 
-                                    for c in occurring_global]]
+                    usable = chain([subscripted(c)
+                                    for c in [unsubscripted(c)
+                                        for c in occurring_local + occurring_global]], fresh)
                     unusable = used
                 case "ο":  # arbitrary constant
                     pass  # todo constant for omicron
@@ -1234,12 +1737,9 @@ class Tableau(object):
                     pass  # todo constant for upsilon
                 case "ω":  # existing constant
                     pass  # todo constant for omega
-            
-            usable = list(dict.fromkeys(usable))
-            const_symbol = usable[(min([i for i in range(len(usable)) 
-                if usable[i] not in [subscripted(c) for c in unusable]]))]
-            # todo prevent arg is empty sequence error when running out of
-            #  symbols to use
+
+            unusable = {subscripted(c) for c in unusable}
+            const_symbol = next(c for c in usable if c not in unusable)
             const = Const(unsubscripted(const_symbol))
             fmls[0] = (sign, phi.subst(var, const))
             
@@ -1255,17 +1755,19 @@ class Tableau(object):
             unusable = []
             match rule_type:
                 case "μ" | "ξ":  # new signature
-                    usable = [i for i in range(1, 1000)]
-                    unusable = occurring
+                    usable = Allocator(lambda i: i + 1, occurring)
+                    unusable = []
                 case "ν" | "χ":  # existing signature
                     # todo correct to use extensions rather than occurring?
                     usable = extensions
                     unusable = used
                 case "κ": # arbitrary (existing or new) signature
-                    usable = sorted(list(set(extensions + [i for i in range(1, 100)])))
-                    unusable = used
+                    usable = Allocator(lambda i: i + 1, used)
+                    unusable = []
                 case "λ" | "ι":  # existing signature
-                    usable = sorted(list(set(extensions + [i for i in range(1, 100)][:self.num_models - 1])))
+                    # or, for additional models, a new one (as in `applicable`)
+                    usable = list(dict.fromkeys(
+                            extensions + Allocator(lambda i: i + 1, occurring).take(self.num_models - 1)))
                     unusable = used
                 case "π":  # previous signature
                     usable = [i for i in occurring if str(i) in reductions]
@@ -1277,8 +1779,7 @@ class Tableau(object):
                 case "ω":  # existing signature
                     pass # todo signature for omega
             
-            world = usable[
-                        min([i for i in range(len(usable)) if usable[i] not in unusable])]
+            world = next(w for w in usable if w not in unusable)
 
             new = (rule_type in new_signature) or \
                 (rule_type in existing_signature and world not in extensions)
@@ -1290,11 +1791,19 @@ class Tableau(object):
             fmls = [(sign, phi.subst(tau, rho))]
             inst = (src, tau, rho)
 
+        # regularity: don't add formulas of connective rules that are already on the branch
+        if self.regularity and rule_type == "α" and len(fmls) == 2:
+            fmls = [fml for fml in fmls if not self.occurs(target, world, *fml)] or fmls
+            if len(fmls) == 1:
+                self.skip(target, source, rule)
+
         # append nodes
         if rule_type in unary:
         
             # add pseudo-node to indicate branching
             if rule_type in nary:
+                # the new nodes depend on this application
+                self.split, self.num_splits = 1 << self.num_splits, self.num_splits + 1
                 if not target.children:
                     pseudo = target.add_child(
                             (self, None, None, None, Empty(), rule, source, None))
@@ -1314,6 +1823,7 @@ class Tableau(object):
         
             if rule_type in nary:
                 self.num_branches += 1 if len(target.children) > 2 else 0
+                self.split = 0
 
             if len(fmls) == 2 and bot:
                 return [top, bot]
@@ -1321,6 +1831,9 @@ class Tableau(object):
                 return [top]
             
         elif rule_type in binary:
+                # the new nodes depend on this application
+                self.split, self.num_splits = 1 << self.num_splits, self.num_splits + 1
+
                 # append (top) left node
                 topleft = child = target.add_child(
                     (self, line := line + 1, world, *fmls[0], rule, source, inst, 
@@ -1344,6 +1857,7 @@ class Tableau(object):
                         False, topright.context + [topright]))
 
                 self.num_branches += 1
+                self.split = 0
 
                 if len(fmls) == 4 and topleft and topright:
                     return [topleft, botleft, topright, botright]
@@ -1384,52 +1898,73 @@ class Tableau(object):
                 [isinstance(leaf.fml, Infinite) for leaf in self.root.leaves()
                  if leaf.fml is not None and not isinstance(leaf.fml, Empty)])
 
+    def unblocked(self, leaf, worlds, r):
+        """
+        The accessibility relation of the model of an open branch with blocked worlds:
+        a blocked world can access the worlds the world blocking it can access.
+
+        @param leaf: the leaf of the branch
+        @type leaf: Node
+        @param worlds: the worlds on the branch
+        @type worlds: list[int]
+        @param r: the pairs of worlds accessible from each other on the branch
+        @type r: list[tuple[int,int]]
+        @rtype: list[tuple[int,int]]
+        """
+        if not self.blocking:
+            return r
+        for world in worlds:
+            ancestor = self.blocked(leaf, world)
+            if ancestor is not None:
+                r = list(dict.fromkeys(r + [(world, w) for (v, w) in r if v == ancestor]))
+        return r
+
+    def add_model(self, leaf):
+        """
+        Add the model of an open branch to the models found.
+        In model generation, models isomorphic to one found before are discarded,
+        so that only distinct models count towards the number of models to find:
+        The models are compared by their canonical forms (see `Structure.canonical`),
+        with the constants of the conclusion and premises keeping their names.
+
+        @param leaf: the leaf of the open branch
+        @type leaf: Node
+        """
+        model = self.model(leaf)
+        if not self.mode["validity"]:
+            key = model.canonical(self.constants())
+            if key in self.model_keys:
+                return
+            self.model_keys.add(key)
+        self.models.append(model)
+
     def model(self, leaf):
         """
         The models for a tableau are the models associated with its open
         branches.
         A model for an open branch is one that satisfies all atoms in the
         branch.
+        It is read off the partial model of the branch (see `PartialModel`),
+        which is extended as the nodes are added.
 
         @return The models associated with the open branches the tableau.
         @rtype set[Structure]
         """
         structure = __import__("structure")
 
-        branch = [node for node in leaf.branch if
-                  not isinstance(node.fml, Pseudo)]
+        partial = leaf.partial
         # s = "S" + str(len(self.models)+1)
         s = "S" + str(leaf.line)
 
-        def remove_sig(term):
-            if "_" not in term:
-                return term
-            else:
-                return term[:term.index("_")]
+        # accessible worlds
+        r_ = list(partial.r)
 
         if self.mode["classical"]:  # classical logic
 
             if self.mode["modal"]:  # classical modal logic
-                # sigs = list(dict.fromkeys([tuple(node.sig) for node in
-                # branch]))
-                # sigs_ = list(dict.fromkeys([tuple(node.sig) for node in
-                # branch if node.fml.liteal()]))
-                # # use w1, ..., wn as ss for worlds instead of signatures
-                # worlds = {sig: "w" + str(i) for (i, sig) in enumerate(sigs)}
-                # w = {worlds[sig] for sig in sigs}
-                # r_ = {(sig[:-1], sig) for sig in sigs if len(sig) > 1}
-                # r = {(worlds[sig1], worlds[sig2]) for (sig1, sig2) in r_}
-                worlds = list(dict.fromkeys(
-                        [node.world for node in branch if node.world]))
-                worlds_ = list(dict.fromkeys(
-                        [node.world for node in branch if node.world and
-                         (isinstance(node.fml, Prop) or isinstance(node.fml, Atm) or 
-                          isinstance(node.fml, Eq))]))
+                worlds = [w for w in partial.worlds if w]
                 w = {"w" + str(w) for w in worlds}
-                r_ = list(dict.fromkeys([node.inst[2:] for node in branch if
-                                         node.inst and len(
-                                             node.inst) > 3 and isinstance(
-                                                 node.inst[2], int)]))
+                r_ = self.unblocked(leaf, worlds, r_)
                 r = {("w" + str(tpl[0]), "w" + str(tpl[1])) for tpl in r_}
 
             if self.mode["propositional"]:  # classical propositional logic
@@ -1437,193 +1972,96 @@ class Tableau(object):
                     "modal"]:  # classical non-modal propositional logic
                     # valuation = make all positive propositional variables
                     # true and all negative ones false
-                    v = {node.fml.p: node.sign for node in branch
-                             if isinstance(node.fml, Prop)}
+                    v = {p: values[None] for p, values in partial.v.items()}
                     model = structure.PropStructure(s, v)
 
                 else:  # classical modal propositional logic
-
-                    # # atoms = all unnegated propositional variables
-                    # atoms = {
-                    #     sig: [node.fml.p for node in branch if isinstance(
-                    #     node.fml, Prop) and node.sig == sig]
-                    #     for sig in sigs}
-                    # # valuation = make all positive propositional variables
-                    # true and all others false
-                    # v = {
-                    #     worlds[sig]: {p: (True if p in atoms[sig] else
-                    #     False) for p in self.root.fml.propvars()}
-                    #     for sig in sigs_}
-                    # atoms = all unnegated propositional variables
                     # valuation = make all positive propositional variables
                     # true and all others false
-                    literals = list(dict.fromkeys([
-                        node.fml.p for node in branch if isinstance(node.fml, Prop)]))
-                    v = {p: {"w" + str(node.world): node.sign 
-                            for node in branch if isinstance(node.fml, Prop) and node.fml.p == p} 
-                        for p in literals}
+                    v = {p: {"w" + str(w): value for w, value in values.items()}
+                         for p, values in partial.v.items()}
                     model = structure.PropModalStructure(s, w, r, v)
 
             else:  # classical predicate logic
                 # predicates = all predicates occurring in the conclusion and
                 # premises
-                constants = set(chain(self.root.fml.consts(),
-                                      *[ass.fml.consts() for ass in
-                                        [self.root] + self.premises]))
-                # todo show constants in interpret.?
-                funcsymbs = set(chain(self.root.fml.funcs(),
-                                      *[ass.fml.funcs() for ass in
-                                        [self.root] + self.premises]))
+                predicates = self.predicates()
                 # todo take care of function symbols in domain and
                 #  interpretation
-                predicates = set(chain(self.root.fml.preds(),
-                                       *[ass.fml.preds() for ass in
-                                         [self.root] + self.premises]))
 
                 if not self.mode[
                     "modal"]:  # classical non-modal predicate logic
-                    # atoms = all unnegated atomic predications
-                    atoms = [(node.fml.pred, node.fml.terms) for node in branch
-                             if isinstance(node.fml, Atm)
-                             and node.sign]
                     # domain = all const.s occurring in formulas
-                    d = set(list(
-                        chain(*[[remove_sig(t) for t in node.fml.consts()]
-                                for node in branch if node.fml.consts()])))
+                    d = partial.domain()
                     # interpretation = make all unnegated predications true
                     # and all others false
-                    i = {p: {tuple([remove_sig(str(t)) for t in a[1]]) for a in
-                             atoms if (Pred(p), a[1]) in atoms}
+                    i = {p: set(partial.atoms.get(None, {}).get(p, set()))
                          for p in predicates}
                     model = structure.PredStructure(s, d, i)
 
                 else:  # classical modal predicate logic
-                    # todo test
-                    # atoms = all unnegated atomic predications
-                    # atoms = {sig: [(node.fml.pred, node.fml.terms) for node
-                    # in branch
-                    #                if isinstance(node.fml, Atm) and
-                    #                node.sig == sig]
-                    #          for sig in sigs}
-                    # i = {worlds[sig]: {p: {tuple([str(t) for t in a[1]])
-                    # for a in atoms[sig]
-                    #                        if (Pred(p), a[1]) in atoms[sig]}
-                    #                    for p in predicates}
-                    #      for sig in sigs}
-                    atoms = {w: [(node.fml.pred, node.fml.terms) for node in
-                                 branch
-                                 if isinstance(node.fml, Atm)
-                                 and node.world == w
-                                 and node.sign]
-                             for w in worlds}
-                    i = {p: {"w" + str(w): {
-                            tuple([remove_sig(str(t)) for t in a[1]]) for a in
-                            atoms[w]
-                            if (Pred(p), a[1]) in atoms[w]}
+                    i = {p: {"w" + str(w): set(partial.atoms.get(w, {}).get(p, set()))
                              for w in worlds}
                          for p in predicates}
 
                     if not self.mode[
                         "vardomains"]:  # classical modal predicate logic
                         # with constant domains
-                        d = set(chain(
-                            *[[remove_sig(t) for t in node.fml.consts()] for
-                              node in branch]))
+                        d = partial.domain()
                         model = structure.ConstModalStructure(s, w, r, d, i)
 
                     else:  # classical modal predicate logic with varying
                         # domains
-                        # d = {worlds[sig]: set(chain(*[node.fml.consts()
-                        # for node in branch
-                        #                       if node.sig == sig]))
-                        #      for sig in sigs}
-                        d_ = set(list(
-                            chain(*[[c + "_0" for c in node.fml.consts()]
-                                    for node in branch if node.rule == "A"])) +
-                                 [node.inst[3] for node in branch
-                                  if node.inst and len(
-                                     node.inst) > 3 and isinstance(node.inst[3],
-                                                                   str)])
-                        d = {"w" + str(w): set([c[:c.index("_")] for c in d_ if
+                        d = {"w" + str(w): set([c[:c.index("_")] for c in partial.indexed if
                                                 c.endswith("_" + str(w))]) for w
                              in
                              worlds}
                         model = structure.VarModalStructure(s, w, r, d, i)
 
         else:  # intuitionistic logic
-            # sigs = [tuple(node.sig) for node in branch]
-            # # use k1, ..., kn as ss for states instead of signatures
-            # states = {sig: "k" + str(i) for (i, sig) in enumerate(sigs)}
-            # k = {states[sig] for sig in sigs}
-            # r_ = {(sig[:-1], sig) for sig in sigs if len(sig) > 1}
-            # r = {(states[sig1], states[sig2]) for (sig1, sig2) in r_}
-            states = list(dict.fromkeys([node.world for node in branch]))
-            states_ = list(dict.fromkeys(
-                    [node.world for node in branch if
-                    (isinstance(node.fml, Prop) or isinstance(node.fml, Atm) or 
-                     isinstance(node.fml, Eq))]))
+            states = list(partial.worlds)
             k = {"k" + str(w) for w in states}
-            r_ = list(dict.fromkeys([node.inst[2:] for node in branch if
-                                     node.inst and len(
-                                         node.inst) > 3 and isinstance(
-                                             node.inst[2], int)]))
             r = {("k" + str(tpl[0]), "k" + str(tpl[1])) for tpl in r_}
 
             if self.mode["propositional"]:  # intuitionstic propositional logic
-                literals = list(dict.fromkeys([
-                    node.fml.p for node in branch if isinstance(node.fml, Prop)]))
-                v = {p: {"k" + str(node.world): node.sign 
-                        for node in branch if isinstance(node.fml, Prop) and node.fml.p == p} 
-                    for p in literals}
+                v = {p: {"k" + str(w): value for w, value in values.items()}
+                     for p, values in partial.v.items()}
                 model = structure.KripkePropStructure(s, k, r, v)
 
             else:  # intuitionistic predicate logic
                 # predicates = all predicates occurring in the conclusion and
                 # premises
-                constants = set(chain(self.root.fml.consts(),
-                                      *[ass.fml.consts() for ass in
-                                        [self.root] + self.premises]))
-                funcsymbs = set(chain(self.root.fml.funcs(),
-                                      *[ass.fml.funcs() for ass in
-                                        [self.root] + self.premises]))
-                predicates = set(chain(self.root.fml.preds(),
-                                       *[ass.fml.preds() for ass in
-                                         [self.root] + self.premises]))
-                # # atoms = all unnegated atomic predications
-                # atoms = {sig: [(node.fml.pred, node.fml.terms) for node in
-                # branch
-                #                if isinstance(node.fml, Atm) and node.sig ==
-                #                sig]
-                #          for sig in sigs}
-                # d = {states[sig]: set(chain(*[node.fml.consts() for
-                # node in branch
-                #                               if node.sig == sig]))
-                #      for sig in sigs}
-                # i = {states[sig]: {p: {tuple([str(t) for t in a[1]]) for a
-                # in atoms[sig]
-                #                        if (Pred(p), a[1]) in atoms[sig]}
-                #                    for p in predicates}
-                #      for sig in sigs}
-                # atoms = all unnegated atomic predications
-                atoms = {k: [(node.fml.pred, node.fml.terms) for node in branch
-                             if isinstance(node.fml, Atm) and node.world == k
-                             and node.sign]
-                         for k in states}
-                d = {"k" + str(k): set(chain(
-                    *[[remove_sig(t) for t in node.fml.consts()] for node in
-                      branch
-                      if node.world == k]))
+                predicates = self.predicates()
+                d = {"k" + str(k): set(partial.consts.get(k, set()))
                      for k in states}
                 i = {p: {
-                        "k" + str(k): {tuple([remove_sig(str(t)) for t in a[1]])
-                                       for a in atoms[k]
-                                       if (Pred(p), a[1]) in atoms[k]}
+                        "k" + str(k): set(partial.atoms.get(k, {}).get(p, set()))
                         for k in states}
                      for p in predicates}
                 model = structure.KripkePredStructure(s, k, r, d, i)
 
         return model
 
+    def constants(self):
+        """
+        The constants occurring in the conclusion and premises.
+
+        @rtype: set[str]
+        """
+        return set(chain(self.root.fml.consts(),
+                         *[ass.fml.consts() for ass in
+                           [self.root] + self.premises]))
+
+    def predicates(self):
+        """
+        The predicates occurring in the conclusion and premises.
+
+        @rtype: set[str]
+        """
+        return set(chain(self.root.fml.preds(),
+                         *[ass.fml.preds() for ass in
+                           [self.root] + self.premises]))
+
 
 class Node(object):
     """
@@ -1634,6 +2072,8 @@ class Node(object):
                  sign: bool, fml: Formula, rule: str, source, inst: tuple, 
                  contextual: bool = False, context: list = []):
         self.tableau = tableau
+        if tableau.bindings and not isinstance(fml, Pseudo):  # free variables substituted meanwhile
+            fml = substitute(fml, tableau.bindings)
         self.line = line
         # self.sig = sig
         self.world = world
@@ -1649,35 +2089,110 @@ class Node(object):
             # left and right context (formulas to still be expanded)
         self.branch = (parent.branch if parent else []) + [self]
         self.children = []
+        self.step = len(tableau.log)  # the step of the expansion the node was added in
+        self.split = tableau.split  # the bit of the branching rule application that added the node, if any
+        self.deps = self.dependencies() if tableau.backjumping else 0
+        # the model of the branch as far as it is constructed
+        self.partial = parent.partial if parent else PartialModel()
+        if not isinstance(fml, Pseudo):
+            self.partial = self.partial.extended(self)
+        # the equalities on the branch, closed under congruence
+        self.congruence = (parent.congruence if parent else Congruence()) if tableau.congruence else None
+        if self.congruence and sign and isinstance(fml, Eq):
+            self.congruence = self.congruence.copy()
+            self.congruence.merge(fml.tau, fml.rho)
+            self.congruence.deps |= self.deps
+
+    def dependencies(self):
+        """
+        The branching rule applications this node depends on, as a bitset:
+        the one that added it, and those that the node it was derived from depends on,
+        the node an equality was applied to, and the node that introduced the constant or world
+        it was instantiated with.
+
+        @rtype: int
+        """
+        deps = self.split
+        if isinstance(self.source, Node):
+            deps |= self.source.deps
+        if self.inst and isinstance(self.inst[0], Node):  # equality
+            deps |= self.inst[0].deps
+        if self.inst and len(self.inst) > 3:  # instantiation
+            for node in self.branch[:-1]:
+                if node.inst and len(node.inst) > 3 and node.inst[1] and node.inst[3] == self.inst[3]:
+                    deps |= node.deps
+                    break
+        return deps
 
     def __str__(self):
         """
         String representation of this line.
         """
-        open_branches = [leaf.branch for leaf in self.root().leaves() if
-                         isinstance(leaf.fml, Open)]
-        
-        # todo plain text printout for sequent calculus
+        return self.linestr(self.layout())
 
-        # compute lengths of columns  # todo inefficient to recalculate for
-        #  every node
-        len_line = max([len(str(node.line)) for node in self.root().nodes() if
-                        node.line]) + 2
-        # len_sig = max(([len(".".join([str(s) for s in node.sig])) for node
-        # in self.root().nodes() if node.sig])) + 1 \
-        #     if [self.root.sig] else 0
-        len_world = max([len(str(node.world)) for node in self.root().nodes() if
-                         node.world]) + 2 \
-            if any([node.world for node in self.root().nodes()]) else 0
-        # len_sign = 2 if self.root().sign else 0
+    def layout(self, step=None):
+        """
+        The properties of the whole tree that the representations of its lines depend on,
+        computed in one pass over the tree, so that a tree can be rendered in linear time:
+          - step: the step of the expansion to render the tree as of (None for the current tree),
+          - open: the nodes on open branches,
+          - widths: the widths of the columns of the string representation,
+          - sources, active: the sources of the applicable rules and the active nodes (for stepwise output).
+
+        @param step: the step of the expansion to render the tree as of (None for the current tree)
+        @type step: int
+        @rtype: dict[str,Any]
+        """
+        layout = {"step": step}
+        # pre-order traversal
+        nodes = []
+        stack = [self.root()]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(reversed(node.shown_children(layout)))
+        # a node is on an open branch iff one of the leaves below it is open
+        open_nodes = set()
+        for node in reversed(nodes):
+            children = node.shown_children(layout)
+            if isinstance(node.fml, Open) and not children or \
+                    any([child in open_nodes for child in children]):
+                open_nodes.add(node)
+        # lengths of columns
+        len_line = max([len(str(node.line)) for node in nodes if node.line]) + 2
+        len_world = max([len(str(node.world)) for node in nodes if node.world]) + 2 \
+            if any([node.world for node in nodes]) else 0
         len_sign = 1
-        len_fml = max([len(str(node.fml)) for node in self.root().nodes()]) + 1
-        len_rule = max([len(str(node.rule)) for node in self.root().nodes() if
-                        node.rule])
-        len_source = max(
-                [len(str(node.source.line)) for node in self.root().nodes() if
-                 node.source]) \
-            if [node for node in self.root().nodes() if node.source] else 0
+        len_fml = max([len(str(node.fml)) for node in nodes]) + 1
+        len_rule = max([len(str(node.rule)) for node in nodes if node.rule])
+        len_source = max([len(str(node.source.line)) for node in nodes if node.source]) \
+            if [node for node in nodes if node.source] else 0
+        if step is None:
+            sources, active = [a[1] for a in self.tableau.appl], self.tableau.active
+        else:
+            target, source, rule, new, sources = self.tableau.log[step]
+            active = [source] + new if source else []
+        layout.update({"open": open_nodes,
+                       "widths": (len_line, len_world, len_sign, len_fml, len_rule, len_source),
+                       "sources": set(sources),
+                       "active": set(active)})
+        return layout
+
+    def shown_children(self, layout):
+        """
+        The children of this node in the tree as of the step being rendered.
+        """
+        if layout["step"] is None:
+            return self.children
+        return [child for child in self.children if child.step <= layout["step"]]
+
+    def linestr(self, layout):
+        """
+        String representation of this line, given the layout of the tree (see `layout`).
+        """
+        # todo plain text printout for sequent calculus
+
+        len_line, len_world, len_sign, len_fml, len_rule, len_source = layout["widths"]
 
         # compute columns
 
@@ -1686,7 +2201,7 @@ class Node(object):
         if self.tableau.underline_open and not self.tableau.hide_nonopen and \
                 not self.tableau.file and not self.tableau.mode["validity"] \
                 and \
-                any([self in branch for branch in open_branches]):
+                self in layout["open"]:
             line = "\033[4m" + line + "\033[0m" + ((len(line) - 1) * " ")
         str_line = "{:<{len}}".format((line if self.line else ""), len=len_line)
 
@@ -1701,8 +2216,7 @@ class Node(object):
         # underline atoms of open branches in MG
         if self.tableau.underline_open and not self.tableau.file and \
                 not self.tableau.mode["validity"] and \
-                any([self in branch for branch in
-                     open_branches]) and \
+                self in layout["open"] and \
                      (isinstance(self.fml, Prop) or isinstance(self.fml, Atm)):
             # todo not properly center aligned; to little padding
             str_world = (len(str_world) * " ") + "\033[4m" + str_world + "\033[0m" + \
@@ -1754,8 +2268,12 @@ class Node(object):
         """
         LaTeX representation of this line.
         """
-        open_branches = [leaf.branch for leaf in self.root().leaves() if
-                         isinstance(leaf.fml, Open)]
+        return self.linetex(self.layout())
+
+    def linetex(self, layout):
+        """
+        LaTeX representation of this line, given the layout of the tree (see `layout`).
+        """
         str2tex = {
                 "A":  "\\mathrm{A}",
                 "Ax": "\\mathrm{Ax}",
@@ -1795,13 +2313,13 @@ class Node(object):
             return fml
 
         str_line = "$\\sq\\ $" \
-            if self.tableau.stepwise and self in [a[1] for a in self.tableau.appl] else ""
+            if self.tableau.stepwise and self in layout["sources"] else ""
         str_line += str(self.line) + "." if self.line else ""
         # underline lines/atoms of open branches in MG
         if self.tableau.underline_open and \
                     not self.tableau.hide_nonopen and \
                     not self.tableau.mode["validity"] and \
-                    any([self in branch for branch in open_branches]):
+                    self in layout["open"]:
             str_line = "\\underline{" + str_line + "}"
         
         label_w = "w" if self.tableau.mode["classical"] else "k"
@@ -1814,10 +2332,10 @@ class Node(object):
         str_signed_indexed_fml = "$" + str_world + str_sign + str_fml + "$"
         if self.tableau.underline_open and \
                     not self.tableau.mode["validity"] and \
-                    any([self in branch for branch in open_branches]) and \
+                    self in layout["open"] and \
                     (isinstance(self.fml, Prop) or isinstance(self.fml, Atm)):
                     str_signed_indexed_fml = "\\underline{" + str_signed_indexed_fml + "}"
-        if self.tableau.stepwise and self in self.tableau.active:
+        if self.tableau.stepwise and self in layout["active"]:
             str_signed_indexed_fml = "\\fbox{" + str_signed_indexed_fml + "}"
 
         str_cite = ""
@@ -1860,48 +2378,80 @@ class Node(object):
                     "$)"
         return " & ".join([str_line, str_signed_indexed_fml, str_cite])
 
-    def treestr(self, indent="", binary=False, last=True) -> str:
+    def treestr(self, indent="", binary=False, last=True, step=None) -> str:
         """
-        String representation of the tree whose root is this node.
+        String representation of the tree whose root is this node
+        (as of a step of the expansion, if given).
         """
-        if isinstance(self.fml, Empty):  # self is empty pseudo-node
-            return ""
-        open_branches = [leaf.branch for leaf in self.root().leaves() if
-                         isinstance(leaf.fml, Open)]
-        # hide non-open branches
-        if self.tableau.hide_nonopen and not self.tableau.mode["validity"] and \
-                not any([self in branch for branch in open_branches]):
-            return ""
-
-        res = indent
-        res += "|--" if binary else ""
-        res += str(self) + "\n"
-        if self.children:  # self branches
-            if binary:
-                if not last:
-                    indent += "|  "
-                else:
-                    indent += "   "
-            if len(self.children) == 1:  # unary branching
-                if childstr := self.children[0].treestr(indent, False, True):
-                    res += childstr
-            else:  # n-ary branching
-                for child in self.children[:-1]:  # first children
-                    if childstr1 := child.treestr(indent, True, False):
-                        res += childstr1
-                if childstr2 := self.children[-1].treestr(indent, True,
-                                                          True):  # last child
-                    res += childstr2
-        else:  # self is leaf
-            res += indent + "\n"
-        return res
+        return "".join(self.treelines(indent, binary, last, step))
+
+    def treelines(self, indent="", binary=False, last=True, step=None):
+        """
+        String representation of the tree whose root is this node, piece by piece,
+        without building the representations of the subtrees.
+
+        @rtype: Iterator[str]
+        """
+        layout = self.layout(step)
+        hide = self.tableau.hide_nonopen and not self.tableau.mode["validity"]
+        stack = [(self, indent, binary, last)]
+        while stack:
+            node, indent, binary, last = stack.pop()
+            if isinstance(node.fml, Empty):  # node is empty pseudo-node
+                continue
+            # hide non-open branches
+            if hide and node not in layout["open"]:
+                continue
+            yield indent + ("|--" if binary else "") + node.linestr(layout) + "\n"
+            children = node.shown_children(layout)
+            if children:  # node branches
+                if binary:
+                    if not last:
+                        indent += "|  "
+                    else:
+                        indent += "   "
+                if len(children) == 1:  # unary branching
+                    stack.append((children[0], indent, False, True))
+                else:  # n-ary branching
+                    stack.append((children[-1], indent, True, True))  # last child
+                    for child in children[-2::-1]:  # first children
+                        stack.append((child, indent, True, False))
+            else:  # node is leaf
+                yield indent + "\n"
+
+    def treetex(self, indent="", first=True, root=True, step=None) -> str:
+        """
+        LaTeX representation of the tree whose root is this node
+        (as of a step of the expansion, if given).
+        """
+        return "".join(self.texlines(indent, first, root, step=step))
 
-    def treetex(self, indent="", first=True, root=True) -> str:
+    def writetree(self, f, latex=False, step=None):
+        """
+        Write the representation of the tree whose root is this node to a file, piece by piece.
+
+        @param f: the file to write to
+        @type f: TextIO
+        @param latex: whether to write LaTeX code instead of plain text
+        @type latex: bool
+        @param step: the step of the expansion to write the tree as of (None for the current tree)
+        @type step: int
+        """
+        for piece in (self.texlines(step=step) if latex else self.treelines(step=step)):
+            f.write(piece)
 
+    def texlines(self, indent="", first=True, root=True, layout=None, step=None):
+        """
+        LaTeX representation of the tree whose root is this node, piece by piece,
+        without building the representations of the subtrees.
+
+        @rtype: Iterator[str]
+        """
+        layout = layout or self.layout(step)
+        children = self.shown_children(layout)
         if self.tableau.sequent_style:
-            res = ""
             if root:
-                res += "\\ \\\\"
+                yield "\\ \\\\"
 
             str2tex = {
                     "A":  "\\mathrm{A}",
@@ -1919,46 +2469,44 @@ class Node(object):
                     "+":  "\\mathrm{L}",
                     "-":  "\\mathrm{R}"
             }
-            str_rule = self.children[0].rule if self.children else ""
+            str_rule = children[0].rule if children else ""
             if str_rule.startswith("+"):
-                str_rule = str2tex[self.children[0].rule[1:]] + "\\vdash"
+                str_rule = str2tex[children[0].rule[1:]] + "\\vdash"
             elif str_rule.startswith("-"):
-                str_rule = "\\vdash" + str2tex[self.children[0].rule[1:]]
+                str_rule = "\\vdash" + str2tex[children[0].rule[1:]]
             else:
                 str_rule = str2tex[str_rule] if str_rule in str2tex else ""
 
             if self.contextual:
                 # context alrady represented in another node: skip
-                res += self.children[0].treetex(indent + "    ", first=True, root=False)
-            elif len(self.children) == 0:
-                res += indent + "\\AxiomC{" + self.tex() + "}\n"
-            elif len(self.children) == 1:
-                if isinstance(self.children[0].fml, Closed):  # axiom
-                    res += "\\AxiomC{}\n"
-                    res += indent + "\\RightLabel{($\\_\\vdash\\_$)}\n"
-                    res += indent + "\\UnaryInfC{" + self.tex() + "}\n"
-                elif isinstance(self.children[0].fml, Pseudo):  # open assumption
-                    res += indent + "\\AxiomC{" + self.tex() + "}\n"
+                yield from children[0].texlines(indent + "    ", first=True, root=False, layout=layout)
+            elif len(children) == 0:
+                yield indent + "\\AxiomC{" + self.linetex(layout) + "}\n"
+            elif len(children) == 1:
+                if isinstance(children[0].fml, Closed):  # axiom
+                    yield "\\AxiomC{}\n"
+                    yield indent + "\\RightLabel{($\\_\\vdash\\_$)}\n"
+                    yield indent + "\\UnaryInfC{" + self.linetex(layout) + "}\n"
+                elif isinstance(children[0].fml, Pseudo):  # open assumption
+                    yield indent + "\\AxiomC{" + self.linetex(layout) + "}\n"
                 else:
-                    res += self.children[0].treetex(indent + "    ", first=True, root=False)
-                    res += indent + "\\RightLabel{($" + str_rule + \
+                    yield from children[0].texlines(indent + "    ", first=True, root=False, layout=layout)
+                    yield indent + "\\RightLabel{($" + str_rule + \
                         "$)}\n"
-                    res += indent + "\\UnaryInfC{" + self.tex() + "}\n"
-            elif len(self.children) == 2:
-                res += self.children[0].treetex(indent + "    ", first=True, root=False)
-                res += self.children[1].treetex(indent + "    ", first=True, root=False)
-                res += indent + "\\RightLabel{($" + str_rule + "$)}\n"
-                res += indent + "\\BinaryInfC{" + self.tex() + "}\n"
+                    yield indent + "\\UnaryInfC{" + self.linetex(layout) + "}\n"
+            elif len(children) == 2:
+                yield from children[0].texlines(indent + "    ", first=True, root=False, layout=layout)
+                yield from children[1].texlines(indent + "    ", first=True, root=False, layout=layout)
+                yield indent + "\\RightLabel{($" + str_rule + "$)}\n"
+                yield indent + "\\BinaryInfC{" + self.linetex(layout) + "}\n"
             if root:
-                res += "\\DisplayProof\n\n"
-            return res
+                yield "\\DisplayProof\n\n"
+            return
 
-        open_branches = [leaf.branch for leaf in self.root().leaves() if
-                         isinstance(leaf.fml, Open)]
         # hide non-open branches
-        if self.tableau.hide_nonopen and not self.tableau.mode["validity"] and \
-                not any([self in branch for branch in open_branches]):
-            return ""
+        hide = self.tableau.hide_nonopen and not self.tableau.mode["validity"]
+        if hide and self not in layout["open"]:
+            return
         colspec = "{R{4em}cL{4em}}" \
             if self.tableau.mode["propositional"] and \
             not self.tableau.mode["modal"] and self.tableau.mode["classical"] \
@@ -1972,44 +2520,45 @@ class Node(object):
             not \
         self.tableau.mode["modal"] else \
             "-4.5em"  # todo not entirely accurate
-        res = ""
         if root:
-            res += "\\hspace*{%s}\n" % hoffset
-            res += "\\begin{forest}\n"
-            res += "for tree={"
-            res += "anchor=north, l sep=2em, s sep=" + ssep
-            res += "}\n"
+            yield "\\hspace*{%s}\n" % hoffset
+            yield "\\begin{forest}\n"
+            yield "for tree={"
+            yield "anchor=north, l sep=2em, s sep=" + ssep
+            yield "}\n"
             indent += "    "
-            res += indent + "[\n"
-        if first:
-            res += indent + "\\begin{tabular}" + colspec + "\n"
-        res += indent + self.tex()
-        if self.children:
-            if len(self.children) == 1:  # no branching
-                res += "\\\\\n"
-                res += self.children[0].treetex(indent, first=False, root=False)
-            else:  # branching
-                res += "\n" + indent + "\\end{tabular}\n"
-                for child in self.children:
-                    if child.fml is not None and child.fml.tex() and \
-                            not isinstance(child.fml, Empty) and \
-                            not (self.tableau.hide_nonopen and 
-                                not self.tableau.mode["validity"] and 
-                                not any([child in branch for branch in
-                                      open_branches])):
-                        indent += "    "
-                        res += indent + "[\n"
-                        res += child.treetex(indent, first=True, root=False)
-                        res += indent + "]\n"
-                        indent = indent[:-4]
-        else:  # leaf
-            res += indent + "\\end{tabular}\n"
+            yield indent + "[\n"
+        # the stack holds the nodes still to render and the closing brackets of their subtrees
+        stack = [(self, indent, first)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+                continue
+            node, node_indent, first = item
+            if first:
+                yield node_indent + "\\begin{tabular}" + colspec + "\n"
+            yield node_indent + node.linetex(layout)
+            children = node.shown_children(layout)
+            if children:
+                if len(children) == 1:  # no branching
+                    yield "\\\\\n"
+                    stack.append((children[0], node_indent, False))
+                else:  # branching
+                    yield "\n" + node_indent + "\\end{tabular}\n"
+                    for child in children[::-1]:
+                        if child.fml is not None and child.fml.tex() and \
+                                not isinstance(child.fml, Empty) and \
+                                not (hide and child not in layout["open"]):
+                            stack.append(node_indent + "    ]\n")
+                            stack.append((child, node_indent + "    ", True))
+                            stack.append(node_indent + "    [\n")
+            else:  # leaf
+                yield node_indent + "\\end{tabular}\n"
         if root:
-            res += indent + "]\n"
-            indent = indent[:-4]
-            res += "\\end{forest}\n"
-        return res
-    
+            yield indent + "]\n"
+            yield "\\end{forest}\n"
+
     def __len__(self):
         return len(self.nodes(True))
 
@@ -2123,6 +2672,58 @@ class Node(object):
         """
         if isinstance(self.fml, Pseudo):
             return
+        node = self.contradiction()
+        if not node and self.congruence:
+            # a contradiction modulo the equalities on the branch
+            source, node = self.congruent_contradiction()
+            if node:
+                closed = self.close(source, node)
+                if closed:  # the contradiction also depends on the equalities
+                    closed.deps |= self.congruence.deps
+                return True
+        if not node:
+            return False
+        self.close(self, node)
+        return True
+
+    def congruent_contradiction(self):
+        """
+        With congruence closure, two nodes on the branch that contradict each other modulo the equalities on the branch
+        (for a negated equality, the node itself twice), if any, involving this node or the equalities it added.
+
+        @return: the contradicting node and the node contradicted, or None and None
+        @rtype: tuple[Node,Node]
+        """
+        congruence = self.congruence
+        if isinstance(self.fml, Eq):
+            if not self.sign:
+                if congruence.equal(self.fml.tau, self.fml.rho):
+                    return self, self
+                return None, None
+            # a new equality may make any literal on the branch contradictory
+            literals = dict()
+            for node in self.branch:
+                if isinstance(node.fml, Eq) and not node.sign and congruence.equal(node.fml.tau, node.fml.rho):
+                    return node, node
+                if isinstance(node.fml, Atm):
+                    key = (node.world, congruence.atom(node.fml))
+                    if (key, not node.sign) in literals:
+                        return node, literals[(key, not node.sign)]
+                    literals.setdefault((key, node.sign), node)
+        elif isinstance(self.fml, Atm):
+            key = congruence.atom(self.fml)
+            for node in self.branch[-2::-1]:
+                if isinstance(node.fml, Atm) and node.sign != self.sign and node.world == self.world and \
+                        congruence.atom(node.fml) == key:
+                    return self, node
+        return None, None
+
+    def contradiction(self):
+        """
+        The node on the branch that this node contradicts, if any.
+
+        @rtype: Node
+        """
         for node in self.branch[::-1]:
             if self.fml and self.world == node.world and (
                     (self.sign and self.fml.tableau_contradiction_pos(node.fml,
@@ -2130,15 +2731,29 @@ class Node(object):
                     (not self.sign and self.fml.tableau_contradiction_neg(
                             node.fml, node.sign))
             ):
-                rule = "±" if not isinstance(self.fml, Eq) else \
-                    ("=" if node.sign else "≠")
-                inst = (node.line,) if not isinstance(self.fml, Eq) else None
-                source = self
-                self.add_child((
-                               self.tableau, None, None, None, Closed(), rule, source,
-                               inst))
-                return True
-        return False
+                return node
+        return None
+
+    def close(self, source, node):
+        """
+        Add a label to the branch of this node that it is closed by a contradiction between two of its nodes.
+
+        @param source: the contradicting node
+        @type source: Node
+        @param node: the node contradicted
+        @type node: Node
+        @return: the label added
+        @rtype: Node
+        """
+        rule = "±" if not isinstance(source.fml, Eq) else \
+            ("=" if node.sign else "≠")
+        inst = (node.line,) if not isinstance(source.fml, Eq) else None
+        closed = self.add_child((
+                       self.tableau, None, None, None, Closed(), rule, source,
+                       inst))
+        if closed:  # the contradiction depends on both nodes
+            closed.deps = source.deps | node.deps
+        return closed
 
     def branch_open(self):
         """
@@ -2174,11 +2789,12 @@ class Node(object):
                                if node.rule == "A"])
         height = len(self.branch)
         width = len(self.branch[-2].children)
-        if height > self.tableau.size_limit_factor * len_assumptions:
+        if self.tableau.limited and height > self.tableau.size_limit_factor * len_assumptions or \
+                self.tableau.max_depth is not None and height > self.tableau.max_depth:
             self.add_child(
                     (self.tableau, None, None, None, Infinite(), None, None, None))
             return True
-        if width > self.tableau.size_limit_factor * len_assumptions:
+        if self.tableau.limited and width > self.tableau.size_limit_factor * len_assumptions:
             self.branch[-2].add_child(
                     (self.tableau, None, None, None, Infinite(), None, None, None))
             return True
@@ -2219,6 +2835,422 @@ class Node(object):
         return False
 
 
+class Steps:
+    """
+    The stepwise representation of a tableau, as a sequence of the trees after each step of the expansion,
+    each rendered from the expansion log when it is accessed.
+    """
+
+    def __init__(self, tableau):
+        self.tableau = tableau
+
+    def __len__(self):
+        return len(self.tableau.log)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("step out of range")
+        return self.tableau.render_step(i)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class Congruence:
+    """
+    The equalities on a branch, closed under congruence:
+    a union-find structure over the terms of the equalities, by their string representations,
+    in which function terms whose arguments are equal are equal.
+    Each node with an equality has its own copy, extended by the equality; the other nodes share their parent's.
+
+    @attr parent: the parent of each term in the union-find structure
+    @type parent: dict[str,str]
+    @attr funcs: the function terms
+    @type funcs: dict[str,FuncTerm]
+    @attr sigs: a function term for each function symbol and the classes of its arguments
+    @type sigs: dict[tuple[str,tuple[str, ...]],str]
+    @attr deps: the branching rule applications the equalities depend on (see `Node.dependencies`)
+    @type deps: int
+    """
+
+    def __init__(self):
+        self.parent = dict()
+        self.funcs = dict()
+        self.sigs = dict()
+        self.deps = 0
+
+    def copy(self):
+        congruence = Congruence()
+        congruence.parent, congruence.funcs, congruence.sigs = dict(self.parent), dict(self.funcs), dict(self.sigs)
+        congruence.deps = self.deps
+        return congruence
+
+    def add(self, term):
+        # add a term and its subterms
+        key = str(term)
+        if key not in self.parent:
+            self.parent[key] = key
+            if isinstance(term, FuncTerm):
+                for subterm in term.terms:
+                    self.add(subterm)
+                self.funcs[key] = term
+        return key
+
+    def find(self, term):
+        """
+        The representative of the class of a term.
+        Function terms not in the structure are equal to the function terms with equal arguments.
+
+        @param term: the term
+        @type term: Term
+        @rtype: str
+        """
+        key = str(term)
+        if key not in self.parent:
+            if not isinstance(term, FuncTerm):
+                return key
+            sig = self.signature(term)
+            if sig not in self.sigs:
+                return sig[0] + "(" + ",".join(sig[1]) + ")"
+            key = self.sigs[sig]
+        while self.parent[key] != key:
+            self.parent[key] = self.parent[self.parent[key]]
+            key = self.parent[key]
+        return key
+
+    def signature(self, term):
+        # the function symbol and the classes of the arguments of a function term
+        return term.f.f, tuple([self.find(subterm) for subterm in term.terms])
+
+    def merge(self, tau, rho):
+        """
+        Add an equality, and the equalities between function terms that follow from it.
+
+        @param tau, rho: the terms
+        @type tau, rho: Term
+        """
+        pending = [(self.add(tau), self.add(rho))]
+        while pending:
+            key1, key2 = [self.find(key) for key in pending.pop()]
+            if key1 != key2:
+                self.parent[key1] = key2
+            if not pending:
+                # function terms whose arguments have become equal
+                self.sigs = dict()
+                for key, term in self.funcs.items():
+                    sig = self.signature(term)
+                    if sig not in self.sigs:
+                        self.sigs[sig] = key
+                    elif self.find(key) != self.find(self.sigs[sig]):
+                        pending.append((key, self.sigs[sig]))
+
+    def equal(self, tau, rho):
+        """
+        Whether two terms are equal.
+
+        @type tau, rho: Term
+        @rtype: bool
+        """
+        return self.find(tau) == self.find(rho)
+
+    def atom(self, fml):
+        """
+        A representation of an atomic formula that is the same for all atoms equal to it.
+
+        @type fml: Atm
+        @rtype: tuple[str,tuple[str, ...]]
+        """
+        return fml.pred.p, tuple([self.find(term) for term in fml.terms])
+
+
+class PartialModel:
+    """
+    The model of a branch as far as it is constructed, extended node by node as the branch grows.
+    A node shares the partial model of its parent unless it adds something to it,
+    in which case it gets an extended copy,
+    so that the model of an open branch can be read off its last node (see `Tableau.model`).
+
+    @attr worlds: the worlds (as the keys of a dictionary, in the order they occur in)
+    @type worlds: dict[int,None]
+    @attr r: the pairs of a world and a world accessible from it (in the same way)
+    @type r: dict[tuple[int,int],None]
+    @attr v: the truth value of each propositional variable in each world
+    @type v: dict[str,dict[int,bool]]
+    @attr atoms: the tuples of terms of the unnegated atoms with each predicate in each world
+    @type atoms: dict[int,dict[str,set[tuple[str, ...]]]]
+    @attr consts: the constants occurring in each world
+    @type consts: dict[int,set[str]]
+    @attr indexed: the constants with the index of the world they were introduced in
+                   (for modal logic with varying domains)
+    @type indexed: set[str]
+    """
+
+    def __init__(self):
+        self.worlds = dict()
+        self.r = dict()
+        self.v = dict()
+        self.atoms = dict()
+        self.consts = dict()
+        self.indexed = set()
+
+    def copy(self):
+        partial = PartialModel()
+        partial.worlds, partial.r = dict(self.worlds), dict(self.r)
+        partial.v = {p: dict(values) for p, values in self.v.items()}
+        partial.atoms = {w: {p: set(terms) for p, terms in atoms.items()} for w, atoms in self.atoms.items()}
+        partial.consts = {w: set(consts) for w, consts in self.consts.items()}
+        partial.indexed = set(self.indexed)
+        return partial
+
+    def extended(self, node):
+        """
+        The partial model extended by a node.
+
+        @param node: the node
+        @type node: Node
+        @return: this partial model if the node adds nothing to it, and else an extended copy
+        @rtype: PartialModel
+        """
+        world, sign, fml, inst = node.world, node.sign, node.fml, node.inst
+        pair = tuple(inst[2:]) if inst and len(inst) > 3 and isinstance(inst[2], int) else None
+        consts = {remove_sig(c) for c in fml.consts()} if fml is not None else set()
+        indexed = {c + "_0" for c in consts} if node.rule == "A" and fml is not None else set()
+        if inst and len(inst) > 3 and isinstance(inst[3], str):
+            indexed.add(inst[3])
+        prop = isinstance(fml, Prop) and self.v.get(fml.p, {}).get(world, not sign) != sign
+        atom = tuple([remove_sig(str(t)) for t in fml.terms]) if isinstance(fml, Atm) and sign else None
+        if world in self.worlds and (pair is None or pair in self.r) and not prop and \
+                (atom is None or atom in self.atoms.get(world, {}).get(fml.pred.p, set())) and \
+                consts <= self.consts.get(world, set()) and indexed <= self.indexed:
+            return self
+        partial = self.copy()
+        partial.worlds[world] = None
+        if pair is not None:
+            partial.r[pair] = None
+        if prop:
+            partial.v.setdefault(fml.p, dict())[world] = sign
+        if atom is not None:
+            partial.atoms.setdefault(world, dict()).setdefault(fml.pred.p, set()).add(atom)
+        partial.consts.setdefault(world, set()).update(consts)
+        partial.indexed |= indexed
+        return partial
+
+    def domain(self):
+        """
+        The constants occurring in any world.
+
+        @rtype: set[str]
+        """
+        return set(chain(*self.consts.values()))
+
+
+def remove_sig(term):
+    # the name of a constant without the index of the world it was introduced in
+    if "_" not in term:
+        return term
+    else:
+        return term[:term.index("_")]
+
+
+class Allocator:
+    """
+    An allocator of fresh symbols: it hands out the symbols of an infinite sequence in order,
+    skipping those already taken, so that it never runs out.
+    The taken symbols are kept in a set, so that each symbol is found in amortized constant time.
+
+    @attr symbol: the symbol at each position of the sequence
+    @type symbol: Callable[[int],Any]
+    @attr taken: the symbols taken
+    @type taken: set[Any]
+    @attr index: the position of the next symbol to consider
+    @type index: int
+    """
+
+    def __init__(self, symbol, taken=()):
+        self.symbol = symbol
+        self.taken = set(taken)
+        self.index = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while (symbol := self.symbol(self.index)) in self.taken:
+            self.index += 1
+        self.index += 1
+        self.taken.add(symbol)
+        return symbol
+
+    def take(self, n):
+        """
+        The next fresh symbols.
+
+        @param n: the number of symbols
+        @type n: int
+        @rtype: list[Any]
+        """
+        return [next(self) for _ in range(n)]
+
+
+def parameter(i):
+    """
+    The constant symbol at a position of the sequence of constants to instantiate quantifiers with:
+    a, ..., t, c1, c2, ...
+
+    @param i: the position
+    @type i: int
+    @rtype: str
+    """
+    return "abcdefghijklmnopqrst"[i] if i < 20 else "c" + str(i - 19)
+
+
+def race(conclusion=None, premises=[], axioms=[], gui=None, silent=False, **settings):
+    """
+    Test whether an inference is valid by running the proof search (a validity tableau)
+    and the countermodel search (a countermodel generation tableau) concurrently in two processes.
+    The first tableau to reach a definite answer wins and the other one is cancelled:
+    the validity tableau if it is closed, or the countermodel tableau if it has an open branch.
+    If neither does, the countermodel tableau is returned if it is infinite, and the validity tableau otherwise.
+    If a worker process dies without a result, the tableau of the other one is returned,
+    and if both do, a RuntimeError is raised.
+
+    @param conclusion, premises, axioms: the inference, as for `Tableau`
+    @param gui: the output sink of the resulting tableau
+    @type gui: output.Output
+    @param silent: whether to suppress the output of the resulting tableau
+    @type silent: bool
+    @param settings: further settings of the tableaus, as for `Tableau` (other than the mode)
+    @return: the winning tableau
+    @rtype: Tableau
+    """
+    settings.update(conclusion=conclusion, premises=premises, axioms=axioms)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=race_worker, args=(settings, validity, results), daemon=True)
+               for validity in [True, False]]
+    for worker in workers:
+        worker.start()
+    tabs = {}
+    try:
+        while len(tabs) < len(workers):
+            # check for live workers before polling, so that no result sent before dying is missed
+            alive = any([worker.is_alive() for v, worker in zip([True, False], workers)
+                         if v not in tabs])
+            try:
+                validity, data = results.get(timeout=0.1)
+            except queue.Empty:
+                if alive:
+                    continue
+                # the remaining workers died without a result (e.g. killed for running out of memory)
+                if not tabs:
+                    raise RuntimeError("tableau search failed: the worker processes died")
+                break
+            if isinstance(data, str):  # the worker failed
+                raise RuntimeError("tableau search failed:\n" + data)
+            tabs[validity] = unpickle(data)
+            if validity and tabs[validity].closed() or not validity and tabs[validity].open():
+                break
+    finally:
+        # cancel the loser
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    if True in tabs and tabs[True].closed():
+        tab = tabs[True]
+    elif False in tabs and (tabs[False].open() or tabs[False].infinite()):
+        tab = tabs[False]
+    else:
+        tab = tabs[True] if True in tabs else tabs[False]
+    tab.gui = gui or __import__("output").default_output()
+    if not silent:
+        tab.show()
+    return tab
+
+
+def race_worker(settings, validity, results):
+    # compute one of the tableaus of `race` and send it back pickled
+    try:
+        tab = Tableau(validity=validity, satisfiability=False, silent=True,
+                      gui=__import__("output").NullOutput(), **settings)
+        # detach what is local to the process
+        tab.gui, tab.cancel, tab.budget = None, None, None
+        results.put((validity, pickled(tab)))
+    except Exception:
+        results.put((validity, __import__("traceback").format_exc()))
+
+
+def unify(terms1, terms2):
+    """
+    The most general unifier of two sequences of terms, with the occurs check.
+
+    @param terms1, terms2: the terms
+    @type terms1, terms2: tuple[Term, ...]
+    @return: the unifier, as a dictionary from variable names to terms not containing any of the variables,
+             or None if the terms cannot be unified
+    @rtype: dict[str,Term]
+    """
+    if len(terms1) != len(terms2):
+        return None
+    subst = dict()
+    pairs = list(zip(terms1, terms2))
+    while pairs:
+        tau, rho = [substitute(term, subst) for term in pairs.pop()]
+        if str(tau) == str(rho):
+            continue
+        if not isinstance(tau, Var):
+            tau, rho = rho, tau
+        if isinstance(tau, Var):
+            if tau.u in rho.freevars():  # occurs check
+                return None
+            subst = {u: term.subst(tau, rho) for u, term in subst.items()}
+            subst[tau.u] = rho
+        elif isinstance(tau, FuncTerm) and isinstance(rho, FuncTerm) and tau.f.f == rho.f.f and \
+                len(tau.terms) == len(rho.terms):
+            pairs += list(zip(tau.terms, rho.terms))
+        else:
+            return None
+    return subst
+
+
+def substitute(expr, subst):
+    # apply a substitution for variables, binding by binding
+    for u, term in subst.items():
+        expr = expr.subst(Var(u), term)
+    return expr
+
+
+def expand_worker(data, timeout):
+    # expand a subtableau of `Tableau.expand_parallel` and send it back pickled
+    sub = unpickle(data)
+    sub.budget = Budget(timeout, sub.max_nodes, sub.max_memory)
+    sub.expand()
+    sub.budget = None
+    return pickled(sub)
+
+
+def pickled(obj):
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 100000))  # the nodes are pickled recursively
+    try:
+        return pickle.dumps(obj)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def unpickle(data):
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 100000))
+    try:
+        return pickle.loads(data)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
 ####################
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+import unittest
+
+from batch import *
+
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+import batch
+
+
+def crashing(prob, *args):
+    # a worker process that dies on a problem
+    if prob.get("crash"):
+        os._exit(1)
+    return solve(prob, *args)
+
+
+class TestBatch(unittest.TestCase):
+    def test_solve(self):
+        res = solve({"id": 1, "conclusion": "(p -> p)", "propositional": True})
+        assert res["verdict"] == "valid" and res["nodes"] == 3 and res["branches"] == 1
+        assert not res["models"]
+        res = solve({"id": 2, "conclusion": "(p v q)", "premises": ["p"], "action": "mg", "propositional": True})
+        assert res["verdict"] == "satisfiable" and res["models"]
+        assert all([m["v"]["p"] is True for m in res["models"]])
+        res = solve({"id": 2, "conclusion": r"\exi x P(x)", "action": "mg"})
+        assert res["models"][0]["d"] == ["a"] and res["models"][0]["i"] == {"P": [["a"]]}
+        json.dumps(res)
+        res = solve({"id": 3, "conclusion": "q", "premises": ["(p v q)"], "action": "cmg", "propositional": True})
+        assert res["verdict"] == "invalid" and res["models"]
+        res = solve({"id": 4, "conclusion": r"(\all x \exi y R(x,y) -> \exi x R(x,x))"}, timeout=0)
+        assert res["verdict"] == "unknown" and res["stop_reason"] == "timeout"
+        res = solve({"id": 5, "conclusion": "(p ->"})
+        assert "error" in res and res["id"] == 5
+        # without a conjecture, the premises are refuted
+        with tempfile.TemporaryDirectory() as path:
+            for name, problem, result in [("a.p", "cnf(a,axiom,p). cnf(b,negated_conjecture,~p).", "valid"),
+                                          ("b.p", "fof(a,axiom,p). fof(b,axiom,q).", "invalid")]:
+                with open(os.path.join(path, name), "w") as f:
+                    f.write(problem + "\n")
+                res = solve({"id": name, "tptp": os.path.join(path, name)})
+                assert res["verdict"] == result
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as path:
+            with open(os.path.join(path, "a.jsonl"), "w") as f:
+                for i in range(10):
+                    f.write(json.dumps({"conclusion": "(p" + str(i) + " -> q)", "propositional": True}) + "\n")
+            with open(os.path.join(path, "b.json"), "w") as f:
+                json.dump({"id": "b", "conclusion": "(p -> p)", "propositional": True}, f)
+            with open(os.path.join(path, "c.p"), "w") as f:
+                f.write("fof(c, conjecture, ![X] : (p(X) => p(X))).\n")
+            out = io.StringIO()
+            assert run(problems(path), out, jobs=2, timeout=10) == 12
+            res = {r["id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+            assert len(res) == 12
+            assert res["b"]["verdict"] == "valid"
+            assert res[os.path.join(path, "c.p")]["verdict"] == "valid"
+            assert res[os.path.join(path, "a.jsonl") + ":3"]["verdict"] == "invalid"
+
+    def test_broken_pool(self):
+        probs = [{"id": i, "conclusion": "(p -> p)", "propositional": True, "crash": i == 3} for i in range(8)]
+        out = io.StringIO()
+        with mock.patch.object(batch, "solve", crashing):
+            assert run(probs, out, jobs=2) == 8
+        res = {r["id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+        # only the problem that kills its worker fails
+        assert "BrokenProcessPool" in res[3]["error"]
+        assert all([res[i]["verdict"] == "valid" for i in range(8) if i != 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from expr import *
+from bdd import *
+
+
+class TestBDD(unittest.TestCase):
+    def test_ops(self):
+        bdd = BDD()
+        fml = Imp(Disj(Prop("p"), Prop("q")), Neg(Prop("r")))
+        u = bdd.from_expr(fml)
+        assert bdd.count(u) == 5
+        assert bdd.satisfiable(u) and not bdd.valid(u)
+        assert bdd.equivalent(u, bdd.from_expr(Disj(Neg(Disj(Prop("p"), Prop("q"))), Neg(Prop("r")))))
+        assert not bdd.equivalent(u, bdd.from_expr(Prop("p")))
+        assert bdd.valid(bdd.from_expr(Disj(Prop("p"), Neg(Prop("p")))))
+        assert not bdd.satisfiable(bdd.from_expr(Xor(Prop("p"), Prop("p"))))
+        assert bdd.valid(bdd.from_expr(Biimp(Imp(Prop("p"), Prop("q")), Disj(Neg(Prop("p")), Prop("q")))))
+
+    def test_normalforms(self):
+        fml = Imp(Disj(Prop("p"), Prop("q")), Neg(Prop("r")))
+        assert str(fml.dnf(compact=True)) == \
+               str(Disj(Conj(Prop("p"), Neg(Prop("r"))),
+                        Conj(Neg(Prop("p")), Prop("q"), Neg(Prop("r"))),
+                        Conj(Neg(Prop("p")), Neg(Prop("q")))))
+        assert str(fml.cnf(compact=True)) == \
+               str(Conj(Disj(Neg(Prop("p")), Neg(Prop("r"))),
+                        Disj(Prop("p"), Neg(Prop("q")), Neg(Prop("r")))))
+        assert fml.clauses(compact=True) == [[(False, "p"), (False, "r")],
+                                             [(True, "p"), (False, "q"), (False, "r")]]
+        assert fml.equivalent(fml.dnf(compact=True))
+        assert fml.equivalent(fml.cnf(compact=True))
+
+        fml = Conj(*[Prop("p" + str(i)) for i in range(100)])
+        assert str(fml.dnf(compact=True)) == str(fml)
+
+    def test_gc(self):
+        bdd = BDD()
+        u = bdd.ref(bdd.from_expr(Conj(Prop("p"), Prop("q"))))
+        bdd.from_expr(Disj(*[Conj(Prop("a" + str(i)), Prop("b" + str(i))) for i in range(10)]))
+        size = len(bdd)
+        assert bdd.gc() > 0 and len(bdd) < size
+        assert bdd.count(u, 2) == 1
+        assert bdd.equivalent(u, bdd.from_expr(Conj(Prop("q"), Prop("p"))))
+
+        # unregistered results stay valid as long as gc is not called
+        bdd = BDD()
+        us = [bdd.from_expr(Disj(*[Conj(Prop("a" + str(i)), Prop("b" + str((i * j) % 10))) for i in range(10)]))
+              for j in range(20)]
+        assert len(bdd) > 100
+        assert us[0] == bdd.from_expr(Disj(*[Conj(Prop("a" + str(i)), Prop("b0")) for i in range(10)]))
+        assert all(bdd.count(u) > 0 for u in us)
+
+
+if __name__ == '__main__':
+    unittest.main()
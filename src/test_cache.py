@@ -0,0 +1,69 @@
+import unittest
+
+from expr import *
+from cache import *
+import cache
+import batch
+
+import os
+import tempfile
+import time
+
+
+class TestCache(unittest.TestCase):
+    def test_key(self):
+        results = ResultCache(tempfile.gettempdir())
+        fml = Imp(Prop("p"), Prop("q"))
+        key = results.key("tableau", fml, [Prop("p")], {"validity": True, "classical": True})
+        assert key == results.key("tableau", Imp(Prop("p"), Prop("q")), (Prop("p"),),
+                                  {"classical": True, "validity": True})
+        assert key != results.key("tableau", fml, [Prop("p")], {"validity": False, "classical": True})
+        assert key != results.key("tableau", fml, [Prop("q")], {"validity": True, "classical": True})
+        # results of other engine versions are not found
+        engine = cache.engine
+        try:
+            cache.engine = "0"
+            assert key != results.key("tableau", fml, [Prop("p")], {"validity": True, "classical": True})
+        finally:
+            cache.engine = engine
+
+    def test_lru(self):
+        with tempfile.TemporaryDirectory() as path:
+            results = ResultCache(path, max_size=1000)
+            keys = [results.key(i) for i in range(10)]
+            for i, key in enumerate(keys):
+                results.put(key, {"verdict": "valid", "i": i, "models": ["x" * 50]})
+                t = time.time() - 100 + i
+                os.utime(results.file(key), (t, t))
+            assert len(results) == 10 and results.get(keys[3])["i"] == 3
+            # entry 3 is now the most recently used
+            results.put(results.key(10), {"verdict": "valid", "models": ["x" * 500]})
+            assert results.size <= 900
+            assert results.get(keys[0]) is None
+            assert results.get(keys[3])["i"] == 3
+            assert results.get(results.key(10))
+            results.clear()
+            assert len(results) == 0
+            # several processes writing to the same cache stay within its bounds together
+            caches = [ResultCache(path, max_size=4000) for _ in range(4)]
+            for i in range(100):
+                caches[i % 4].put(caches[0].key(i), {"verdict": "valid", "models": ["x" * 50]})
+            assert sum([size for path, mtime, size in results.entries()]) <= 4000 * (1 + 4 / 10)
+
+    def test_solve(self):
+        with tempfile.TemporaryDirectory() as path:
+            prob = {"id": 1, "conclusion": "((p v q) -> p)", "action": "cmg", "propositional": True, "output": True}
+            res1 = batch.solve(prob, cache=path)
+            res2 = batch.solve(dict(prob, id=2), cache=path)
+            assert "cached" not in res1 and res2["cached"]
+            assert res1["verdict"] == res2["verdict"] == "invalid"
+            assert res1["models"] == res2["models"] and res1["output"] == res2["output"]
+            assert res2["id"] == 2
+            # stopped computations are not cached
+            prob = {"conclusion": r"(\all x \exi y R(x,y) -> \exi x R(x,x))", "timeout": 0}
+            batch.solve(prob, cache=path)
+            assert "cached" not in batch.solve(prob, cache=path)
+
+
+if __name__ == '__main__':
+    unittest.main()
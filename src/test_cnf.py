@@ -0,0 +1,51 @@
+import unittest
+
+from expr import *
+from cnf import *
+
+from itertools import product
+
+
+def models(cs):
+    # all satisfying valuations of a clause set, restricted to its named variables
+    named = [k for k in range(1, cs.num_vars + 1) if k not in cs.aux]
+    res = set()
+    for val in product([True, False], repeat=cs.num_vars):
+        if all(any(val[abs(lit) - 1] == (lit > 0) for lit in clause) for clause in cs):
+            res.add(tuple((cs.names[k - 1], val[k - 1]) for k in named))
+    return res
+
+
+class TestCNF(unittest.TestCase):
+    fmls = [Imp(Disj(Prop("p"), Prop("q")), Neg(Prop("r"))),
+            Biimp(Xor(Prop("p"), Prop("q")), Conj(Prop("q"), Neg(Prop("p")), Prop("r"))),
+            Conj(Disj(Prop("p"), Falsum()), Imp(Verum(), Neg(Prop("p")))),
+            Disj(Conj(Prop("p"), Prop("q")), Conj(Prop("r"), Prop("s")))]
+
+    def test_tseitin(self):
+        for fml in self.fmls:
+            cs = tseitin(fml)
+            expected = {tuple((p, val[p]) for p in cs.names if p in cs.ids)
+                        for val in [dict(zip(sorted(cs.ids), tvs)) for tvs in product([True, False], repeat=len(cs.ids))]
+                        if fml.denot(PropStructure("S", val))}
+            assert models(cs) == expected
+
+        fml = Conj(*[Disj(Prop("a" + str(i)), Prop("b" + str(i))) for i in range(100)])
+        cs = tseitin(fml)
+        assert len(cs) == 3 * 100 + 100 + 1 + 1
+        assert cs.num_vars == 2 * 100 + 100 + 1
+
+    def test_distribute(self):
+        for fml in self.fmls:
+            cs = distribute(fml)
+            assert not cs.aux
+            assert fml.equivalent(cs.formula())
+        cs = distribute(Disj(Conj(Prop("p"), Prop("q")), Conj(Prop("r"), Prop("s"))))
+        assert cs.clauses() == [[(True, "p"), (True, "r")], [(True, "p"), (True, "s")],
+                                [(True, "q"), (True, "r")], [(True, "q"), (True, "s")]]
+        cs = distribute(Conj(Prop("p"), Disj(Prop("p"), Prop("q")), Disj(Prop("q"), Neg(Prop("q")))))
+        assert cs.clauses() == [[(True, "p")]]
+
+
+if __name__ == '__main__':
+    unittest.main()
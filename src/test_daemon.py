@@ -0,0 +1,63 @@
+import unittest
+
+from daemon import *
+
+import tempfile
+
+
+class TestDaemon(unittest.TestCase):
+    def test_daemon(self):
+        requests = [{"id": 1, "action": "tp", "conclusion": "(p -> p)", "propositional": True},
+                    {"id": 2, "action": "cmg", "conclusion": "q", "premises": ["(p v q)"], "propositional": True},
+                    {"id": 3, "action": "tc", "conclusion": "(p v q)"},
+                    {"id": 4, "action": "mc", "structure": "V = [p: True, q: False]", "formulas": ["(p ^ q)"]},
+                    {"id": 5, "action": "xy"}]
+
+        async def run(path):
+            server = asyncio.create_task(daemon.serve_socket(path))
+            while not os.path.exists(path):
+                await asyncio.sleep(0.01)
+            loop = asyncio.get_running_loop()
+            res1 = await loop.run_in_executor(None, lambda: query(path, *requests))
+            res2 = await loop.run_in_executor(None, lambda: query(path, dict(requests[0], id=6)))
+            server.cancel()
+            return res1, res2
+
+        daemon = Daemon(jobs=2)
+        try:
+            daemon.start()
+            with tempfile.TemporaryDirectory() as tmp:
+                res1, res2 = asyncio.run(run(os.path.join(tmp, "pypl.sock")))
+        finally:
+            daemon.close()
+        res = {r["id"]: r for r in res1}
+        assert len(res) == 5
+        assert res[1]["verdict"] == "valid"
+        assert res[2]["verdict"] == "invalid" and res[2]["models"]
+        assert "contingent" in res[3]["output"]
+        assert "False" in res[4]["output"]
+        assert "error" in res[5]
+        # answered from the cache
+        assert daemon.hits == 1
+        assert dict(res2[0], id=1) == res[1]
+
+    def test_broken_pool(self):
+        request = {"id": 1, "action": "tp", "conclusion": "(p -> p)", "propositional": True}
+        daemon = Daemon(jobs=1)
+        try:
+            daemon.start()
+            # a worker dies: the request fails, and the next one gets a new pool
+            pool = daemon.pool
+            for process in pool._processes.values():
+                process.kill()
+            res = asyncio.run(daemon.handle(request))
+            assert res["id"] == 1 and "BrokenProcessPool" in res["error"]
+            assert daemon.pool is not pool
+            res = asyncio.run(daemon.handle(request))
+            assert res["verdict"] == "valid"
+        finally:
+            daemon.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,10 @@ import unittest
 from expr import *
 from denotation import *
 
+import importlib.util
+import os
+import tempfile
+
 
 class TestDenotation(unittest.TestCase):
     def test_pl(self):
@@ -45,6 +49,31 @@ class TestDenotation(unittest.TestCase):
         e = Eq(FuncTerm(Func("mother"), (Const("m"),)), Const("s"))
         assert e.denot(s) == True
     
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "requires numpy")
+    def test_fol_columnar(self):
+        d = {"roundbox", "roundlid", "rectbox", "rectlid", "bunny"}
+        i = {"b1": "roundbox", "b2": "rectbox", "f": "bunny", "Q": {()},
+              "box": {("roundbox", ), ("rectbox", )},
+              "lid": {("roundlid", ), ("rectlid", )},
+              "fit": {("roundlid", "roundbox"), ("rectlid", "rectbox")}
+        }
+        s = ColumnarPredStructure.from_structure(PredStructure("S", d, i))
+        assert s.i["fit"] == i["fit"] and len(s.i["box"]) == 2
+        assert s.tex() == PredStructure("S", d, i).tex()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "S.pyplcol")
+            s.save(path)
+            s = ColumnarPredStructure.load(path)
+            e = Atm(Pred("box"), (Const("b1"),))
+            assert e.denot(s) == True
+            e = Atm(Pred("Q"), ())
+            assert e.denot(s) == True
+            e = Forall(Var("x"), Imp(Atm(Pred("box"), (Var("x"),)), Exists(Var("y"), Conj(Atm(Pred("lid"), (Var("y"),)), Atm(Pred("fit"), (Var("y"), Var("x")))))))
+            assert e.denot(s) == True
+            e = Exists(Var("y"), Conj(Atm(Pred("lid"), (Var("y"),)), Forall(Var("x"), Imp(Atm(Pred("box"), (Var("x"),)), Atm(Pred("fit"), (Var("y"), Var("x")))))))
+            assert e.denot(s) == False
+            del s
+
     def test_ml_pl(self):
         w = {"w1", "w2"}
         r = {("w1", "w2")}
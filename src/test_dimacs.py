@@ -0,0 +1,34 @@
+import unittest
+
+from expr import *
+from dimacs import *
+from sat import Solver
+
+import io
+
+
+class TestDimacs(unittest.TestCase):
+    def test_read(self):
+        f = io.StringIO("c example\n"
+                        "p cnf 3 3\n"
+                        "1 -2 0\n"
+                        "2 3\n"
+                        "-1 0 -3 0\n")
+        cs = read(f)
+        assert cs.names == ["p1", "p2", "p3"]
+        assert [list(clause) for clause in cs] == [[1, -2], [2, 3, -1], [-3]]
+        assert Solver(cs, cs.num_vars).solve()
+
+    def test_roundtrip(self):
+        fml = Imp(Disj(Prop("p"), Prop("q")), Neg(Prop("r")))
+        f = io.StringIO()
+        cs = write_formulas(f, fml)
+        f.seek(0)
+        cs2 = read(f)
+        assert [list(clause) for clause in cs2] == [list(clause) for clause in cs]
+        assert all(cs2.names[k - 1] == p for (p, k) in cs.ids.items())
+        assert len(cs2.names) == cs.num_vars
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from output import *
+import output
+
+import contextlib
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+
+def document(body):
+    return "\\documentclass{article}\n\\begin{document}\n" + body + "\n\\end{document}\n"
+
+
+class TestOutput(unittest.TestCase):
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as path:
+            statuses = []
+            out = FileOutput(path, open_file=False, status=statuses.append)
+            res = out.write_output("p", latex=False)
+            assert res == out.paths[0] and os.path.dirname(res) == path
+            with open(res, encoding="utf-8") as f:
+                assert f.read() == "p"
+            assert statuses == ["Preparing output file..."]
+            # progress is not reported by default
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                FileOutput(path, open_file=False).write_output("q", latex=False)
+            assert not stdout.getvalue()
+
+    def test_latex(self):
+        tex1, tex2 = document("p"), document("q")
+        with tempfile.TemporaryDirectory() as cache:
+            # a cached PDF is reused without compiling
+            key = hashlib.sha256(tex1.encode("utf-8")).hexdigest()
+            with open(os.path.join(cache, key + ".pdf"), "wb") as f:
+                f.write(b"%PDF-1.5 cached")
+            paths = [os.path.join(cache, "out1.pdf"), os.path.join(cache, "out2.pdf")]
+            assert compile_many([tex1, tex1], paths, jobs=2, cache=cache) == [True, True]
+            for path in paths:
+                with open(path, "rb") as f:
+                    assert f.read() == b"%PDF-1.5 cached"
+            if not shutil.which("pdflatex"):
+                assert not compile_latex(tex2, os.path.join(cache, "out3.pdf"), cache=cache)
+                assert not os.path.exists(os.path.join(cache, "out3.pdf"))
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as cache:
+            for i in range(10):
+                path = os.path.join(cache, str(i) + ".pdf")
+                with open(path, "wb") as f:
+                    f.write(b"x" * 100)
+                t = time.time() - 100 + i
+                os.utime(path, (t, t))
+            evict(cache, max_size=2000)
+            assert len(os.listdir(cache)) == 10
+            # the least recently used files are removed
+            evict(cache, max_size=500)
+            assert sorted(os.listdir(cache)) == [str(i) + ".pdf" for i in range(6, 10)]
+
+    def test_failure_expiry(self):
+        preamble = document("").partition("\\begin{document}")[0]
+        with tempfile.TemporaryDirectory() as cache:
+            name = "preamble_" + hashlib.sha256(preamble.encode("utf-8")).hexdigest()[:16]
+            failed = os.path.join(cache, name + ".failed")
+            open(failed, "w").close()
+            # a recent failure is remembered
+            assert preamble_format(preamble, cache) is None
+            assert os.path.exists(failed)
+            # an expired one is tried again
+            t = time.time() - output.failure_expiry - 1
+            os.utime(failed, (t, t))
+            built = preamble_format(preamble, cache)
+            if not shutil.which("pdflatex"):
+                assert built is None and not os.path.exists(failed)
+
+
+if __name__ == '__main__':
+    unittest.main()
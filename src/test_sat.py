@@ -0,0 +1,78 @@
+import unittest
+
+from expr import *
+from sat import *
+from output import MemoryOutput
+
+from itertools import product
+import random
+
+
+class TestSat(unittest.TestCase):
+    def test_solver(self):
+        random.seed(0)
+        for _ in range(200):
+            n = random.randint(3, 8)
+            clauses = [[random.choice([1, -1]) * random.randint(1, n) for _ in range(random.randint(1, 3))]
+                       for _ in range(random.randint(1, 30))]
+            solver = Solver(clauses, n)
+            sat = any(all(any(val[abs(lit) - 1] == (lit > 0) for lit in clause) for clause in clauses)
+                      for val in product([True, False], repeat=n))
+            assert solver.solve() == sat
+            if sat:
+                assert all(any(solver.model[abs(lit)] == (lit > 0) for lit in clause) for clause in clauses)
+
+        # pigeonhole principle: 6 pigeons do not fit into 5 holes
+        var = lambda i, j: 5 * i + j + 1
+        clauses = [[var(i, j) for j in range(5)] for i in range(6)] + \
+                  [[-var(i1, j), -var(i2, j)] for j in range(5) for i1 in range(6) for i2 in range(i1 + 1, 6)]
+        assert not Solver(clauses).solve()
+
+    def test_inference(self):
+        fml1 = Imp(Prop("p"), Prop("q"))
+        fml2 = Imp(Prop("q"), Prop("r"))
+        fml = Imp(Prop("p"), Prop("r"))
+        sat = Sat(fml, premises=[fml1, fml2], silent=True)
+        assert sat.valid() and not sat.models
+
+        fml1 = Disj(Prop("p"), Prop("q"))
+        fml2 = Neg(Prop("p"))
+        fml = Neg(Prop("q"))
+        sat = Sat(fml, premises=[fml1, fml2], silent=True)
+        assert not sat.valid()
+        assert str(sat.models[0]) == str(PropStructure("S1", {"p": False, "q": True}))
+
+    def test_models(self):
+        fml = Disj(Conj(Prop("p"), Prop("q")), Neg(Prop("r")))
+        sat = Sat(fml, validity=False, satisfiability=True, num_models=10, silent=True)
+        assert sat.satisfiable()
+        assert len(sat.models) == 5
+        assert len({str(sorted(m.v.items())) for m in sat.models}) == 5
+        assert all(fml.denot(m) for m in sat.models)
+
+        sat = Sat(fml, validity=False, satisfiability=False, num_models=10, silent=True)
+        assert len(sat.models) == 3
+        assert not any(fml.denot(m) for m in sat.models)
+
+        fml = Conj(*[Biimp(Prop("p" + str(i)), Prop("p" + str(i + 1))) for i in range(100)])
+        sat = Sat(Prop("p0"), premises=[fml, Prop("p100")], silent=True)
+        assert sat.valid()
+
+    def test_no_conclusion(self):
+        # without a conclusion, the premises are proved inconsistent
+        sat = Sat(premises=[Prop("p"), Neg(Prop("p"))], silent=True)
+        assert sat.valid()
+        sat = Sat(premises=[Prop("p"), Imp(Prop("p"), Prop("q"))], silent=True)
+        assert not sat.valid() and str(sat.models[0]) == str(PropStructure("S1", {"p": True, "q": True}))
+        sat = Sat(premises=[Disj(Prop("p"), Prop("q"))], validity=False, satisfiability=True, num_models=10,
+                  silent=True)
+        assert len(sat.models) == 3
+        out = MemoryOutput()
+        sat = Sat(latex=False, silent=True, gui=out)
+        assert not sat.valid() and len(sat.models) == 1
+        sat.show()
+        assert "⊢ ⊥" in out.last
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,16 @@
 import unittest
+import io
+import os
+from unittest import mock
 
 from expr import *
 from tableau import *
+import tableau
+
+
+def dying(settings, validity, results):
+    # a worker process of `race` that dies without a result
+    os._exit(1)
 
 
 class TestTableau(unittest.TestCase):
@@ -179,5 +188,307 @@ class TestTableau(unittest.TestCase):
         assert tab.closed()
         assert len(tab) == 9
 
+    def test_budgets(self):
+        fml = Imp(Forall(Var("x"), Exists(Var("y"), Atm(Pred("R"), (Var("x"), Var("y"))))),
+                  Exists(Var("x"), Atm(Pred("R"), (Var("x"), Var("x")))))
+        tab = Tableau(fml, max_nodes=8, silent=True)
+        assert tab.infinite() and tab.stop_reason == "node limit"
+        assert len(tab) == 9
+        tab = Tableau(fml, max_depth=6, silent=True)
+        assert tab.infinite() and not tab.stop_reason
+        assert len(tab) == 7
+        tab = Tableau(fml, timeout=0, silent=True)
+        assert tab.infinite() and tab.stop_reason == "timeout"
+        cancel = __import__("threading").Event()
+        cancel.set()
+        tab = Tableau(fml, cancel=cancel, silent=True)
+        assert tab.infinite() and tab.stop_reason == "cancelled"
+        assert len(tab) == 1
+
+    def test_render(self):
+        fml = Imp(Disj(Prop("p"), Prop("q")), Conj(Prop("p"), Prop("r")))
+        for latex in [False, True]:
+            for hide_nonopen in [False, True]:
+                tab = Tableau(fml, validity=False, satisfiability=False, hide_nonopen=hide_nonopen, silent=True)
+                f = io.StringIO()
+                tab.root.writetree(f, latex)
+                assert f.getvalue() == (tab.root.treetex() if latex else tab.root.treestr())
+        tab1 = Tableau(fml, validity=False, satisfiability=False, silent=True)
+        tab2 = Tableau(fml, validity=False, satisfiability=False, hide_nonopen=True, silent=True)
+        assert tab1.root.treestr().startswith(str(tab1.root))
+        assert len(tab2.root.treestr()) < len(tab1.root.treestr())
+        assert len(tab2.root.layout()["open"]) < len(tab1.root.nodes())
+
+    def test_stepwise(self):
+        fml = Imp(Conj(Disj(Prop("p"), Prop("q")), Neg(Prop("p"))), Prop("q"))
+        tab = Tableau(fml, stepwise=True, latex=False, silent=True)
+        assert len(tab.steps) == len(tab.log) > 2
+        # the first step shows the assumptions, the last one the finished tree
+        assert tab.steps[0].count("(A)") == 1 and "(1, -→)" not in tab.steps[0]
+        assert tab.steps[-1] == tab.root.treestr()
+        # each step adds the nodes of one rule application
+        for i in range(1, len(tab.steps)):
+            target, source, rule, new, sources = tab.log[i]
+            assert all([node.step == i for node in new])
+            assert tab.steps[i - 1].count("\n") < tab.steps[i].count("\n")
+        f = io.StringIO()
+        tab.write_steps(f, [0, 2])
+        assert f.getvalue() == tab.steps[0] + "\n\n" + tab.steps[2]
+        assert tab.steps[1:3] == [tab.render_step(1), tab.render_step(2)]
+        assert "\\begin{forest}" in tab.render_step(1, latex=True)
+
+    def test_race(self):
+        # valid: the proof wins
+        fml = Imp(Conj(Prop("p"), Prop("q")), Prop("p"))
+        tab = race(fml, silent=True)
+        assert tab.mode["validity"] and tab.closed()
+        # invalid: the counter model wins
+        fml = Imp(Disj(Prop("p"), Prop("q")), Prop("p"))
+        tab = race(fml, silent=True)
+        assert not tab.mode["validity"] and tab.open()
+        assert str(tab.models[0]) == str(Tableau(fml, validity=False, satisfiability=False, silent=True).models[0])
+        # invalid with an infinite proof search
+        fml = Imp(Forall(Var("x"), Exists(Var("y"), Atm(Pred("R"), (Var("x"), Var("y"))))),
+                  Exists(Var("x"), Atm(Pred("R"), (Var("x"), Var("x")))))
+        tab = race(fml, silent=True)
+        assert not tab.mode["validity"] and (tab.open() or tab.infinite())
+        # the workers die
+        with mock.patch.object(tableau, "race_worker", dying):
+            with self.assertRaises(RuntimeError):
+                race(fml, silent=True)
+
+    def test_parallel(self):
+        p, q, r, s = Prop("p"), Prop("q"), Prop("r"), Prop("s")
+        premises = [Disj(p, q), Disj(r, s), Disj(p, s)]
+        for fml in [Conj(Disj(p, q), Disj(r, s)), Conj(p, r)]:
+            seq = Tableau(fml, premises=premises, propositional=True, silent=True)
+            par = Tableau(fml, premises=premises, propositional=True, silent=True, parallel=2)
+            assert par.closed() == seq.closed() and par.open() == seq.open()
+            assert len(par) == len(seq) and par.num_branches == seq.num_branches
+            # the same models, named after different lines
+            assert sorted([str(m.v) for m in par.models]) == sorted([str(m.v) for m in seq.models])
+            # the lines are numbered consecutively, and contradictions refer to nodes on their branch
+            lines = [node.line for node in par.root.nodes() if node.line]
+            assert sorted(lines) == list(range(1, len(par) + 1))
+            for node in par.root.nodes():
+                assert node.branch[-1] is node and node.tableau is par
+                if node.rule == "±":
+                    assert node.inst[0] in [n.line for n in node.branch]
+
+    def test_depth_first(self):
+        p, q, r, s = Prop("p"), Prop("q"), Prop("r"), Prop("s")
+        premises = [Disj(p, q), Disj(r, s), Disj(p, s)]
+        # valid: the closed subtrees are discarded
+        fml = Conj(Disj(p, q), Disj(r, s))
+        full = Tableau(fml, premises=premises, propositional=True, silent=True)
+        lean = Tableau(fml, premises=premises, propositional=True, silent=True, depth_first=True)
+        assert full.closed() and lean.closed()
+        assert len(lean) == len(full) and lean.num_branches == full.num_branches
+        assert len(lean.root.nodes()) < len(full.root.nodes()) / 10
+        # the branches are not expanded in parallel, as the closed subtrees are discarded
+        par = Tableau(fml, premises=premises, propositional=True, silent=True, depth_first=True, parallel=2)
+        assert par.closed() and len(par) == len(full)
+        # neither the incomplete tree nor its steps are shown
+        out = __import__("output").MemoryOutput()
+        lean = Tableau(fml, premises=premises, propositional=True, silent=True, depth_first=True,
+                       stepwise=True, latex=False, gui=out)
+        lean.show()
+        assert not lean.stepwise and "discarded" in out.last and "×" not in out.last
+        assert "valid" in out.last
+        # invalid: the open branches and their models are kept
+        fml = Conj(p, r)
+        full = Tableau(fml, premises=premises, propositional=True, silent=True)
+        lean = Tableau(fml, premises=premises, propositional=True, silent=True, depth_first=True)
+        assert lean.open()
+        assert [str(m.v) for m in lean.models] == [str(m.v) for m in full.models]
+        # model generation: rules may be left when no branch is unfinished
+        for fml, premises in [(r, [Nec(Poss(r))]), (Biimp(Nec(Poss(r)), r), [])]:
+            full = Tableau(fml, premises=premises, propositional=True, modal=True,
+                           validity=False, satisfiability=False, silent=True)
+            lean = Tableau(fml, premises=premises, propositional=True, modal=True,
+                           validity=False, satisfiability=False, silent=True, depth_first=True)
+            assert lean.closed() == full.closed()
+
+    def test_backjumping(self):
+        p, q, r, s, t = Prop("p"), Prop("q"), Prop("r"), Prop("s"), Prop("t")
+        # valid, with irrelevant branching premises: their other branches are closed right away
+        fml = Conj(p, q)
+        premises = [Disj(r, s), Disj(s, t), Disj(Conj(p, r), Conj(p, s)), Imp(p, q)]
+        full = Tableau(fml, premises=premises, propositional=True, silent=True, size_limit_factor=10)
+        jump = Tableau(fml, premises=premises, propositional=True, silent=True, size_limit_factor=10,
+                       backjumping=True)
+        assert full.closed() and jump.closed()
+        assert len(jump) < len(full)
+        # invalid: the open branches and their models are kept
+        premises = [Disj(r, s), Disj(p, q)]
+        full = Tableau(fml, premises=premises, propositional=True, silent=True)
+        jump = Tableau(fml, premises=premises, propositional=True, silent=True, backjumping=True)
+        assert jump.open()
+        assert [str(m) for m in jump.models] == [str(m) for m in full.models]
+
+    def test_regularity(self):
+        p, q, r, s = Prop("p"), Prop("q"), Prop("r"), Prop("s")
+        fml = Conj(p, q)
+        premises = [Disj(p, q), Conj(p, r), Disj(r, s), Imp(p, q)]
+        full = Tableau(fml, premises=premises, propositional=True, silent=True)
+        regular = Tableau(fml, premises=premises, propositional=True, silent=True, regularity=True)
+        assert full.closed() and regular.closed()
+        assert len(regular) < len(full) and regular.num_skipped == 2 and full.num_skipped == 0
+        # no formula occurs twice with the same sign on a branch
+        for leaf in regular.root.leaves(True) + [leaf.branch[-2] for leaf in regular.root.leaves()]:
+            fmls = [(node.sign, str(node.fml)) for node in leaf.branch]
+            assert len(fmls) == len(set(fmls))
+        # instances of universal formulas already on the branch are not added again
+        fml = Imp(Exists(Var("x"), Conj(Atm(Pred("P"), (Var("x"),)), Atm(Pred("Q"), (Var("x"),)))),
+                  Forall(Var("x"), Atm(Pred("P"), (Var("x"),))))
+        premises = [Forall(Var("x"), Disj(Atm(Pred("P"), (Var("x"),)), Atm(Pred("Q"), (Var("x"),))))]
+        full = Tableau(fml, premises=premises, validity=False, silent=True)
+        regular = Tableau(fml, premises=premises, validity=False, silent=True, regularity=True)
+        assert full.open() and regular.open()
+        assert len(regular) < len(full) and regular.num_skipped > 0
+
+    def test_freevars(self):
+        x, y, a, b = Var("x"), Var("y"), Const("a"), Const("b")
+        P, Q = (lambda t: Atm(Pred("P"), (t,))), (lambda t: Atm(Pred("Q"), (t,)))
+        R = lambda s, t: Atm(Pred("R"), (s, t))
+        # one instance of a universal formula closes both branches below it
+        ground = Tableau(Q(a), premises=[Forall(x, Imp(P(x), Q(x))), P(a)], silent=True)
+        free = Tableau(Q(a), premises=[Forall(x, Imp(P(x), Q(x))), P(a)], silent=True, freevars=True)
+        assert ground.closed() and free.closed() and len(free) == len(ground)
+        assert free.num_freevars == 1 and str(free.bindings["X1"]) == "a"
+        assert "X1" not in [str(node.fml) for node in free.root.nodes()]
+        # different branches need different instances of the same universal formula
+        premises = [Forall(x, Imp(P(x), Q(x))), P(a), P(b)]
+        ground = Tableau(Conj(Q(a), Q(b)), premises=premises, silent=True)
+        free = Tableau(Conj(Q(a), Q(b)), premises=premises, silent=True, freevars=True)
+        assert ground.closed() and free.closed() and len(free) <= len(ground)
+        assert free.num_freevars == 2 and {u: str(t) for u, t in free.bindings.items()} == {"X1": "a", "X2": "b"}
+        # the instances are found by unification instead of trying out constants
+        fml = Imp(Forall(x, Forall(y, Imp(R(x, y), R(y, x)))), Imp(R(a, b), R(b, a)))
+        free = Tableau(fml, silent=True, freevars=True)
+        assert free.closed() and len(free) < len(Tableau(fml, silent=True, max_nodes=len(free) * 4))
+        # negated equalities close by unification
+        free = Tableau(Neg(Forall(x, Neg(Eq(x, a)))), silent=True, freevars=True)
+        assert free.closed() and free.num_freevars == 1
+        # existential formulas with free variables are instantiated with Skolem terms (and the occurs check applies)
+        free = Tableau(Exists(y, Forall(x, R(x, y))), premises=[Forall(x, Exists(y, R(x, y)))],
+                       silent=True, freevars=True, max_nodes=20)
+        assert not free.closed() and free.num_skolems > 0
+        assert "sk1(X1)" in [str(term) for node in free.root.nodes() if isinstance(node.fml, Atm)
+                             for term in node.fml.terms]
+        assert unify((Var("X1"), b), (FuncTerm(Func("f"), (Var("X2"),)), Var("X2"))) == \
+               {"X1": FuncTerm(Func("f"), (b,)), "X2": b}
+        assert unify((Var("X1"),), (FuncTerm(Func("f"), (Var("X1"),)),)) is None
+
+    def test_congruence(self):
+        a, b, c, d = Const("a"), Const("b"), Const("c"), Const("d")
+        P, f = (lambda t: Atm(Pred("P"), (t,))), (lambda t: FuncTerm(Func("f"), (t,)))
+        # a chain of equalities closes the branch without substitution nodes
+        premises = [Eq(a, b), Eq(b, c), Eq(c, d), P(a)]
+        full = Tableau(P(d), premises=premises, silent=True)
+        congruent = Tableau(P(d), premises=premises, silent=True, congruence=True)
+        assert full.closed() and congruent.closed() and len(congruent) < len(full)
+        assert not [node for node in congruent.root.nodes() if node.rule == "="]
+        # function terms with equal arguments are equal
+        for fml, premises in [(Eq(f(a), f(c)), [Eq(a, b), Eq(b, c)]), (P(f(f(a))), [Eq(f(a), a), P(a)]),
+                              (Neg(Eq(a, b)), [Disj(P(a), P(c)), Neg(P(b)), Eq(a, c)])]:
+            assert Tableau(fml, premises=premises, silent=True, congruence=True).closed()
+        assert Tableau(P(b), premises=[Eq(a, c), P(a)], silent=True, congruence=True).open()
+        congruence = Congruence()
+        congruence.merge(f(a), b)
+        congruence.merge(a, c)
+        assert congruence.equal(f(c), b) and not congruence.equal(a, b)
+
+    def test_blocking(self):
+        p, q = Prop("p"), Prop("q")
+        # invalid formulas over transitive frames are decided instead of cut off
+        for fml, frame in [(Imp(Conj(Poss(p), Nec(Poss(p))), Poss(q)), "K4"), (Imp(Nec(Poss(p)), Poss(q)), "S4")]:
+            full = Tableau(fml, propositional=True, modal=True, frame=frame, silent=True)
+            blocked = Tableau(fml, propositional=True, modal=True, frame=frame, silent=True, blocking=True)
+            assert not full.open() and not full.closed()
+            assert blocked.open() and blocked.models
+            leaf = [leaf for leaf in blocked.root.leaves() if isinstance(leaf.fml, Open)][0]
+            assert any([blocked.blocked(leaf, node.world) is not None for node in leaf.branch if node.world])
+        # valid formulas are still proved
+        for fml, frame in [(Imp(Nec(p), Nec(Nec(p))), "K4"), (Imp(Nec(p), p), "S4")]:
+            assert Tableau(fml, propositional=True, modal=True, frame=frame, silent=True, blocking=True).closed()
+        # the size limit does not cut off tableaus that blocking keeps finite
+        for fml in [Nec(Nec(Poss(Nec(q)))), Neg(Nec(Poss(Poss(p))))]:
+            tab = Tableau(fml, propositional=True, modal=True, frame="S4", silent=True, blocking=True)
+            assert tab.open() and not tab.infinite()
+        # model generation with blocking finds additional models
+        tab = Tableau(Nec(Nec(p)), validity=False, satisfiability=False, propositional=True, modal=True,
+                      frame="T", num_models=3, silent=True, blocking=True)
+        assert tab.open()
+
+    def test_allocator(self):
+        constants = Allocator(parameter, ["a", "c", "c2"])
+        assert constants.take(3) == ["b", "d", "e"]
+        assert [parameter(i) for i in [0, 19, 20, 21]] == ["a", "t", "c1", "c2"]
+        assert "c2" not in constants.take(30)
+        # fresh symbols never run out
+        worlds = Allocator(lambda i: i + 1, range(1, 1500))
+        assert next(worlds) == 1500 and next(worlds) == 1501
+        constants = Allocator(parameter, [parameter(i) for i in range(1200)])
+        assert next(constants) == "c1181"
+        # a world is left to choose for each additional model
+        p, q = Prop("p"), Prop("q")
+        fml = Conj(Poss(Poss(p)), Nec(Poss(q)))
+        tab = Tableau(fml, validity=False, satisfiability=False, propositional=True, modal=True,
+                      num_models=2, silent=True)
+        assert not tab.root.leaves(True)
+
+    def test_partial_model(self):
+        P, Q = Pred("P"), Pred("Q")
+        a, b = Const("a"), Const("b")
+        fml = Conj(Atm(P, (a,)), Disj(Atm(Q, (b,)), Neg(Atm(P, (b,)))))
+        tab = Tableau(fml, validity=False, num_models=2, silent=True)
+        assert tab.open() and len(tab.models) == 2
+        assert sorted([sorted([(p, sorted(terms)) for p, terms in m.i.items()]) for m in tab.models]) == \
+               [[("P", [("a",)]), ("Q", [])], [("P", [("a",)]), ("Q", [("b",)])]]
+        assert all([m.d == {"a", "b"} for m in tab.models])
+        # nodes that add nothing to the model of the branch share their parent's
+        for node in tab.root.nodes():
+            if len(node.branch) > 1 and not isinstance(node.fml, (Atm, Pseudo)):
+                assert node.partial is node.branch[-2].partial
+
+    def test_isomorphic_models(self):
+        structure = __import__("structure")
+        P, Q = Pred("P"), Pred("Q")
+        x, y = Var("x"), Var("y")
+        # ∃x(Px ∨ Qx) ∧ ∃y(Py ∨ Qy) has 6 open branches, but only 5 models up to renaming the two individuals
+        fml = Conj(Exists(x, Disj(Atm(P, (x,)), Atm(Q, (x,)))), Exists(y, Disj(Atm(P, (y,)), Atm(Q, (y,)))))
+        tab = Tableau(fml, validity=False, num_models=8, silent=True)
+        assert len(tab.models) == 5
+        assert len({m.canonical() for m in tab.models}) == 5
+        tab = Tableau(fml, validity=False, num_models=3, silent=True)
+        assert len(tab.models) == 3
+        # discarding a model continues the expansion into choices of worlds for additional models
+        p, r = Prop("p"), Prop("r")
+        tab = Tableau(Disj(Nec(Conj(p, r)), p), premises=[Biimp(Disj(p, p), r)], validity=False,
+                      satisfiability=True, propositional=True, modal=True, num_models=2, silent=True)
+        assert len(tab.models) == 1
+        assert tab.models[0].v == {"p": {"w1": True}, "r": {"w1": True}}
+        # renamings have the same canonical form, unless they rename named individuals
+        s1 = structure.PredStructure("S1", {"a", "b"}, {"P": {("a",)}, "R": {("a", "b")}})
+        s2 = structure.PredStructure("S2", {"a", "b"}, {"P": {("b",)}, "R": {("b", "a")}})
+        s3 = structure.PredStructure("S3", {"a", "b"}, {"P": {("b",)}, "R": {("a", "b")}})
+        assert s1.canonical() == s2.canonical() != s3.canonical()
+        assert s1.canonical(["a"]) != s2.canonical(["a"])
+        # a hexagon and two triangles are not distinguished by colour refinement alone
+        hexagon = {(str(n), str((n + 1) % 6)) for n in range(6)}
+        triangles = {(str(n), str(n + 1 if n % 3 < 2 else n - 2)) for n in range(6)}
+        s4 = structure.PredStructure("S4", {str(n) for n in range(6)}, {"R": hexagon})
+        s5 = structure.PredStructure("S5", {str(n) for n in range(6)}, {"R": triangles})
+        assert s4.canonical() != s5.canonical()
+        w = {"w1", "w2", "w3"}
+        s6 = structure.PropModalStructure("S6", w, {("w1", "w2"), ("w1", "w3")},
+                                          {"p": {"w1": False, "w2": True, "w3": False}})
+        s7 = structure.PropModalStructure("S7", w, {("w1", "w2"), ("w1", "w3")},
+                                          {"p": {"w1": False, "w2": False, "w3": True}})
+        s8 = structure.PropModalStructure("S8", w, {("w1", "w2"), ("w2", "w3")},
+                                          {"p": {"w1": False, "w2": False, "w3": True}})
+        assert s6.canonical() == s7.canonical() != s8.canonical()
+
 if __name__ == '__main__':
     unittest.main()
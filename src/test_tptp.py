@@ -0,0 +1,57 @@
+import unittest
+
+from expr import *
+from tptp import *
+
+import io
+import os
+import tempfile
+
+
+class TestTPTP(unittest.TestCase):
+    problem = "% comment\n" \
+              "/* block\n" \
+              "   comment */\n" \
+              "fof(box_lid, axiom, ! [X] : ( box(X) => ? [Y] : ( lid(Y) & fit(Y,X) ) )).\n" \
+              "fof(b1, axiom, box(b1) & 'Big box'(b1) & q, [source]).\n" \
+              "fof(eq, hypothesis, f(b1) != b1 | $false).\n" \
+              "cnf(c1, axiom, ~ p(X) | p(f(X))).\n" \
+              "fof(goal, conjecture, ? [Y,Z] : (lid(Y) & fit(Y,Z)) <=> ~ q).\n"
+
+    def test_read(self):
+        stmts = list(Reader(io.StringIO(self.problem)))
+        assert [(name, role) for (name, role, fml) in stmts] == \
+               [("box_lid", "axiom"), ("b1", "axiom"), ("eq", "hypothesis"), ("c1", "axiom"), ("goal", "conjecture")]
+        assert stmts[0][2] == Forall(Var("x"), Imp(Atm(Pred("box"), (Var("x"),)),
+                                                   Exists(Var("y"), Conj(Atm(Pred("lid"), (Var("y"),)),
+                                                                         Atm(Pred("fit"), (Var("y"), Var("x")))))))
+        assert stmts[1][2] == Conj(Atm(Pred("box"), (Const("b1"),)), Atm(Pred("Big box"), (Const("b1"),)), Prop("q"))
+        assert stmts[2][2] == Disj(Neg(Eq(FuncTerm(Func("f"), (Const("b1"),)), Const("b1"))), Falsum())
+        assert stmts[3][2] == Forall(Var("x"), Disj(Neg(Atm(Pred("p"), (Var("x"),))),
+                                                    Atm(Pred("p"), (FuncTerm(Func("f"), (Var("x"),)),))))
+        assert stmts[4][2] == Biimp(Exists(Var("y"), Var("z"), Conj(Atm(Pred("lid"), (Var("y"),)),
+                                                                    Atm(Pred("fit"), (Var("y"), Var("z"))))),
+                                    Neg(Prop("q")))
+
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "problem.p")
+            with open(path, "w") as f:
+                f.write(self.problem)
+            conclusion, premises = read_problem(path)
+            with open(path, "w") as f:
+                write(f, conclusion, premises)
+            assert read_problem(path) == (conclusion, premises)
+        assert formula(premises[1]) == "box(b1) & 'Big box'(b1) & q"
+
+    def test_unsupported(self):
+        with self.assertRaises(SyntaxError):
+            list(Reader(io.StringIO("thf(t, axiom, p).\n")))
+        with self.assertRaises(SyntaxError):
+            list(Reader(io.StringIO("fof(t, axiom, p($sum)).\n")))
+        with self.assertRaises(ValueError):
+            formula(Nec(Prop("p")))
+
+
+if __name__ == '__main__':
+    unittest.main()
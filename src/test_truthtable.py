@@ -2,6 +2,7 @@ import unittest
 
 from expr import *
 from truthtable import *
+from output import *
 
 
 class TestTruthtable(unittest.TestCase):
@@ -29,6 +30,14 @@ class TestTruthtable(unittest.TestCase):
         tt = Truthtable(None, premises=[fml1, fml2], silent=True)
         assert tt.satisfiable()
 
+    def test_output(self):
+        fml = Disj(Prop("p"), Neg(Prop("p")))
+        out = MemoryOutput()
+        Truthtable(fml, latex=False, gui=out)
+        assert len(out.results) == 1 and not out.results[0][1]
+        assert "The sentence is valid." in out.last
+        Truthtable(fml, latex=False, gui=NullOutput())
+
     def test_edgecase(self):
         fml = Verum()
         tt = Truthtable(fml, silent=True)
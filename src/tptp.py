@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reading and writing problems in the TPTP FOF (and CNF) format.
+
+Formulas are mapped directly to and from the classes of `expr`:
+  - TPTP variables (upper case) become variables with the name in lower case, and vice versa;
+  - 0-place predicates become propositional variables;
+  - other non-logical symbols keep their names, which are single-quoted on output unless they are lower words;
+  - the roles "conjecture" and "negated_conjecture" mark the conclusion and the negated conclusion,
+    all other roles (axiom, hypothesis, definition, ...) the premises.
+"""
+
+from expr import *
+
+import os
+import re
+
+tokens = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<comment>%.*)
+    | (?P<blockcomment>/\*)
+    | (?P<quoted>'(?:[^'\\]|\\.)*')
+    | (?P<distinct>"(?:[^"\\]|\\.)*")
+    | (?P<op><=>|<~>|=>|<=|~\||~&|!=|[!?~&|=(),\[\]:.])
+    | (?P<defined>\$\$?\w+)
+    | (?P<word>[\w]+)
+""", re.VERBOSE)
+
+
+def tokenize(f):
+    """
+    Split the lines of a TPTP file into tokens, dropping whitespace and comments.
+
+    @param f: the lines of the file (such as an open file object)
+    @type f: Iterable[str]
+    @rtype: Iterator[tuple[str,str]]
+    """
+    in_comment = False
+    for line in f:
+        pos = 0
+        while pos < len(line):
+            if in_comment:
+                end = line.find("*/", pos)
+                if end < 0:
+                    break
+                pos, in_comment = end + 2, False
+                continue
+            m = tokens.match(line, pos)
+            if not m:
+                raise SyntaxError("unexpected character in TPTP input: " + line[pos:].strip())
+            pos = m.end()
+            kind = m.lastgroup
+            if kind == "blockcomment":
+                in_comment = True
+            elif kind not in ["space", "comment"]:
+                yield kind, m.group()
+
+
+class Reader:
+    """
+    A reader for the statements of a TPTP file.
+    The statements are parsed one at a time from a stream of tokens,
+    so that large problem files do not have to be held in memory.
+
+    @attr path: the path of the file (for resolving includes)
+    @type path: str
+    """
+
+    def __init__(self, f, path=""):
+        self.path = path
+        self.toks = tokenize(f)
+        self.tok = None
+        self.next()
+
+    def next(self):
+        self.tok = next(self.toks, (None, None))
+
+    def expect(self, val):
+        if self.tok[1] != val:
+            raise SyntaxError("expected '" + val + "' in TPTP input, got '" + str(self.tok[1]) + "'")
+        self.next()
+
+    def name(self):
+        kind, val = self.tok
+        if kind not in ["word", "quoted"]:
+            raise SyntaxError("expected a name in TPTP input, got '" + str(val) + "'")
+        self.next()
+        return unquote(val) if kind == "quoted" else val
+
+    def __iter__(self):
+        """
+        The statements of the file, with included files resolved.
+
+        @return: triples of the name, role and formula of each statement
+        @rtype: Iterator[tuple[str,str,Formula]]
+        """
+        while self.tok[0]:
+            lang = self.name()
+            self.expect("(")
+            if lang == "include":
+                path = self.name()
+                if self.tok[1] == ",":  # selection of formulas, not supported
+                    self.skip()
+                self.expect(")")
+                self.expect(".")
+                yield from read(resolve(path, self.path))
+                continue
+            if lang not in ["fof", "cnf"]:
+                raise SyntaxError("TPTP language not supported: " + lang)
+            name = self.name()
+            self.expect(",")
+            role = self.name()
+            self.expect(",")
+            fml = self.formula()
+            if lang == "cnf":
+                fml = fml.univ_closure() if fml.freevars() else fml
+            if self.tok[1] == ",":  # annotations
+                self.skip()
+            self.expect(")")
+            self.expect(".")
+            yield name, role, fml
+
+    def skip(self):
+        # skip tokens up to the closing parenthesis of the current statement
+        depth = 0
+        while self.tok[0] and (depth or self.tok[1] != ")"):
+            if self.tok[1] in ["(", "["]:
+                depth += 1
+            elif self.tok[1] in [")", "]"]:
+                depth -= 1
+            self.next()
+
+    binary = {"=>": Imp, "<=>": Biimp, "<~>": Xor,
+              "<=": lambda phi, psi: Imp(psi, phi),
+              "~|": lambda phi, psi: Neg(Disj(phi, psi)),
+              "~&": lambda phi, psi: Neg(Conj(phi, psi))}
+
+    def formula(self):
+        """
+        formula := unitary ((& unitary)* | (| unitary)* | binop unitary)
+        """
+        phi = self.unitary()
+        op = self.tok[1]
+        if op in ["&", "|"]:
+            args = [phi]
+            while self.tok[1] == op:
+                self.next()
+                args.append(self.unitary())
+            # build the chain iteratively, to allow for long conjunctions and disjunctions
+            junctor = Conj if op == "&" else Disj
+            res = args[-1]
+            for arg in reversed(args[:-1]):
+                res = junctor(arg, res)
+            return res
+        if op in self.binary:
+            self.next()
+            return self.binary[op](phi, self.unitary())
+        return phi
+
+    def unitary(self):
+        """
+        unitary := (formula) | ~ unitary | quantifier [vars] : unitary | atom
+        """
+        kind, val = self.tok
+        if val == "(":
+            self.next()
+            phi = self.formula()
+            self.expect(")")
+            return phi
+        if val == "~":
+            self.next()
+            return Neg(self.unitary())
+        if val in ["!", "?"]:
+            self.next()
+            self.expect("[")
+            us = [self.variable()]
+            while self.tok[1] == ",":
+                self.next()
+                us.append(self.variable())
+            self.expect("]")
+            self.expect(":")
+            return (Forall if val == "!" else Exists)(*us, self.unitary())
+        return self.atom()
+
+    def variable(self):
+        kind, val = self.tok
+        if kind != "word" or not val[0].isupper():
+            raise SyntaxError("expected a variable in TPTP input, got '" + str(val) + "'")
+        self.next()
+        return Var(val.lower())
+
+    def atom(self):
+        """
+        atom := $true | $false | term = term | term != term | predicate(terms) | proposition
+        """
+        kind, val = self.tok
+        if val == "$true":
+            self.next()
+            return Verum()
+        if val == "$false":
+            self.next()
+            return Falsum()
+        tau = self.term()
+        if self.tok[1] in ["=", "!="]:
+            neg = self.tok[1] == "!="
+            self.next()
+            fml = Eq(tau, self.term())
+            return Neg(fml) if neg else fml
+        # reinterpret the term as an atomic formula
+        if isinstance(tau, FuncTerm):
+            return Atm(Pred(tau.f.f), tau.terms)
+        if isinstance(tau, Const):
+            return Prop(tau.c)
+        raise SyntaxError("expected a formula in TPTP input, got variable '" + str(tau) + "'")
+
+    def term(self):
+        """
+        term := Variable | function(terms) | constant
+        """
+        kind, val = self.tok
+        if kind == "word" and val[0].isupper():
+            return self.variable()
+        if kind == "distinct":
+            self.next()
+            return Const(val)
+        if kind == "defined":
+            raise SyntaxError("TPTP defined symbol not supported: " + val)
+        f = self.name()
+        if self.tok[1] != "(":
+            return Const(f)
+        self.next()
+        terms = [self.term()]
+        while self.tok[1] == ",":
+            self.next()
+            terms.append(self.term())
+        self.expect(")")
+        return FuncTerm(Func(f), tuple(terms))
+
+
+def unquote(s):
+    return re.sub(r"\\(.)", r"\1", s[1:-1])
+
+
+def resolve(path, including=""):
+    """
+    The location of an included file:
+    relative to the including file, or else relative to the TPTP directory given by the environment variable TPTP.
+    """
+    for base in [os.path.dirname(including), os.environ.get("TPTP", "")]:
+        candidate = os.path.join(base, path)
+        if os.path.exists(candidate):
+            return candidate
+    return path
+
+
+def read(path):
+    """
+    Read the statements of a TPTP file one by one.
+
+    @param path: the path of the file
+    @type path: str
+    @return: triples of the name, role and formula of each statement
+    @rtype: Iterator[tuple[str,str,Formula]]
+    """
+    with open(path, encoding="utf-8") as f:
+        yield from Reader(f, path)
+
+
+def read_problem(path):
+    """
+    Read a TPTP problem into a conclusion and premises as expected by the engines.
+    A negated conjecture is taken as a premise, so that the problem is an unsatisfiability problem.
+
+    @param path: the path of the file
+    @type path: str
+    @return: the conclusion (None if there is no conjecture) and the premises
+    @rtype: tuple[Formula,list[Formula]]
+    """
+    conclusion, premises = None, []
+    for name, role, fml in read(path):
+        if role == "conjecture":
+            conclusion = fml if not conclusion else Conj(conclusion, fml)
+        else:
+            premises.append(fml)
+    return conclusion, premises
+
+
+lower_word = re.compile(r"[a-z][A-Za-z0-9_]*$")
+
+
+def symbol(s):
+    """
+    A non-logical symbol in TPTP syntax, single-quoted unless it is a lower word.
+    """
+    return s if lower_word.match(s) else "'" + s.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def variable(u):
+    """
+    A variable in TPTP syntax (with an upper case initial).
+    """
+    u = re.sub(r"\W", "_", u)
+    return u[0].upper() + u[1:]
+
+
+def formula(e):
+    """
+    A formula in TPTP FOF syntax.
+
+    @param e: the formula
+    @type e: Formula
+    @rtype: str
+    """
+    if isinstance(e, Var):
+        return variable(e.u)
+    if isinstance(e, Const):
+        return symbol(e.c)
+    if isinstance(e, FuncTerm):
+        return symbol(e.f.f) + "(" + ",".join([formula(t) for t in e.terms]) + ")"
+    if isinstance(e, Prop):
+        return symbol(e.p)
+    if isinstance(e, Atm):
+        return symbol(e.pred.p) + ("(" + ",".join([formula(t) for t in e.terms]) + ")" if e.terms else "")
+    if isinstance(e, Eq):
+        return formula(e.tau) + " = " + formula(e.rho)
+    if isinstance(e, Verum):
+        return "$true"
+    if isinstance(e, Falsum):
+        return "$false"
+    if isinstance(e, Neg):
+        if isinstance(e.phi, Eq):
+            return formula(e.phi.tau) + " != " + formula(e.phi.rho)
+        return "~ " + unitary(e.phi)
+    if isinstance(e, Exists) or isinstance(e, Forall):
+        us = [e.u]
+        phi = e.phi
+        while type(phi) == type(e):
+            us.append(phi.u)
+            phi = phi.phi
+        return ("! " if isinstance(e, Forall) else "? ") + "[" + ",".join([formula(u) for u in us]) + "] : " + \
+               unitary(phi)
+    ops = {Conj: " & ", Disj: " | ", Imp: " => ", Biimp: " <=> ", Xor: " <~> "}
+    if type(e) in ops:
+        if type(e) in [Conj, Disj]:
+            # flatten associative chains
+            args, phi = [e.phi], e.psi
+            while type(phi) == type(e):
+                args.append(phi.phi)
+                phi = phi.psi
+            return ops[type(e)].join([unitary(arg) for arg in args + [phi]])
+        return unitary(e.phi) + ops[type(e)] + unitary(e.psi)
+    raise ValueError("expression not expressible in TPTP FOF: " + str(e))
+
+
+def unitary(e):
+    # a formula wrapped in parentheses if it is binary
+    res = formula(e)
+    return "(" + res + ")" if type(e) in [Conj, Disj, Imp, Biimp, Xor, Eq] else res
+
+
+def write(f, conclusion=None, premises=[], name="pypl"):
+    """
+    Write a problem in TPTP FOF syntax, with the premises as axioms and the conclusion as conjecture.
+
+    @param f: the file to write to
+    @type f: TextIO
+    @param conclusion: the conclusion (if any)
+    @type conclusion: Formula
+    @param premises: the premises
+    @type premises: list[Formula]
+    @param name: the prefix of the names of the statements
+    @type name: str
+    """
+    for i, fml in enumerate(premises):
+        f.write("fof(" + name + "_ax" + str(i + 1) + ",axiom,\n    " + formula(fml) + ").\n")
+    if conclusion:
+        f.write("fof(" + name + "_conj,conjecture,\n    " + formula(conclusion) + ").\n")
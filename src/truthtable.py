@@ -22,7 +22,7 @@ class Truthtable():
         self.silent = silent
         self.gui = gui
         if not self.gui:
-            self.gui = __import__("gui").PyPLGUI(True)
+            self.gui = __import__("output").default_output()
         
         self.pvs = sorted(list((self.concl.propvars() if self.concl else set()).union(*[p.propvars() for p in self.prems])))
         vprod = list(product([True, False], repeat=len(self.pvs)))